@@ -0,0 +1,161 @@
+import json
+import os
+import pickle
+import numpy as np
+
+# Dense tabular Q-learning for the 12-feature Flappy Bird observation.
+#
+# A Discretizer maps every observation to one integer state index (configurable
+# bins per feature), and the Q-values live in a single contiguous
+# (num_states, num_actions) float32 array. Lookups are plain array indexing,
+# action selection and TD updates work on whole batches (e.g. straight from
+# VectorFlappyEnv), and the table is saved as a .npy that can be memory-mapped
+# at load time.
+#
+#   agent = DenseQTableEGAgent(num_actions=2, learning_rate=1e-4, initial_epsilon=1.0,
+#                              epsilon_decay=2e-6, final_epsilon=0.1)
+#   actions = agent.get_actions(obs)                     # obs: (batch, 12)
+#   agent.update_batch(obs, actions, rewards, terminations, next_obs)
+#   agent.export_result("QTable-EG")                     # saved_policies/QTable-EG.npy
+
+# Bins per feature of the 12-feature observation:
+#   nearest pipe x, top, bottom | next pipe x, top, bottom | third pipe x, top, bottom | y, vel_y, rot
+# The third pipe and the rotation are ignored (1 bin) to keep the table small.
+DEFAULT_BINS = (4, 6, 6, 4, 6, 6, 1, 1, 1, 8, 8, 1)
+
+class Discretizer:
+    """
+    Maps observations to dense state indices by binning each feature into
+    `bins[i]` equal-width bins over [low, high] (values outside are clipped).
+    With truncate=True features are first truncated to integers, which is how the
+    original QTable_EG_Agent keyed its dictionary.
+    """
+    def __init__(self, bins=DEFAULT_BINS, low=-1.0, high=1.0, truncate=False):
+        self.bins = np.asarray(bins, dtype=np.int64)
+        self.low = np.broadcast_to(np.asarray(low, dtype=np.float64), self.bins.shape).copy()
+        self.high = np.broadcast_to(np.asarray(high, dtype=np.float64), self.bins.shape).copy()
+        self.truncate = truncate
+        self.num_states = int(np.prod(self.bins))
+        self._scale = self.bins / (self.high - self.low)
+
+    def __call__(self, obs):
+        """State index of one observation (int) or a batch of observations (array)."""
+        obs = np.asarray(obs, dtype=np.float64)
+        if self.truncate:
+            obs = np.trunc(obs)
+        cells = np.floor((obs - self.low) * self._scale).astype(np.int64)
+        np.clip(cells, 0, self.bins - 1, out=cells)
+        index = np.ravel_multi_index(np.moveaxis(cells, -1, 0), self.bins)
+        return int(index) if np.ndim(index) == 0 else index
+
+    def config(self):
+        return {"bins": self.bins.tolist(), "low": self.low.tolist(), "high": self.high.tolist(), "truncate": self.truncate}
+
+    @classmethod
+    def legacy(cls):
+        """Discretizer matching the int-cast tuple keys of QTable-EG.pkl."""
+        return cls(bins=(3,) * 12, low=-1.5, high=1.5, truncate=True)
+
+class DenseQTable:
+    """Contiguous (num_states, num_actions) Q-value array indexed through a Discretizer."""
+    def __init__(self, discretizer=None, num_actions=2, q_values=None):
+        self.discretizer = discretizer or Discretizer()
+        self.num_actions = num_actions
+        if q_values is None:
+            q_values = np.zeros((self.discretizer.num_states, num_actions), dtype=np.float32)
+        self.q_values = q_values
+
+    @property
+    def nbytes(self):
+        return self.q_values.nbytes
+
+    def greedy(self, obs):
+        """Best action for one observation or a batch."""
+        actions = self.q_values[self.discretizer(obs)].argmax(axis=-1)
+        return int(actions) if np.ndim(actions) == 0 else actions
+
+    def epsilon_greedy(self, obs, epsilon, rng):
+        """Batch epsilon-greedy actions."""
+        states = np.atleast_1d(self.discretizer(obs))
+        actions = self.q_values[states].argmax(axis=1)
+        explore = rng.random(len(states)) < epsilon
+        actions[explore] = rng.integers(0, self.num_actions, size=int(explore.sum()))
+        return actions
+
+    def update(self, obs, actions, rewards, terminations, next_obs, learning_rate, discount_factor):
+        """
+        One Q-learning step for a batch of transitions. Returns the TD errors.
+        Transitions that hit the same (state, action) are averaged into one update,
+        so a large batch never applies learning_rate more than once per entry.
+        """
+        states = np.atleast_1d(self.discretizer(obs))
+        next_states = np.atleast_1d(self.discretizer(next_obs))
+        actions = np.atleast_1d(actions)
+        future_q = (~np.atleast_1d(terminations).astype(bool)) * self.q_values[next_states].max(axis=1)
+        temporal_difference = np.atleast_1d(rewards) + discount_factor * future_q - self.q_values[states, actions]
+        cells, inverse, counts = np.unique(states * self.num_actions + actions, return_inverse=True, return_counts=True)
+        mean_difference = np.bincount(inverse, weights=temporal_difference) / counts
+        flat_q = self.q_values.reshape(-1)
+        flat_q[cells] += (learning_rate * mean_difference).astype(np.float32)
+        return temporal_difference
+
+    def save(self, path):
+        """Save the Q-array as .npy and the discretizer next to it as .json."""
+        np.save(path, self.q_values)
+        with open(os.path.splitext(path)[0] + ".json", "w") as f:
+            json.dump({"num_actions": self.num_actions, "discretizer": self.discretizer.config()}, f)
+
+    @classmethod
+    def load(cls, path, mmap_mode="r"):
+        """Load a saved table; by default the Q-array is memory-mapped read-only."""
+        with open(os.path.splitext(path)[0] + ".json") as f:
+            meta = json.load(f)
+        q_values = np.load(path, mmap_mode=mmap_mode)
+        return cls(Discretizer(**meta["discretizer"]), meta["num_actions"], q_values)
+
+    @classmethod
+    def from_legacy_pickle(cls, path, num_actions=2):
+        """Convert a QTable-EG.pkl dict of {int tuple: q-values} into a dense table."""
+        with open(path, "rb") as f:
+            q_dict = pickle.load(f)
+        table = cls(Discretizer.legacy(), num_actions)
+        for key, values in q_dict.items():
+            table.q_values[table.discretizer(key)] = values
+        return table
+
+class DenseQTableEGAgent:
+    """Epsilon-greedy Q-learning agent on a DenseQTable, batch-first version of QTable_EG_Agent."""
+    def __init__(self, num_actions, learning_rate, initial_epsilon, epsilon_decay, final_epsilon,
+                 discount_factor=0.95, discretizer=None, seed=None):
+        self.table = DenseQTable(discretizer, num_actions)
+        self.lr = learning_rate
+        self.discount_factor = discount_factor
+
+        self.epsilon = initial_epsilon
+        self.epsilon_decay = epsilon_decay
+        self.final_epsilon = final_epsilon
+
+        self.rng = np.random.default_rng(seed)
+        self.training_error = []  # Mean TD error per update batch
+
+    def get_action(self, obs):
+        return int(self.get_actions(np.asarray(obs)[None])[0])
+
+    def get_actions(self, obs):
+        return self.table.epsilon_greedy(obs, self.epsilon, self.rng)
+
+    def update(self, obs, action, reward, terminated, next_obs):
+        self.update_batch(np.asarray(obs)[None], [action], [reward], [terminated], np.asarray(next_obs)[None])
+
+    def update_batch(self, obs, actions, rewards, terminations, next_obs):
+        temporal_difference = self.table.update(obs, actions, rewards, terminations, next_obs,
+                                                self.lr, self.discount_factor)
+        self.training_error.append(float(temporal_difference.mean()))
+
+    def decay_epsilon(self, episodes=1):
+        self.epsilon = max(self.final_epsilon, self.epsilon - self.epsilon_decay * episodes)
+
+    def export_result(self, filename):
+        result_path = os.path.join("saved_policies", filename + ".npy")
+        self.table.save(result_path)
+        return result_path
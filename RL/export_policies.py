@@ -0,0 +1,63 @@
+import sys
+import os
+import glob
+import numpy as np
+import torch
+
+# Convert saved torch policies into flat .npz weight files that can be evaluated
+# with NumPy alone (see NumpyDQN in policy_server.py), so the web server never
+# needs to import torch.
+#
+# Usage:
+#   python export_policies.py                       # every saved_policies/*.pth
+#   python export_policies.py path/to/model.pth ...  # specific checkpoints
+#
+# Each .npz holds the state_dict tensors under their torch names (e.g.
+# "fc1.weight", "fc1.bias") plus an "arch" entry naming the network.
+
+SAVED_POLICIES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "saved_policies")
+
+# Architecture -> state_dict keys that identify it
+ARCHITECTURES = {
+    "DQN": {"fc1.weight", "fc2.weight", "fc3.weight"},  # DQN.ipynb / policy_server.py
+    "ActorCritic": {"fc1.weight", "policy.weight", "value.weight"},  # A2C.ipynb
+    "Policy_Network": {"shared_net.0.weight", "policy_mean_net.0.weight", "policy_stddev_net.0.weight"},  # REINFORCE.ipynb
+    "Policy_Network_v2": {"fc.0.weight", "fc.2.weight"},  # REINFORCE_v2.ipynb
+}
+
+def detect_architecture(state_dict):
+    """Name the network a state_dict belongs to, or "unknown"."""
+    keys = set(state_dict)
+    for arch, required in ARCHITECTURES.items():
+        if required <= keys:
+            return arch
+    return "unknown"
+
+def export(pth_path, npz_path=None):
+    """Export one checkpoint. Returns the path written."""
+    checkpoint = torch.load(pth_path, map_location="cpu", weights_only=False)
+
+    # Checkpoints are either a state_dict or a whole pickled module
+    state_dict = checkpoint.state_dict() if hasattr(checkpoint, "state_dict") else checkpoint
+    arrays = {
+        name: tensor.detach().cpu().numpy()
+        for name, tensor in state_dict.items()
+        if torch.is_tensor(tensor)
+    }
+    arch = detect_architecture(arrays)
+
+    npz_path = npz_path or os.path.splitext(pth_path)[0] + ".npz"
+    np.savez(npz_path, arch=np.array(arch), **arrays)
+    print(f"{pth_path} -> {npz_path} ({arch}, {len(arrays)} tensors)")
+    return npz_path
+
+def main(paths):
+    paths = paths or sorted(glob.glob(os.path.join(SAVED_POLICIES, "*.pth")))
+    for path in paths:
+        try:
+            export(path)
+        except Exception as e:
+            print(f"Error exporting {path}: {e}")
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,199 @@
+import numpy as np
+
+# Preallocated experience replay for the training notebooks.
+#
+# Transitions live in typed NumPy ring buffers, so memory use is fixed up front
+# (see ReplayBuffer.nbytes: about 100 bytes per 12-feature transition, roughly
+# 1 GB for 10M) and nothing is allocated per push or per sample. A sampled batch
+# is gathered into reusable batch arrays; with as_tensors=True those are wrapped
+# with torch.from_numpy, which shares memory instead of copying.
+#
+#   memory = ReplayBuffer(1_000_000)
+#   memory.push(state, action, reward, next_state, done)      # or push_batch(...)
+#   batch = memory.sample(64, as_tensors=True)
+#   q = policy_net(batch["obs"]).gather(1, batch["actions"].unsqueeze(1))
+#
+# PrioritizedReplayBuffer adds proportional prioritized sampling (Schaul et al.)
+# on top of a sum tree.
+
+class ReplayBuffer:
+    """Fixed-capacity ring buffer of (obs, action, reward, next_obs, done) transitions."""
+    def __init__(self, capacity, obs_dim=12, obs_dtype=np.float32, seed=None):
+        self.capacity = int(capacity)
+        self.obs_dim = obs_dim
+        self.obs = np.zeros((self.capacity, obs_dim), dtype=obs_dtype)
+        self.next_obs = np.zeros((self.capacity, obs_dim), dtype=obs_dtype)
+        self.actions = np.zeros(self.capacity, dtype=np.int8)
+        self.rewards = np.zeros(self.capacity, dtype=np.float32)
+        self.dones = np.zeros(self.capacity, dtype=np.bool_)
+
+        self.position = 0  # Next slot to write
+        self.size = 0
+        self.rng = np.random.default_rng(seed)
+        self._batch = None  # Reused sample arrays
+        self._batch_size = 0
+
+    @property
+    def nbytes(self):
+        """Memory held by the stored transitions."""
+        return sum(array.nbytes for array in (self.obs, self.next_obs, self.actions, self.rewards, self.dones))
+
+    def __len__(self):
+        return self.size
+
+    def push(self, obs, action, reward, next_obs, done):
+        """Store one transition, overwriting the oldest once full."""
+        i = self.position
+        self.obs[i] = obs
+        self.actions[i] = action
+        self.rewards[i] = reward
+        self.next_obs[i] = next_obs
+        self.dones[i] = done
+        self._advance(1)
+        return i
+
+    def push_batch(self, obs, actions, rewards, next_obs, dones):
+        """Store many transitions at once (e.g. a RolloutPool.collect() batch). Returns their indices."""
+        count = len(actions)
+        if count > self.capacity:
+            # Only the newest transitions fit
+            obs, actions, rewards, next_obs, dones = (
+                array[-self.capacity:] for array in (obs, actions, rewards, next_obs, dones))
+            count = self.capacity
+
+        indices = (self.position + np.arange(count)) % self.capacity
+        self.obs[indices] = obs
+        self.actions[indices] = actions
+        self.rewards[indices] = rewards
+        self.next_obs[indices] = next_obs
+        self.dones[indices] = dones
+        self._advance(count)
+        return indices
+
+    def _advance(self, count):
+        self.position = (self.position + count) % self.capacity
+        self.size = min(self.size + count, self.capacity)
+
+    def sample(self, batch_size, as_tensors=False):
+        """Sample uniformly with replacement. See _gather for the result."""
+        indices = self.rng.integers(0, self.size, size=batch_size)
+        return self._gather(indices, as_tensors)
+
+    def _gather(self, indices, as_tensors):
+        """
+        Gather transitions into the reusable batch arrays and return them as a dict
+        (obs, actions, rewards, next_obs, dones, indices). The arrays are overwritten
+        by the next sample, so copy anything that has to outlive the training step.
+        """
+        batch_size = len(indices)
+        if self._batch is None or self._batch_size != batch_size:
+            self._batch = {
+                "obs": np.empty((batch_size, self.obs_dim), dtype=self.obs.dtype),
+                "next_obs": np.empty((batch_size, self.obs_dim), dtype=self.obs.dtype),
+                "actions": np.empty(batch_size, dtype=np.int64),  # int64 for torch gather()
+                "rewards": np.empty(batch_size, dtype=np.float32),
+                "dones": np.empty(batch_size, dtype=np.float32),  # float for (1 - done) masks
+            }
+            self._batch_size = batch_size
+
+        batch = self._batch
+        np.take(self.obs, indices, axis=0, out=batch["obs"])
+        np.take(self.next_obs, indices, axis=0, out=batch["next_obs"])
+        batch["actions"][:] = self.actions[indices]
+        np.take(self.rewards, indices, out=batch["rewards"])
+        batch["dones"][:] = self.dones[indices]
+
+        result = dict(batch)
+        if as_tensors:
+            import torch
+            result = {name: torch.from_numpy(array) for name, array in result.items()}
+        result["indices"] = indices
+        return result
+
+class SumTree:
+    """
+    Binary tree where each parent holds the sum of its children, stored in one array.
+    Leaves are the priorities; sampling and updates are O(log n) and vectorized
+    over a whole batch.
+    """
+    def __init__(self, capacity):
+        self.leaf_count = 1
+        while self.leaf_count < capacity:
+            self.leaf_count *= 2
+        self.tree = np.zeros(2 * self.leaf_count, dtype=np.float64)  # tree[1] is the root
+
+    @property
+    def total(self):
+        return self.tree[1]
+
+    def update(self, indices, priorities):
+        """Set leaf priorities and refresh their ancestors."""
+        nodes = np.asarray(indices) + self.leaf_count
+        self.tree[nodes] = priorities
+        nodes = np.unique(nodes // 2)
+        while nodes[0] >= 1:
+            self.tree[nodes] = self.tree[2 * nodes] + self.tree[2 * nodes + 1]
+            if nodes[0] == 1:
+                break
+            nodes = np.unique(nodes // 2)
+
+    def find(self, values):
+        """Leaf index whose cumulative priority range contains each value."""
+        nodes = np.ones(len(values), dtype=np.int64)
+        values = np.array(values, dtype=np.float64)
+        while nodes[0] < self.leaf_count:
+            left = 2 * nodes
+            left_sum = self.tree[left]
+            go_right = values > left_sum
+            values -= np.where(go_right, left_sum, 0)
+            nodes = left + go_right
+        return nodes - self.leaf_count
+
+class PrioritizedReplayBuffer(ReplayBuffer):
+    """
+    Proportional prioritized replay: transitions are sampled with probability
+    priority^alpha, and sample() returns importance weights (annealed by beta) to
+    correct the bias. New transitions get the highest priority seen so far.
+    """
+    def __init__(self, capacity, obs_dim=12, alpha=0.6, beta=0.4, eps=1e-6, obs_dtype=np.float32, seed=None):
+        super().__init__(capacity, obs_dim=obs_dim, obs_dtype=obs_dtype, seed=seed)
+        self.alpha = alpha
+        self.beta = beta
+        self.eps = eps
+        self.tree = SumTree(self.capacity)
+        self.max_priority = 1.0
+
+    def push(self, obs, action, reward, next_obs, done):
+        index = super().push(obs, action, reward, next_obs, done)
+        self.tree.update([index], self.max_priority ** self.alpha)
+        return index
+
+    def push_batch(self, obs, actions, rewards, next_obs, dones):
+        indices = super().push_batch(obs, actions, rewards, next_obs, dones)
+        self.tree.update(indices, self.max_priority ** self.alpha)
+        return indices
+
+    def sample(self, batch_size, as_tensors=False, beta=None):
+        """Stratified prioritized sample. Adds "weights" (importance sampling) to the result."""
+        beta = self.beta if beta is None else beta
+        total = self.tree.total
+        segment = total / batch_size
+        values = (np.arange(batch_size) + self.rng.random(batch_size)) * segment
+        indices = np.minimum(self.tree.find(values), self.size - 1)
+
+        probs = self.tree.tree[indices + self.tree.leaf_count] / total
+        weights = (self.size * probs) ** -beta
+        weights = (weights / weights.max()).astype(np.float32)
+
+        result = self._gather(indices, as_tensors)
+        if as_tensors:
+            import torch
+            weights = torch.from_numpy(weights)
+        result["weights"] = weights
+        return result
+
+    def update_priorities(self, indices, td_errors):
+        """Set new priorities from the absolute TD errors of a sampled batch."""
+        priorities = np.abs(np.asarray(td_errors, dtype=np.float64)) + self.eps
+        self.max_priority = max(self.max_priority, float(priorities.max()))
+        self.tree.update(indices, priorities ** self.alpha)
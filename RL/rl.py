@@ -5,8 +5,8 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'e
 import flappy_bird_gymnasium
 import gymnasium
 from flappy_env import MultiplayerFlappyEnv
-import pickle
 import numpy as np
+from dense_qtable import DenseQTable
 # from stable_baselines3 import PPO
 
 # Create environment
@@ -18,19 +18,20 @@ env = gymnasium.make("FlappyBird-v0", render_mode="human", use_lidar=False)
 # env.add_player("ai_agent")
 
 
-with open("./saved_policies/QTable-EG.pkl", "rb") as f:
-    q_table = pickle.load(f)
+# Dense .npy table (memory-mapped), or the old pickled dict converted on the fly
+if os.path.exists("./saved_policies/QTable-EG.npy"):
+    q_table = DenseQTable.load("./saved_policies/QTable-EG.npy")
+else:
+    q_table = DenseQTable.from_legacy_pickle("./saved_policies/QTable-EG.pkl")
 
 obs, _ = env.reset()
-obs = [int(x) for x in obs]
 done = False
 while not done:
 
-    action = np.argmax(q_table[tuple(obs)])
+    action = q_table.greedy(obs)
     print("TAKING ACTION: ", action)
 
     obs, reward, done, truncated, info = env.step(action)
-    obs = [int(x) for x in obs]
     # print(f"Action {action} gave {reward} reward...")
     print(obs, reward, done, truncated, info)
 
@@ -0,0 +1,261 @@
+import multiprocessing as mp
+import queue
+from multiprocessing import shared_memory
+import numpy as np
+
+# Parallel experience collection for the training notebooks.
+#
+# K worker processes each run their own environment and act with a NumPy copy of
+# the policy (so workers never import torch). The learner broadcasts new weights
+# with set_weights() whenever it likes; workers pick them up at the start of their
+# next chunk. Transitions are written straight into shared memory, two chunks per
+# worker, so a worker fills one chunk while the learner reads the other.
+#
+#   pool = RolloutPool(num_workers=8)
+#   pool.set_weights(weights_from_state_dict(policy_net.state_dict()), epsilon=0.1)
+#   for step in range(num_updates):
+#       batch = pool.collect(1024)          # dict of arrays, see collect()
+#       ...train on batch...
+#       pool.set_weights(weights_from_state_dict(policy_net.state_dict()), epsilon=eps)
+#   pool.close()
+
+def make_flappy_env():
+    """Default environment factory: FlappyBird-v0 with the 12-feature observation."""
+    import gymnasium
+    import flappy_bird_gymnasium
+    return gymnasium.make("FlappyBird-v0", render_mode=None, use_lidar=False)
+
+def make_custom_flappy_env():
+    """The server's CustomFlappyBirdEnv rules (fixed gaps), without the start countdown.
+    Observations are the 180 LIDAR distances, so use layer_sizes=(180, ...)."""
+    import os
+    import sys
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'environments')))
+    from custom_flappy import CustomFlappyBirdEnv
+    return CustomFlappyBirdEnv(pipe_gap=130, countdown_seconds=0)
+
+def weights_from_state_dict(state_dict, layers=("fc1", "fc2", "fc3")):
+    """[(weight, bias), ...] NumPy arrays from a torch state_dict (DQN layout by default)."""
+    def to_numpy(tensor):
+        return tensor.detach().cpu().numpy() if hasattr(tensor, "detach") else np.asarray(tensor)
+    return [(to_numpy(state_dict[f"{layer}.weight"]), to_numpy(state_dict[f"{layer}.bias"])) for layer in layers]
+
+def _forward(layers, obs):
+    """MLP with ReLU between layers. Weights are in torch (out, in) layout."""
+    x = obs
+    for i, (weight, bias) in enumerate(layers):
+        x = x @ weight.T + bias
+        if i < len(layers) - 1:
+            x = np.maximum(x, 0)
+    return x
+
+# Layout of the shared control block
+_VERSION, _EPSILON, _STOP = range(3)
+
+class RolloutPool:
+    """
+    A pool of rollout worker processes streaming transitions through shared memory.
+
+    layer_sizes describes the policy MLP (input, hidden..., actions). With
+    action_mode="greedy" workers act epsilon-greedily on the outputs (DQN); with
+    "sample" they sample from the softmax of the outputs (actor-critic/REINFORCE
+    logits).
+    """
+    def __init__(self, num_workers=None, chunk_steps=256, layer_sizes=(12, 128, 128, 2),
+                 make_env=make_flappy_env, action_mode="greedy", seed=None, start_method=None):
+        self.num_workers = num_workers or mp.cpu_count()
+        self.chunk_steps = chunk_steps
+        self.layer_sizes = tuple(layer_sizes)
+        self.obs_dim = self.layer_sizes[0]
+        # Row = obs, action, reward, next_obs, done
+        self.row_width = 2 * self.obs_dim + 3
+        self.ctx = mp.get_context(start_method)
+
+        # Shared policy weights, guarded by a lock so workers never read a half-written copy
+        self.weight_shapes = []
+        for fan_in, fan_out in zip(self.layer_sizes[:-1], self.layer_sizes[1:]):
+            self.weight_shapes += [(fan_out, fan_in), (fan_out,)]
+        weight_count = sum(int(np.prod(shape)) for shape in self.weight_shapes)
+        self.weights_shm = shared_memory.SharedMemory(create=True, size=weight_count * 4)
+        self.control_shm = shared_memory.SharedMemory(create=True, size=3 * 8)
+        self.weights = np.ndarray(weight_count, dtype=np.float32, buffer=self.weights_shm.buf)
+        self.control = np.ndarray(3, dtype=np.float64, buffer=self.control_shm.buf)
+        self.control[:] = 0
+        self.weights_lock = self.ctx.Lock()
+
+        # Two transition chunks per worker
+        self.transitions_shm = shared_memory.SharedMemory(
+            create=True, size=self.num_workers * 2 * chunk_steps * self.row_width * 4)
+        self.transitions = np.ndarray((self.num_workers, 2, chunk_steps, self.row_width),
+                                      dtype=np.float32, buffer=self.transitions_shm.buf)
+        self.free_slots = [self.ctx.Semaphore(2) for _ in range(self.num_workers)]
+        self.ready = self.ctx.Queue()
+
+        seeds = np.random.SeedSequence(seed).spawn(self.num_workers)
+        self.workers = [
+            self.ctx.Process(
+                target=_worker_main,
+                args=(worker_id, make_env, action_mode, int(seeds[worker_id].generate_state(1)[0]),
+                      self.layer_sizes, chunk_steps, self.weights_shm.name, self.control_shm.name,
+                      self.transitions_shm.name, self.num_workers, self.weights_lock,
+                      self.free_slots[worker_id], self.ready),
+                daemon=True
+            )
+            for worker_id in range(self.num_workers)
+        ]
+        self.started = False
+
+    def start(self):
+        """Start the worker processes (collect() does this on first use)."""
+        if not self.started:
+            for worker in self.workers:
+                worker.start()
+            self.started = True
+
+    def set_weights(self, layers, epsilon=None):
+        """Broadcast new policy weights ([(weight, bias), ...] in torch layout) to every worker."""
+        flat = np.concatenate([np.asarray(array, dtype=np.float32).ravel() for layer in layers for array in layer])
+        if flat.size != self.weights.size:
+            raise ValueError(f"Expected {self.weights.size} weights for layers {self.layer_sizes}, got {flat.size}")
+        with self.weights_lock:
+            self.weights[:] = flat
+            if epsilon is not None:
+                self.control[_EPSILON] = epsilon
+            self.control[_VERSION] += 1
+
+    def set_epsilon(self, epsilon):
+        """Change the exploration rate without resending weights."""
+        with self.weights_lock:
+            self.control[_EPSILON] = epsilon
+
+    def collect(self, min_steps, timeout=None):
+        """
+        Gather at least `min_steps` transitions from whichever workers are ready.
+        Returns a dict with obs, actions, rewards, next_obs, dones arrays and the
+        returns of the episodes that finished in those chunks.
+        """
+        self.start()
+        chunks = []
+        episode_returns = []
+        steps = 0
+        while steps < min_steps:
+            try:
+                worker_id, slot, count, returns = self.ready.get(timeout=timeout)
+            except queue.Empty:
+                break
+            # Copy out of shared memory, then hand the slot back to the worker
+            chunks.append(self.transitions[worker_id, slot, :count].copy())
+            self.free_slots[worker_id].release()
+            episode_returns.extend(returns)
+            steps += count
+
+        rows = np.concatenate(chunks) if chunks else np.zeros((0, self.row_width), dtype=np.float32)
+        obs_dim = self.obs_dim
+        return {
+            "obs": rows[:, :obs_dim],
+            "actions": rows[:, obs_dim].astype(np.int64),
+            "rewards": rows[:, obs_dim + 1],
+            "next_obs": rows[:, obs_dim + 2:2 * obs_dim + 2],
+            "dones": rows[:, 2 * obs_dim + 2].astype(bool),
+            "episode_returns": episode_returns
+        }
+
+    def close(self):
+        """Stop the workers and free the shared memory."""
+        self.control[_STOP] = 1
+        # Wake up any worker waiting for a free slot
+        for free in self.free_slots:
+            free.release()
+        for worker in self.workers:
+            if worker.is_alive():
+                worker.join(timeout=2.0)
+            if worker.is_alive():
+                worker.terminate()
+        for shm in (self.weights_shm, self.control_shm, self.transitions_shm):
+            shm.close()
+            shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def _worker_main(worker_id, make_env, action_mode, seed, layer_sizes, chunk_steps,
+                 weights_name, control_name, transitions_name, num_workers,
+                 weights_lock, free_slots, ready):
+    """Worker process: act with the latest broadcast policy and fill shared chunks."""
+    weights_shm = shared_memory.SharedMemory(name=weights_name)
+    control_shm = shared_memory.SharedMemory(name=control_name)
+    transitions_shm = shared_memory.SharedMemory(name=transitions_name)
+    try:
+        obs_dim = layer_sizes[0]
+        shared_weights = np.ndarray(weights_shm.size // 4, dtype=np.float32, buffer=weights_shm.buf)
+        control = np.ndarray(3, dtype=np.float64, buffer=control_shm.buf)
+        transitions = np.ndarray((num_workers, 2, chunk_steps, 2 * obs_dim + 3),
+                                 dtype=np.float32, buffer=transitions_shm.buf)[worker_id]
+
+        rng = np.random.default_rng(seed)
+        env = make_env()
+        obs, _ = env.reset(seed=seed)
+        episode_return = 0.0
+
+        version = -1
+        layers = []
+        epsilon = 0.0
+        slot = 0
+        while not control[_STOP]:
+            free_slots.acquire()
+            if control[_STOP]:
+                break
+
+            # Pick up new weights between chunks
+            with weights_lock:
+                epsilon = float(control[_EPSILON])
+                if control[_VERSION] != version:
+                    version = control[_VERSION]
+                    flat = shared_weights.copy()
+                    layers = []
+                    offset = 0
+                    for fan_in, fan_out in zip(layer_sizes[:-1], layer_sizes[1:]):
+                        weight = flat[offset:offset + fan_in * fan_out].reshape(fan_out, fan_in)
+                        offset += fan_in * fan_out
+                        bias = flat[offset:offset + fan_out]
+                        offset += fan_out
+                        layers.append((weight, bias))
+
+            chunk = transitions[slot]
+            returns = []
+            for row in chunk:
+                outputs = _forward(layers, np.asarray(obs, dtype=np.float32))
+                if action_mode == "sample":
+                    probs = np.exp(outputs - outputs.max())
+                    action = int(rng.choice(len(probs), p=probs / probs.sum()))
+                elif rng.random() < epsilon:
+                    action = int(rng.integers(len(outputs)))
+                else:
+                    action = int(outputs.argmax())
+
+                next_obs, reward, terminated, truncated, _ = env.step(action)
+                done = terminated or truncated
+                row[:obs_dim] = obs
+                row[obs_dim] = action
+                row[obs_dim + 1] = reward
+                row[obs_dim + 2:2 * obs_dim + 2] = next_obs
+                row[2 * obs_dim + 2] = terminated
+
+                episode_return += reward
+                if done:
+                    returns.append(episode_return)
+                    episode_return = 0.0
+                    obs, _ = env.reset()
+                else:
+                    obs = next_obs
+
+            ready.put((worker_id, slot, chunk_steps, returns))
+            slot ^= 1
+        env.close()
+    finally:
+        weights_shm.close()
+        control_shm.close()
+        transitions_shm.close()
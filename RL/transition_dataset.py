@@ -0,0 +1,206 @@
+import json
+import os
+import sys
+import numpy as np
+
+# On-disk transition dataset for world-model training.
+#
+# Transitions are streamed into a directory of fixed-size chunks. Each chunk stores
+# every column (obs, action, next_obs, reward, done) as its own .npy file, and the
+# reader memory-maps them, so a dataset of 100M transitions (~10 GB) is served in
+# shuffled mini-batches without ever being loaded into RAM.
+#
+#   collect_random("data/flappy", 10_000_000)               # or use TransitionWriter
+#   dataset = TransitionDataset("data/flappy")
+#   for epoch in range(epochs):
+#       for batch in dataset.batches(4096, as_tensors=True):
+#           output = model(batch["obs"], batch["action"].float().unsqueeze(1))
+#           target = torch.cat([batch["next_obs"], batch["reward"].unsqueeze(1)], dim=1)
+
+META_FILE = "meta.json"
+
+def _columns(obs_dim):
+    """Column name -> (dtype, per-row shape)."""
+    return {
+        "obs": (np.float32, (obs_dim,)),
+        "action": (np.int8, ()),
+        "next_obs": (np.float32, (obs_dim,)),
+        "reward": (np.float32, ()),
+        "done": (np.bool_, ()),
+    }
+
+class TransitionWriter:
+    """Appends transitions to a chunked dataset directory."""
+    def __init__(self, path, obs_dim=12, chunk_size=1_000_000):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+        meta_path = os.path.join(path, META_FILE)
+        if os.path.exists(meta_path):
+            # Keep appending to an existing dataset
+            with open(meta_path) as f:
+                meta = json.load(f)
+            obs_dim, chunk_size = meta["obs_dim"], meta["chunk_size"]
+            self.chunks = meta["chunks"]
+        else:
+            self.chunks = []  # Row count of every chunk written so far
+
+        self.obs_dim = obs_dim
+        self.chunk_size = chunk_size
+        self.columns = _columns(obs_dim)
+        self.buffer = {
+            name: np.empty((chunk_size,) + shape, dtype=dtype)
+            for name, (dtype, shape) in self.columns.items()
+        }
+        self.buffered = 0
+
+    def append(self, obs, action, next_obs, reward, done=False):
+        """Add one transition."""
+        self.append_batch([obs], [action], [next_obs], [reward], [done])
+
+    def append_batch(self, obs, action, next_obs, reward, done):
+        """Add a batch of transitions (arrays with the same leading length)."""
+        values = {"obs": obs, "action": action, "next_obs": next_obs, "reward": reward, "done": done}
+        count = len(action)
+        start = 0
+        while start < count:
+            take = min(count - start, self.chunk_size - self.buffered)
+            for name, column in values.items():
+                self.buffer[name][self.buffered:self.buffered + take] = column[start:start + take]
+            self.buffered += take
+            start += take
+            if self.buffered == self.chunk_size:
+                self.flush()
+
+    def flush(self):
+        """Write the buffered rows as a new chunk."""
+        if self.buffered == 0:
+            return
+        index = len(self.chunks)
+        for name, column in self.buffer.items():
+            np.save(os.path.join(self.path, f"{name}.{index:05d}.npy"), column[:self.buffered])
+        self.chunks.append(self.buffered)
+        self.buffered = 0
+        self._write_meta()
+
+    def _write_meta(self):
+        meta = {
+            "obs_dim": self.obs_dim,
+            "chunk_size": self.chunk_size,
+            "chunks": self.chunks,
+            "count": sum(self.chunks),
+        }
+        with open(os.path.join(self.path, META_FILE), "w") as f:
+            json.dump(meta, f)
+
+    def close(self):
+        """Flush the last partial chunk."""
+        self.flush()
+        self._write_meta()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class TransitionDataset:
+    """Memory-mapped reader serving shuffled mini-batches from a TransitionWriter directory."""
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, META_FILE)) as f:
+            meta = json.load(f)
+        self.obs_dim = meta["obs_dim"]
+        self.columns = _columns(self.obs_dim)
+
+        # Memory-mapped columns, one dict per chunk
+        self.chunks = [
+            {
+                name: np.load(os.path.join(path, f"{name}.{index:05d}.npy"), mmap_mode="r")
+                for name in self.columns
+            }
+            for index in range(len(meta["chunks"]))
+        ]
+        sizes = np.array(meta["chunks"], dtype=np.int64)
+        self.offsets = np.concatenate([[0], np.cumsum(sizes)])  # Global index of each chunk's first row
+
+    def __len__(self):
+        return int(self.offsets[-1])
+
+    def batches(self, batch_size, shuffle=True, shuffle_window=4, drop_last=False, seed=None, as_tensors=False):
+        """
+        Yield dicts of column arrays, one epoch's worth.
+
+        Shuffling works on windows of `shuffle_window` chunks at a time: the chunk
+        order is shuffled, then all rows in the window are permuted together. Only
+        the chunks in the current window are paged in, which keeps reads mostly
+        sequential on disk while still mixing transitions across chunks.
+        """
+        rng = np.random.default_rng(seed)
+        chunk_order = rng.permutation(len(self.chunks)) if shuffle else np.arange(len(self.chunks))
+
+        leftover = np.zeros(0, dtype=np.int64)
+        for start in range(0, len(chunk_order), shuffle_window):
+            window = chunk_order[start:start + shuffle_window]
+            indices = np.concatenate([leftover] + [np.arange(self.offsets[c], self.offsets[c + 1]) for c in window])
+            if shuffle:
+                rng.shuffle(indices)
+
+            # Hold back a partial batch so it can be mixed with the next window
+            full = len(indices) - len(indices) % batch_size
+            for batch_start in range(0, full, batch_size):
+                yield self._gather(indices[batch_start:batch_start + batch_size], as_tensors)
+            leftover = indices[full:]
+
+        if len(leftover) and not drop_last:
+            yield self._gather(leftover, as_tensors)
+
+    def _gather(self, indices, as_tensors):
+        """Read the rows at the given global indices, chunk by chunk in sorted order."""
+        indices = np.sort(indices)
+        chunk_ids = np.searchsorted(self.offsets, indices, side="right") - 1
+        batch = {
+            name: np.empty((len(indices),) + shape, dtype=dtype)
+            for name, (dtype, shape) in self.columns.items()
+        }
+
+        boundaries = np.flatnonzero(np.diff(chunk_ids)) + 1
+        for rows in np.split(np.arange(len(indices)), boundaries):
+            chunk = int(chunk_ids[rows[0]])
+            local = indices[rows] - self.offsets[chunk]
+            for name, column in self.chunks[chunk].items():
+                batch[name][rows] = column[local]
+
+        if as_tensors:
+            import torch
+            batch = {name: torch.from_numpy(array) for name, array in batch.items()}
+        return batch
+
+def collect_random(path, num_transitions, num_envs=1024, pipe_gap=100, chunk_size=1_000_000, seed=None):
+    """
+    Fill a dataset with random-action transitions from the vectorized env
+    (environments/vector_flappy.py), num_envs worlds at a time.
+    """
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'environments')))
+    from vector_flappy import VectorFlappyEnv
+
+    env = VectorFlappyEnv(num_envs=num_envs, pipe_gap=pipe_gap)
+    rng = np.random.default_rng(seed)
+    obs, _ = env.reset(seed=seed)
+    written = 0
+    with TransitionWriter(path, obs_dim=obs.shape[1], chunk_size=chunk_size) as writer:
+        while written < num_transitions:
+            actions = rng.integers(0, 2, size=num_envs)
+            next_obs, rewards, terminations, truncations, infos = env.step(actions)
+
+            # Worlds that reset this step report their true last observation separately
+            stored_next = next_obs
+            if "final_obs" in infos:
+                stored_next = np.where(infos["_final_obs"][:, None], infos["final_obs"], next_obs)
+
+            take = min(num_envs, num_transitions - written)
+            writer.append_batch(obs[:take], actions[:take], stored_next[:take], rewards[:take],
+                                (terminations | truncations)[:take])
+            written += take
+            obs = next_obs
+    return written
@@ -1,137 +1,267 @@
-from flask import Flask, render_template, request
-from flask_socketio import SocketIO, emit
-from game_manager import GameManager
-from single_player_game_manager import SinglePlayerGameManager
-import threading
+import os
 import time
 
+# 'threading' runs game loops and handlers on OS threads, 'eventlet' runs everything
+# as green threads on one event loop (cheap idle connections, no lock contention)
+ASYNC_MODE = os.environ.get('ASYNC_MODE', 'threading')
+if ASYNC_MODE == 'eventlet':
+    # Must happen before anything else imports socket/threading/time
+    import eventlet
+    eventlet.monkey_patch()
+
+from flask import Flask, Response, render_template, request, jsonify
+from flask_socketio import SocketIO, emit, join_room, leave_room
+from match_registry import MatchRegistry, DEFAULT_MATCH_ID
+from tick_scheduler import TickScheduler, set_scheduler
+from policy_server import get_policy_server
+from metrics import get_metrics
+from fanout import Fanout
+import snapshot_codec
+
 app = Flask(__name__)
-socketio = SocketIO(app)
-
-# Initialize game managers
-game_manager = GameManager()
-single_player_manager = SinglePlayerGameManager()
-
-players = {}  # Store player information (username, admin status)
-spectators = set()  # Track spectator IDs
-game_in_progress = False
-ai_game_in_progress = False
-last_game_state = None  # Track the last game state to check for game over
-last_ai_game_state = None  # Track the last AI game state
-
-# Background thread for updating game state
-def game_state_updater():
-    global game_in_progress, last_game_state, ai_game_in_progress, last_ai_game_state
-    
-    while True:
-        # Handle multiplayer game
-        if game_in_progress:
-            # Get the raw game state from the game manager
-            game_state = game_manager.get_game_state()
-            
-            # Check for countdown status - game isn't truly started until countdown finishes
-            if "_metadata" in game_state and "countdown" in game_state["_metadata"]:
-                countdown_info = game_state["_metadata"]["countdown"]
-                if countdown_info["active"]:
-                    # Countdown is still active, just send the state but don't check for game over yet
-                    enhanced_state = _enhance_game_state(game_state)
-                    socketio.emit('game_state', enhanced_state)
-                    last_game_state = enhanced_state
-                    time.sleep(0.1)
-                    continue
+socketio = SocketIO(app, async_mode=ASYNC_MODE)
+
+# Game loops and broadcasts all run on one shared fixed-timestep scheduler, spawned
+# and paced through Socket.IO so it is a green thread in eventlet mode. It is only
+# started on the first connection (see _start_scheduler), so importing this module
+# never spawns a live loop
+scheduler = TickScheduler(sleep=socketio.sleep, spawn=socketio.start_background_task)
+set_scheduler(scheduler)
+
+# Send a full keyframe every N game_state messages, deltas in between
+STATE_KEYFRAME_INTERVAL = int(os.environ.get('STATE_KEYFRAME_INTERVAL', 20))
+
+# 'json' sends game_state_delta messages, 'binary' sends packed game_frame/ai_game_frame
+# attachments (see snapshot_codec.py) plus a game_roster message when players change
+GAME_FRAME_FORMAT = os.environ.get('GAME_FRAME_FORMAT', 'json')
+
+# Broadcast rate (per second), independent of the game frame rates. Players get
+# every broadcast, spectators a downsampled stream at SPECTATOR_BROADCAST_RATE
+BROADCAST_RATE = 10
+SPECTATOR_BROADCAST_RATE = float(os.environ.get('SPECTATOR_BROADCAST_RATE', 5))
+
+# Game frames are dropped (not queued) for clients with more than this many packets waiting
+MAX_SEND_BACKLOG = int(os.environ.get('MAX_SEND_BACKLOG', 8))
+
+# Every match (and AI game) hosted by this process
+registry = MatchRegistry(keyframe_interval=STATE_KEYFRAME_INTERVAL,
+                         spectator_every=max(1, round(BROADCAST_RATE / SPECTATOR_BROADCAST_RATE)))
+
+# Sends game frames to each stream's room, skipping clients that can't keep up
+fanout = Fanout(socketio, max_backlog=MAX_SEND_BACKLOG)
+
+# Frame timings, tick overruns and errors, served in the Prometheus text format on /metrics
+metrics = get_metrics()
+
+# Scheduled task sending the state of every match to its clients
+def broadcast_tick():
+    # Handle every multiplayer match
+    for match in registry.all():
+        if match.game_in_progress:
+            _update_match(match)
+    
+    # Handle every single-player AI game
+    for ai_match in registry.all_ai_matches():
+        _update_ai_match(ai_match)
+
+# Helper function to send one update for a multiplayer match to the streams due this tick
+def _update_match(match):
+    game_manager = match.game_manager
+    
+    if GAME_FRAME_FORMAT == 'binary':
+        # Read the flag once so the last frame sent to every stream is the one announced
+        game_over = game_manager.game_over
+        
+        # Pack the frame straight from the player table once and send the same bytes to everyone
+        _broadcast_game_frame(match, _due_streams(match, final=game_over))
+        
+        # Check for game over
+        if game_over:
+            winner_id = game_manager.winner
+            _announce_game_over(match, winner_id, game_manager.env.get_player_score(winner_id) if winner_id else 0)
+            match.game_in_progress = False
+        return
+    
+    # Get the raw game state from the game manager
+    game_state = game_manager.get_game_state()
+    streams = _due_streams(match, final="_metadata" in game_state and game_state["_metadata"]["game_over"])
+    
+    # Check for countdown status - game isn't truly started until countdown finishes
+    if "_metadata" in game_state and "countdown" in game_state["_metadata"]:
+        countdown_info = game_state["_metadata"]["countdown"]
+        if countdown_info["active"]:
+            # Countdown is still active, just send the state but don't check for game over yet
+            _broadcast_game_state(match, _enhance_game_state(match, game_state), streams)
+            return
+    
+    # Check for game over
+    if "_metadata" in game_state and game_state["_metadata"]["game_over"]:
+        # Game has ended
+        winner_id = game_state["_metadata"]["winner"]
+        _announce_game_over(match, winner_id, game_state[winner_id]["score"] if winner_id in game_state else 0)
+        
+        # Game is no longer in progress
+        match.game_in_progress = False
+    
+    # Enhance the game state with player information and send
+    # whatever changed to the streams due this tick
+    _broadcast_game_state(match, _enhance_game_state(match, game_state), streams)
+
+# Helper function to pick the streams that get this broadcast tick. The final frame
+# of a game goes to every stream so spectators never miss the result
+def _due_streams(match, final=False):
+    return [stream for stream in (match.player_stream, match.spectator_stream) if stream.due() or final]
+
+# Helper function to send one update for an AI game to the client that owns it
+def _update_ai_match(ai_match):
+    if ai_match.game_in_progress:
+        # Get the AI game state
+        ai_game_state = ai_match.manager.get_game_state()
+        
+        # Check for game over
+        if ai_game_state["_metadata"]["game_over"]:
+            winner = ai_game_state["_metadata"]["winner"]
             
-            # Check for game over
-            if "_metadata" in game_state and game_state["_metadata"]["game_over"]:
-                # Game has ended
-                winner_id = game_state["_metadata"]["winner"]
-                
-                # Prepare winner announcement
+            # Prepare winner announcement
+            if winner == "player":
+                winner_data = {
+                    "id": "player",
+                    "username": "You",
+                    "score": ai_game_state["player"]["score"]
+                }
+            elif winner == "ai":
+                winner_data = {
+                    "id": "ai",
+                    "username": "AI",
+                    "score": ai_game_state["ai"]["score"]
+                }
+            else:
                 winner_data = None
-                if winner_id and winner_id in players:
-                    winner_data = {
-                        "id": winner_id,
-                        "username": players[winner_id]["username"],
-                        "score": game_state[winner_id]["score"] if winner_id in game_state else 0
-                    }
-                
-                # Emit game over event
-                socketio.emit('game_over', {
-                    "winner": winner_data,
-                    "all_dead": winner_id is None
-                })
-                
-                # Game is no longer in progress
-                game_in_progress = False
             
-            # Enhance the game state with player information
-            enhanced_state = _enhance_game_state(game_state)
+            # Emit game over event
+            socketio.emit('ai_game_over', {
+                "winner": winner_data,
+                "all_dead": winner is None
+            }, to=ai_match.sid)
             
-            # Send the enhanced state to all clients
-            socketio.emit('game_state', enhanced_state)
-            
-            # Store the last game state
-            last_game_state = enhanced_state
-            
-        elif last_game_state is not None:
-            # If game is over but we still have a last state, continue to send it
-            # This ensures clients who connect after game over still see the results
-            socketio.emit('game_state', last_game_state)
+            # Game is no longer in progress
+            ai_match.game_in_progress = False
         
-        # Handle single-player AI game
-        if ai_game_in_progress:
-            # Get the AI game state
-            ai_game_state = single_player_manager.get_game_state()
-            
-            # Check for game over
-            if ai_game_state["_metadata"]["game_over"]:
-                winner = ai_game_state["_metadata"]["winner"]
-                
-                # Prepare winner announcement
-                if winner == "player":
-                    winner_data = {
-                        "id": "player",
-                        "username": "You",
-                        "score": ai_game_state["player"]["score"]
-                    }
-                elif winner == "ai":
-                    winner_data = {
-                        "id": "ai",
-                        "username": "AI",
-                        "score": ai_game_state["ai"]["score"]
-                    }
-                else:
-                    winner_data = None
-                
-                # Emit game over event
-                socketio.emit('ai_game_over', {
-                    "winner": winner_data,
-                    "all_dead": winner is None
-                })
-                
-                # Game is no longer in progress
-                ai_game_in_progress = False
-            
-            # Send the AI game state to all clients
-            socketio.emit('ai_game_state', ai_game_state)
-            
-            # Store the last game state
-            last_ai_game_state = ai_game_state
-            
-        elif last_ai_game_state is not None:
-            # If AI game is over but we still have a last state, continue to send it
-            socketio.emit('ai_game_state', last_ai_game_state)
-            
-        time.sleep(0.1)  # Update 10 times per second
+        if GAME_FRAME_FORMAT == 'binary':
+            ai_match.game_frame_seq += 1
+            ai_match.last_game_frame = snapshot_codec.encode_ai_frame(ai_game_state, ai_match.game_frame_seq)
+        
+        # Send the AI game state to its player (dropped while their connection is backed up)
+        if fanout.backlogged(ai_match.sid):
+            metrics.counter("flappy_dropped_frames_total", tier="ai").inc()
+        elif GAME_FRAME_FORMAT == 'binary':
+            socketio.emit('ai_game_frame', ai_match.last_game_frame, to=ai_match.sid)
+        else:
+            socketio.emit('ai_game_state', ai_game_state, to=ai_match.sid)
+        
+        # Store the last game state
+        ai_match.last_game_state = ai_game_state
+        
+    elif ai_match.last_game_state is not None and not fanout.backlogged(ai_match.sid):
+        # If AI game is over but we still have a last state, continue to send it
+        if GAME_FRAME_FORMAT == 'binary':
+            socketio.emit('ai_game_frame', ai_match.last_game_frame, to=ai_match.sid)
+        else:
+            socketio.emit('ai_game_state', ai_match.last_game_state, to=ai_match.sid)
+
+# Helper function to announce the end of a multiplayer game
+def _announce_game_over(match, winner_id, winner_score):
+    # Prepare winner announcement
+    winner_data = None
+    if winner_id and winner_id in match.players:
+        winner_data = {
+            "id": winner_id,
+            "username": match.players[winner_id]["username"],
+            "score": winner_score
+        }
+    
+    # Emit game over event
+    socketio.emit('game_over', {
+        "winner": winner_data,
+        "all_dead": winner_id is None
+    }, to=match.room)
+
+# Helper function to send a binary frame to some streams, preceded by the roster if it changed
+def _broadcast_game_frame(match, streams):
+    roster = _build_game_roster(match)
+    if roster != match.last_game_roster:
+        socketio.emit('game_roster', roster, to=match.room)
+        match.last_game_roster = roster
+    
+    match.game_frame_seq += 1
+    started = time.perf_counter()
+    frame = match.game_manager.encode_frame(match.game_frame_seq)
+    encoded = time.perf_counter()
+    metrics.histogram("flappy_phase_seconds", match=match.match_id, phase="serialize").observe(encoded - started)
+    if frame is not None:
+        # Frames are full snapshots, so clients that were skipped just get the next one
+        for stream in streams:
+            _count_dropped(match, stream, fanout.emit(stream, 'game_frame', frame))
+        metrics.histogram("flappy_phase_seconds", match=match.match_id, phase="emit").observe(time.perf_counter() - encoded)
+        match.last_game_frame = frame
+
+# Helper function to build the slot -> player mapping and static data binary frames refer to
+def _build_game_roster(match):
+    game_manager = match.game_manager
+    return {
+        "slots": game_manager.get_roster(),
+        "players_info": {
+            player_id: {
+                "id": player_id,
+                "username": player_info["username"],
+                "isAdmin": player_info["isAdmin"]
+            }
+            for player_id, player_info in match.players.items()
+        },
+        "static": {
+            "screen_width": game_manager.game_width,
+            "screen_height": game_manager.game_height,
+            "pipe_width": game_manager.PIPE_WIDTH,
+            "pipe_gap": game_manager.PIPE_GAP,
+            "player_x": 50,
+            "position_scale": snapshot_codec.POSITION_SCALE
+        }
+    }
+
+# Helper function to send a game state to some streams as a keyframe or delta (nothing if unchanged)
+def _broadcast_game_state(match, enhanced_state, streams):
+    for stream in streams:
+        started = time.perf_counter()
+        message = stream.encoder.encode(enhanced_state)
+        encoded = time.perf_counter()
+        metrics.histogram("flappy_phase_seconds", match=match.match_id, phase="serialize").observe(encoded - started)
+        
+        # Clients that missed deltas while backed up get a keyframe once they catch up
+        resync = lambda sid, stream=stream: socketio.emit('game_state_delta', stream.encoder.keyframe(), to=sid)
+        _count_dropped(match, stream, fanout.emit(stream, 'game_state_delta', message, resync=resync))
+        if message is not None:
+            metrics.histogram("flappy_phase_seconds", match=match.match_id, phase="emit").observe(time.perf_counter() - encoded)
+
+# Helper function to record game frames dropped for clients that couldn't keep up
+def _count_dropped(match, stream, dropped):
+    if dropped:
+        metrics.counter("flappy_dropped_frames_total", match=match.match_id, tier=stream.name).inc(dropped)
 
-# Helper function to enhance game state with player information
-def _enhance_game_state(game_state):
+# Helper function to enhance game state with player information. The result is
+# memoized per game state snapshot, so every reader of one version shares a single build
+def _enhance_game_state(match, game_state):
+    cached = match.enhanced_state
+    if cached is not None and cached[0] is game_state and cached[1] == match.players_version:
+        return cached[2]
+    
+    players_version = match.players_version
     enhanced_state = {
         "game_data": game_state,
         "players_info": {}
     }
     
     # Add player details to the enhanced state
-    for player_id, player_info in players.items():
+    for player_id, player_info in match.players.items():
         # Create default player data
         player_data = {
             "id": player_id,
@@ -147,44 +277,172 @@ def _enhance_game_state(game_state):
             player_data["alive"] = game_state[player_id]["alive"]
         
         enhanced_state["players_info"][player_id] = player_data
-        
+    
+    match.enhanced_state = (game_state, players_version, enhanced_state)
     return enhanced_state
 
+# Helper function to send the current game state of a match to the requesting client
+def _send_current_state(match):
+    # Clients who join after game over still get the final results this way
+    keyframe = match.stream_for(request.sid).encoder.keyframe()
+    if GAME_FRAME_FORMAT == 'binary' and match.last_game_frame is not None:
+        emit('game_roster', match.last_game_roster)
+        emit('game_frame', match.last_game_frame)
+    elif keyframe:
+        emit('game_state_delta', keyframe)
+    else:
+        emit('game_state', {"game_data": match.game_manager.get_game_state(), "players_info": match.players})
+
+# Helper function to send the lobby of a match to everyone in it
+def _send_lobby_update(match, **extra):
+    emit('lobby_update', {
+        'matchId': match.match_id,
+        'players': list(match.players.values()),
+        'spectators': len(match.spectators),
+        **extra
+    }, to=match.room)
+
+# Helper function to move the requesting client into a match (leaving any previous one)
+def _enter_match(match_id):
+    player_id = request.sid
+    match = registry.get(match_id) or registry.create(match_id)
+    
+    current = registry.match_for(player_id)
+    if current is not None and current is not match:
+        _leave_match()
+    
+    registry.assign(player_id, match)
+    join_room(match.room)
+    return match
+
+# Helper function to take the requesting client out of their match
+def _leave_match():
+    player_id = request.sid
+    match = registry.match_for(player_id)
+    if match is None:
+        return
+    
+    # Check if this was a player or spectator
+    was_player = player_id in match.players
+    stream = match.stream_for(player_id)
+    registry.release(player_id)
+    leave_room(match.room)
+    leave_room(stream.room)
+    
+    if was_player:
+        match.game_manager.remove_player(player_id)
+    
+    _send_lobby_update(match)
+    
+    # Send updated enhanced state (unless the match closed because it is now empty)
+    if registry.get(match.match_id) is match:
+        _broadcast_game_state(match, _enhance_game_state(match, match.game_manager.get_game_state()),
+                              (match.player_stream, match.spectator_stream))
+
 @app.route('/')
 def index():
     return render_template('index.html')
 
+@app.route('/stats/scheduler')
+def scheduler_stats():
+    """Tick counts and missed deadlines for every scheduled game loop"""
+    return jsonify(scheduler.stats())
+
+@app.route('/stats/policy')
+def policy_stats():
+    """Batch sizes and inference latency of the shared AI policy server"""
+    return jsonify(get_policy_server().stats())
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """Frame phase timings, tick overruns, match sizes and scheduler/policy stats for Prometheus"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+# Scrape-time metrics read from the registry and the /stats sources
+def _collect_match_metrics():
+    matches = registry.all()
+    return [
+        ("flappy_match_players", "gauge", "Players in each match",
+         [({"match": match.match_id}, len(match.players)) for match in matches]),
+        ("flappy_match_spectators", "gauge", "Spectators in each match",
+         [({"match": match.match_id}, len(match.spectators)) for match in matches]),
+        ("flappy_ai_games", "gauge", "Single-player AI games hosted by this process",
+         [({}, len(registry.all_ai_matches()))]),
+    ]
+
+def _collect_scheduler_metrics():
+    stats = scheduler.stats()
+    families = (
+        ("flappy_scheduler_ticks_total", "counter", "Ticks run by each scheduled task", "ticks", 1),
+        ("flappy_scheduler_missed_deadlines_total", "counter", "Ticks that ran more than one interval late", "missed_deadlines", 1),
+        ("flappy_scheduler_dropped_ticks_total", "counter", "Ticks skipped because a task could not catch up", "dropped_ticks", 1),
+        ("flappy_scheduler_max_lateness_seconds", "gauge", "Worst lateness of any tick of each task", "max_lateness_ms", 0.001),
+    )
+    return [
+        (name, kind, help_text, [({"task": key}, task[field] * scale) for key, task in stats.items()])
+        for name, kind, help_text, field, scale in families
+    ]
+
+def _collect_policy_metrics():
+    stats = get_policy_server().stats()
+    families = [
+        ("flappy_policy_games", "gauge", "AI games served by the policy server", stats["games"]),
+        ("flappy_policy_batches_total", "counter", "Batched forward passes run by the policy server", stats["batches"]),
+    ]
+    if "mean_latency_ms" in stats:
+        families.append(("flappy_policy_batch_size", "gauge", "Mean batch size over recent batches", stats["mean_batch_size"]))
+        families.append(("flappy_policy_p99_latency_seconds", "gauge", "p99 forward pass latency over recent batches", stats["p99_latency_ms"] / 1000))
+    return [(name, kind, help_text, [({}, value)]) for name, kind, help_text, value in families]
+
+metrics.add_collector(_collect_match_metrics)
+metrics.add_collector(_collect_scheduler_metrics)
+metrics.add_collector(_collect_policy_metrics)
+
+# Helper function to start the game loops and broadcasts (does nothing once running)
+def _start_scheduler():
+    if scheduler.running:
+        return
+    
+    # Start broadcasting game state updates (late broadcasts are coalesced, never burst)
+    scheduler.add('broadcast', broadcast_tick, rate=BROADCAST_RATE, max_catchup=1)
+    scheduler.start()
+
 @socketio.on('connect')
 def handle_connect():
-    # Send current game state to the new connection
-    if last_game_state:
-        emit('game_state', last_game_state)
-    else:
-        emit('game_state', {"game_data": game_manager.get_game_state(), "players_info": players})
-        
-    # If game is in progress, send game_started event
-    if game_in_progress:
-        emit('game_started')
+    _start_scheduler()
+    
+    # Tell the new connection which matches it can join
+    emit('match_list', {'matches': registry.list()})
 
 @socketio.on('disconnect')
 def handle_disconnect():
-    player_id = request.sid
-    # Check if this was a player or spectator
-    if player_id in players:
-        del players[player_id]
-        game_manager.remove_player(player_id)
-    elif player_id in spectators:
-        spectators.remove(player_id)
-        
-    emit('lobby_update', {'players': list(players.values()), 'spectators': len(spectators)}, broadcast=True)
-    
-    # Send updated enhanced state
-    game_state = game_manager.get_game_state()
-    enhanced_state = {
-        "game_data": game_state,
-        "players_info": players
-    }
-    emit('game_state', enhanced_state, broadcast=True)
+    _leave_match()
+    registry.release_ai_match(request.sid)
+
+@socketio.on('list_matches')
+def handle_list_matches():
+    """Return all matches hosted by this server"""
+    emit('match_list', {'matches': registry.list()})
+
+@socketio.on('create_match')
+def handle_create_match(data=None):
+    """Create a new match and tell the creator its id"""
+    data = data or {}
+    # An optional world seed replays the same pipes in every game of the match
+    match = registry.create(name=data.get('name'), seed=data.get('seed'))
+    emit('match_created', match.summary())
+
+@socketio.on('request_keyframe')
+def handle_request_keyframe():
+    """Resend the full game state to a client that missed a delta"""
+    match = registry.match_for(request.sid)
+    if match is None:
+        return
+    stream = match.stream_for(request.sid)
+    stream.discard(request.sid)
+    keyframe = stream.encoder.keyframe()
+    if keyframe:
+        emit('game_state_delta', keyframe)
 
 @socketio.on('join_game')
 def handle_join_game(data):
@@ -193,44 +451,52 @@ def handle_join_game(data):
     is_admin = data.get('isAdmin', False)
     is_spectator = data.get('isSpectator', False)
     
+    # Join the requested match (created on demand), or the default one
+    match = _enter_match(data.get('matchId') or DEFAULT_MATCH_ID)
+    
     # Handle spectator join
     if is_spectator:
-        spectators.add(player_id)
-        if game_in_progress:
+        match.spectators.add(player_id)
+        if match.game_in_progress:
             emit('game_started')
     else:
         # Store player info
-        players[player_id] = {
+        match.players[player_id] = {
             'id': player_id,
             'username': username,
             'isAdmin': is_admin
         }
+        match.players_version += 1
     
-    # Send updated lobby info to all clients
-    emit('lobby_update', {
-        'players': list(players.values()), 
-        'spectators': len(spectators),
-        'allPlayersReady': len(players) > 1
-    }, broadcast=True)
+    # Subscribe to the game frames of this tier
+    join_room(match.stream_for(player_id).room)
+    
+    # Send the current game state to the new client
+    _send_current_state(match)
+    
+    # Send updated lobby info to everyone in the match
+    _send_lobby_update(match, allPlayersReady=len(match.players) > 1)
 
 @socketio.on('start_game')
 def handle_start_game():
-    global game_in_progress, last_game_state
     player_id = request.sid
+    match = registry.match_for(player_id)
     
     # Check if request is from an admin
-    if player_id in players and players[player_id]['isAdmin']:
+    if match and player_id in match.players and match.players[player_id]['isAdmin']:
+        game_manager = match.game_manager
+        
         # Reset any previous game state
-        last_game_state = None
+        match.reset_broadcast_state()
         game_manager.reset_game()
         
         # Add all players to the game manager
-        for pid in players:
+        for pid in match.players:
             game_manager.add_player(pid)
         
-        game_in_progress = True
-        # Notify all clients (including spectators) that game has started
-        emit('game_started', broadcast=True)
+        match.game_in_progress = True
+        # Notify everyone in the match (including spectators) that game has started
+        emit('game_started', to=match.room)
         
         # Start the game in GameManager
         game_manager.start_game()
@@ -239,129 +505,129 @@ def handle_start_game():
 def update_position(data):
     player_id = data.get('playerId')
     action = data.get('action')
+    match = registry.match_for(request.sid)
     # Only process if player is in game
-    if player_id in players:
-        game_manager.update_player_action(player_id, action)
+    if match and player_id in match.players:
+        match.game_manager.update_player_action(player_id, action)
+
+@socketio.on('latency_ping')
+def latency_ping():
+    """Acknowledge straight away so clients can measure their round trip time"""
+    return True
 
 @socketio.on('get_all_players')
 def get_all_players():
     """Return information about all players to the requesting client"""
-    game_state = game_manager.get_game_state()
+    match = registry.match_for(request.sid)
+    if match is None:
+        return
     
     # Combine player info with game state
-    players_with_game_data = {}
-    for player_id, player_info in players.items():
-        player_data = {
-            "id": player_id,
-            "username": player_info["username"],
-            "isAdmin": player_info["isAdmin"],
-            "score": 0,
-            "alive": False
-        }
-        
-        # Update with game state if available
-        if player_id in game_state:
-            player_data["score"] = game_state[player_id]["score"]
-            player_data["alive"] = game_state[player_id]["alive"]
-        
-        players_with_game_data[player_id] = player_data
+    players_with_game_data = _enhance_game_state(match, match.game_manager.get_game_state())["players_info"]
     
     emit('all_players_info', {
         'players': players_with_game_data,
-        'spectators': len(spectators)
+        'spectators': len(match.spectators)
     })
 
 @socketio.on('reset_game')
 def reset_game():
-    global game_in_progress, last_game_state
     player_id = request.sid
+    match = registry.match_for(player_id)
     
     # Only admins can reset the game
-    if player_id in players and players[player_id]['isAdmin']:
-        game_manager.reset_game()
-        game_in_progress = False
-        last_game_state = None
+    if match and player_id in match.players and match.players[player_id]['isAdmin']:
+        match.game_manager.reset_game()
+        match.game_in_progress = False
+        match.reset_broadcast_state()
         
-        # Notify all clients that the game has been reset
-        emit('game_reset', broadcast=True)
+        # Notify everyone in the match that the game has been reset
+        emit('game_reset', to=match.room)
 
 @socketio.on('spectate_game')
-def spectate_game():
-    """Allow a user to spectate the current game without participating"""
+def spectate_game(data=None):
+    """Allow a user to spectate a game without participating"""
     player_id = request.sid
+    data = data or {}
+    current = registry.match_for(player_id)
     
     # Add to spectators if not already a player
-    if player_id not in players:
-        spectators.add(player_id)
+    if current is None or player_id not in current.players:
+        match = _enter_match(data.get('matchId') or (current.match_id if current else DEFAULT_MATCH_ID))
+        match.spectators.add(player_id)
+        join_room(match.spectator_stream.room)
         
         # If game is in progress, send game_started event to the spectator
-        if game_in_progress:
+        if match.game_in_progress:
             emit('game_started')
+        _send_current_state(match)
         
         # Update lobby info
-        emit('lobby_update', {
-            'players': list(players.values()), 
-            'spectators': len(spectators)
-        }, broadcast=True)
+        _send_lobby_update(match)
 
 @socketio.on('toggle_test_mode')
 def toggle_test_mode(data):
     player_id = request.sid
     enabled = data.get('enabled')
+    match = registry.match_for(player_id)
     
     # Only admins can toggle test mode
-    if player_id in players and players[player_id]['isAdmin']:
+    if match and player_id in match.players and match.players[player_id]['isAdmin']:
         # Toggle test mode in game manager
-        game_manager.set_test_mode(enabled)
+        match.game_manager.set_test_mode(enabled)
         
-        # Notify all clients about the test mode status
+        # Notify everyone in the match about the test mode status
         emit('test_mode_status', {
             'enabled': enabled
-        }, broadcast=True)
+        }, to=match.room)
 
 @socketio.on('start_ai_game')
 def handle_start_ai_game(data):
     """Start a single-player game against AI"""
-    global ai_game_in_progress, last_ai_game_state
     player_id = request.sid
     username = data.get('username', f'Player_{player_id[:5]}')
+    ai_match = registry.ai_match_for(player_id, create=True)
     
     # Reset previous AI game
-    last_ai_game_state = None
-    single_player_manager.reset_game()
+    ai_match.reset_broadcast_state()
+    ai_match.manager.reset_game()
+    
+    # Start the AI game (refused when the AI model couldn't be loaded)
+    if not ai_match.manager.start_game():
+        emit('ai_game_error', {'message': 'The AI opponent is not available right now'})
+        return
     
     # Mark AI game as in progress
-    ai_game_in_progress = True
+    ai_match.game_in_progress = True
     
     # Notify player that AI game has started
     emit('ai_game_started')
-    
-    # Start the AI game
-    single_player_manager.start_game()
 
 @socketio.on('update_ai_position')
 def update_ai_position(data):
     """Update player position in AI game"""
     action = data.get('action', 0)
-    single_player_manager.update_player_action(action)
+    ai_match = registry.ai_match_for(request.sid)
+    if ai_match:
+        ai_match.manager.update_player_action(action)
 
 @socketio.on('reset_ai_game')
 def reset_ai_game():
     """Reset the AI game"""
-    global ai_game_in_progress, last_ai_game_state
-    
-    single_player_manager.reset_game()
-    ai_game_in_progress = False
-    last_ai_game_state = None
+    ai_match = registry.ai_match_for(request.sid)
+    if ai_match:
+        ai_match.manager.reset_game()
+        ai_match.game_in_progress = False
+        ai_match.reset_broadcast_state()
     
     # Notify client that game has been reset
     emit('ai_game_reset')
 
 if __name__ == '__main__':
-    # Start background thread for game state updates
-    state_thread = threading.Thread(target=game_state_updater)
-    state_thread.daemon = True
-    state_thread.start()
-    
     # Start the Flask app
-    socketio.run(app, host='0.0.0.0', port=8000, debug=True, allow_unsafe_werkzeug=True)
\ No newline at end of file
+    if ASYNC_MODE == 'eventlet':
+        # eventlet's own WSGI server, without the debugger and reloader
+        socketio.run(app, host='0.0.0.0', port=8000)
+    else:
+        # Werkzeug development server
+        socketio.run(app, host='0.0.0.0', port=8000, debug=True, allow_unsafe_werkzeug=True)
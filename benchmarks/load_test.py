@@ -0,0 +1,372 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+import numpy as np
+
+# Socket.IO load generator: N headless bot clients against a running app.py.
+#
+#   python app.py                                       # on the server under test
+#   python benchmarks/load_test.py --clients 500 --duration 60
+#   python benchmarks/load_test.py --url http://host:8000 --clients 200 --spectators 50 --pattern interval
+#
+# The first bot creates a fresh match (or joins --match) as its admin, every bot
+# joins it, and once all have joined the admin starts the game. Test mode is on by
+# default so birds respawn and the lobby stays at full size for the whole run.
+# While the game runs each bot flaps following a pattern: 'gap' steers for the next
+# pipe gap using the states it receives, 'interval' flaps on a jittered schedule.
+#
+# Input latency is the time from emitting a flap to receiving the first state in
+# which that bird is rising. A bot only flaps while its bird is falling and waits
+# for each flap to show up (or time out) before the next, so every sample is one
+# unambiguous flap. The latency includes waiting for the next broadcast, i.e. up
+# to one broadcast interval (100 ms at BROADCAST_RATE = 10). 'gap' bots react to
+# the state they just received, so they flap right after a broadcast and measure
+# close to a full interval; 'interval' bots flap at random phases. Flaps from birds
+# that die before the flap lands show up as lost.
+#
+# Byte counts are message payloads (JSON as Socket.IO serializes it, or the binary
+# frame), without the Engine.IO/WebSocket framing.
+#
+# Needs the asyncio client: pip install "python-socketio[asyncio_client]"
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+from state_delta import apply_patch
+import snapshot_codec
+
+PLAYER_X = 50  # Every bird flies in the same column (MultiplayerFlappyEnv.player_x)
+PLAYER_HEIGHT = 24
+PIPE_WIDTH = 52
+FLAP_TIMEOUT = 1.0  # Seconds (10 broadcasts) before an unconfirmed flap counts as lost
+
+def _payload_size(data):
+    """Bytes of one message payload as it goes over the wire."""
+    if isinstance(data, (bytes, bytearray)):
+        return len(data)
+    return len(json.dumps(data, separators=(',', ':')))
+
+def _percentiles(values, points=(50, 90, 99)):
+    if not values:
+        return {}
+    array = np.asarray(values) * 1000
+    result = {f"p{point}_ms": round(float(np.percentile(array, point)), 2) for point in points}
+    result["max_ms"] = round(float(array.max()), 2)
+    return result
+
+class LoadStats:
+    """Counters shared by every bot (all bots run on one event loop, so no locking)."""
+    def __init__(self):
+        self.connect_times = []
+        self.connect_failures = 0
+        self.received = {}  # {event: [messages, bytes]}  (server egress)
+        self.sent = {}  # {event: [messages, bytes]}  (server ingress)
+        self.input_latencies = []
+        self.lost_inputs = 0
+        self.keyframe_requests = 0
+        self.started_at = None
+
+    def count(self, table, event, data):
+        entry = table.setdefault(event, [0, 0])
+        entry[0] += 1
+        entry[1] += _payload_size(data)
+
+    def report(self, elapsed):
+        """Build the summary as a JSON-friendly dict."""
+        def throughput(table):
+            messages = sum(entry[0] for entry in table.values())
+            size = sum(entry[1] for entry in table.values())
+            return {
+                "messages": messages,
+                "bytes": size,
+                "messages_per_s": round(messages / elapsed, 1),
+                "bytes_per_s": round(size / elapsed),
+                "by_event": {event: {"messages": entry[0], "bytes": entry[1]} for event, entry in sorted(table.items())},
+            }
+
+        return {
+            "duration_s": round(elapsed, 2),
+            "connections": {
+                "ok": len(self.connect_times),
+                "failed": self.connect_failures,
+                **_percentiles(self.connect_times),
+            },
+            "egress": throughput(self.received),  # Server -> clients
+            "ingress": throughput(self.sent),  # Clients -> server
+            "input_latency": {
+                "samples": len(self.input_latencies),
+                "lost": self.lost_inputs,
+                **_percentiles(self.input_latencies),
+            },
+            "keyframe_requests": self.keyframe_requests,
+        }
+
+class Bot:
+    """One headless client: joins the match, follows its own bird and flaps."""
+    def __init__(self, index, args, stats):
+        import socketio
+        self.index = index
+        self.args = args
+        self.stats = stats
+        self.rng = random.Random(args.seed * 100003 + index)
+        self.sio = socketio.AsyncClient(reconnection=False)
+        self.sid = None
+        self.spectator = index >= args.clients
+        self.game_started = asyncio.Event()
+        self.match_created = asyncio.get_running_loop().create_future()
+
+        # Latest view of the game
+        self.synced_state = None  # JSON mode, patched by deltas
+        self.seq = None
+        self.roster = None  # Binary mode slot mapping
+        self.pipes = []  # [(x, lower_y)]
+        self.bird = None  # (y, velocity or None, alive)
+        self.countdown = True
+        self.rising = False
+
+        self.pending_flap = None  # perf_counter time of the flap we are waiting to see
+        self.next_flap = 0.0  # Earliest time for the next interval flap
+
+        for event, handler in (
+            ('game_state_delta', self.on_game_state_delta),
+            ('game_state', self.on_game_state),
+            ('game_roster', self.on_game_roster),
+            ('game_frame', self.on_game_frame),
+            ('game_started', self.on_game_started),
+            ('match_created', self.on_match_created),
+        ):
+            self.sio.on(event, self._counted(event, handler))
+
+    def _counted(self, event, handler):
+        async def wrapper(data=None):
+            self.stats.count(self.stats.received, event, data if data is not None else {})
+            await handler(data)
+        return wrapper
+
+    async def emit(self, event, data=None):
+        self.stats.count(self.stats.sent, event, data if data is not None else {})
+        await self.sio.emit(event, data)
+
+    async def connect(self):
+        start = time.perf_counter()
+        try:
+            await self.sio.connect(self.args.url, transports=['websocket'])
+        except Exception as e:
+            self.stats.connect_failures += 1
+            print(f"Bot {self.index} failed to connect: {e}")
+            return False
+        self.stats.connect_times.append(time.perf_counter() - start)
+        self.sid = self.sio.get_sid()
+        return True
+
+    async def join(self, match_id, admin=False):
+        await self.emit('join_game', {
+            'username': f"{'Spectator' if self.spectator else 'Bot'}_{self.index}",
+            'isAdmin': admin,
+            'isSpectator': self.spectator,
+            'matchId': match_id,
+        })
+
+    # Incoming messages
+
+    async def on_match_created(self, summary):
+        if not self.match_created.done():
+            self.match_created.set_result(summary['id'])
+
+    async def on_game_started(self, _):
+        self.game_started.set()
+
+    async def on_game_state(self, enhanced_state):
+        self.synced_state = enhanced_state
+        self._observe_json(enhanced_state)
+        await self.act()
+
+    async def on_game_state_delta(self, message):
+        if message['type'] == 'keyframe':
+            self.synced_state = message['state']
+        elif self.synced_state is None or message['base'] != self.seq:
+            # Missed a delta - same recovery as the browser client
+            self.synced_state = None
+            self.stats.keyframe_requests += 1
+            await self.emit('request_keyframe')
+            return
+        else:
+            apply_patch(self.synced_state, message['patch'])
+        self.seq = message['seq']
+        self._observe_json(self.synced_state)
+        await self.act()
+
+    async def on_game_roster(self, roster):
+        self.roster = roster
+
+    async def on_game_frame(self, data):
+        if self.roster is None or self.sid not in self.roster['slots']:
+            return
+        frame = snapshot_codec.decode_frame(data)
+        self.countdown = frame['countdown_active']
+        self.pipes = list(zip(frame['pipes']['x'].tolist(), frame['pipes']['lower_y'].tolist()))
+        players = frame['players']
+        index = np.flatnonzero(players['slot'] == self.roster['slots'][self.sid])
+        if len(index):
+            y = float(players['y'][index[0]])
+            # Frames carry no velocity: the bird is rising if it moved up since the last frame
+            self.rising = self.bird is not None and y < self.bird[0]
+            self.bird = (y, None, bool(players['alive'][index[0]]))
+        await self.act()
+
+    def _observe_json(self, enhanced_state):
+        game_state = enhanced_state.get('game_data', {})
+        metadata = game_state.get('_metadata', {})
+        self.countdown = metadata.get('countdown', {}).get('active', True)
+        pipes = metadata.get('game_data', {}).get('pipes', [])
+        self.pipes = [(pipe['x'], pipe['lower_y']) for pipe in pipes]
+        me = game_state.get(self.sid)
+        if me is not None:
+            position = me['position']
+            self.rising = position['velocity'] < 0
+            self.bird = (position['y'], position['velocity'], me['alive'])
+
+    # Flapping
+
+    async def act(self, timer=False):
+        """
+        Called for every received state (and every 20 ms by the interval timer):
+        confirm a pending flap, then maybe flap. 'gap' bots decide when a state
+        arrives, 'interval' bots only from the timer so their flaps don't line up
+        with the broadcasts.
+        """
+        if self.spectator or self.bird is None:
+            return
+        now = time.perf_counter()
+
+        if self.pending_flap is not None:
+            if self.rising:
+                self.stats.input_latencies.append(now - self.pending_flap)
+                self.pending_flap = None
+            elif now - self.pending_flap > FLAP_TIMEOUT:
+                self.stats.lost_inputs += 1
+                self.pending_flap = None
+            else:
+                return
+
+        y, _, alive = self.bird
+        if self.countdown or not alive or self.rising or not self.game_started.is_set():
+            return
+
+        if self.args.pattern == 'interval':
+            flap = timer and now >= self.next_flap
+        elif timer:
+            return
+        else:
+            # Steer for the next pipe gap: flap when the bird nears its bottom edge
+            ahead = [lower_y for x, lower_y in self.pipes if x + PIPE_WIDTH > PLAYER_X]
+            bottom = ahead[0] if ahead else 300
+            flap = y + PLAYER_HEIGHT > bottom - 20 - self.rng.uniform(0, 15)
+
+        if flap:
+            self.pending_flap = now
+            self.next_flap = now + self.args.flap_interval * self.rng.uniform(0.5, 1.5)
+            await self.emit('update_position', {'playerId': self.sid, 'action': 1})
+
+    async def close(self):
+        try:
+            await self.sio.disconnect()
+        except Exception:
+            pass
+
+async def run(args):
+    stats = LoadStats()
+    total = args.clients + args.spectators
+    bots = [Bot(i, args, stats) for i in range(total)]
+    admin = bots[0]
+
+    # The admin creates the match (unless one was given) and joins first
+    if not await admin.connect():
+        print("Admin bot could not connect - is the server running?")
+        await admin.close()
+        return None
+    match_id = args.match
+    if match_id is None:
+        await admin.emit('create_match', {'name': 'Load test', 'seed': args.seed})
+        match_id = await asyncio.wait_for(admin.match_created, timeout=10)
+    await admin.join(match_id, admin=True)
+    print(f"Match {match_id}: connecting {args.clients} players and {args.spectators} spectators...")
+
+    # Ramp up the rest at --ramp connections per second
+    async def connect_and_join(bot, delay):
+        await asyncio.sleep(delay)
+        if await bot.connect():
+            await bot.join(match_id)
+
+    await asyncio.gather(*(connect_and_join(bot, i / args.ramp) for i, bot in enumerate(bots[1:])))
+    print(f"Connected {len(stats.connect_times)}/{total} clients")
+
+    if args.test_mode:
+        await admin.emit('toggle_test_mode', {'enabled': True})
+    await admin.emit('start_game')
+    try:
+        await asyncio.wait_for(admin.game_started.wait(), timeout=10)
+    except asyncio.TimeoutError:
+        print("The game did not start")
+
+    # Reset the counters so the report only covers the running game
+    stats.received.clear()
+    stats.sent.clear()
+    stats.started_at = time.perf_counter()
+
+    interval_task = None
+    if args.pattern == 'interval':
+        # Interval bots also flap between broadcasts, not only when a state arrives
+        async def tick_interval_bots():
+            while True:
+                await asyncio.sleep(0.02)
+                await asyncio.gather(*(bot.act(timer=True) for bot in bots if bot.sid))
+        interval_task = asyncio.create_task(tick_interval_bots())
+
+    deadline = stats.started_at + args.duration
+    while time.perf_counter() < deadline:
+        await asyncio.sleep(min(args.report_every, deadline - time.perf_counter()))
+        elapsed = time.perf_counter() - stats.started_at
+        summary = stats.report(elapsed)
+        print(f"[{elapsed:6.1f}s] egress {summary['egress']['bytes_per_s'] / 1e6:.2f} MB/s, "
+              f"ingress {summary['ingress']['messages_per_s']:.0f} msg/s, "
+              f"input latency p50 {summary['input_latency'].get('p50_ms', '-')} ms "
+              f"p99 {summary['input_latency'].get('p99_ms', '-')} ms")
+
+    if interval_task:
+        interval_task.cancel()
+    elapsed = time.perf_counter() - stats.started_at
+    await asyncio.gather(*(bot.close() for bot in bots))
+    return stats.report(elapsed)
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless Socket.IO bot clients for load testing app.py")
+    parser.add_argument("--url", default="http://localhost:8000", help="server to test")
+    parser.add_argument("--clients", type=int, default=50, help="number of player bots")
+    parser.add_argument("--spectators", type=int, default=0, help="number of spectator clients")
+    parser.add_argument("--match", help="join this match instead of creating a new one")
+    parser.add_argument("--duration", type=float, default=30, help="seconds of gameplay to measure")
+    parser.add_argument("--ramp", type=float, default=50, help="new connections per second")
+    parser.add_argument("--pattern", choices=("gap", "interval"), default="gap", help="how bots decide to flap")
+    parser.add_argument("--flap-interval", type=float, default=0.5, help="mean seconds between flaps for --pattern interval")
+    parser.add_argument("--no-test-mode", dest="test_mode", action="store_false", help="let birds die instead of respawning")
+    parser.add_argument("--seed", type=int, default=0, help="world seed and bot jitter seed")
+    parser.add_argument("--report-every", type=float, default=5, help="seconds between progress lines")
+    parser.add_argument("--output", help="write the final report as JSON here")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    if report is None:
+        return 1
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,301 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import numpy as np
+
+# Headless benchmarks for the simulation and broadcast hot paths.
+#
+# Every case runs with synthetic players on a fixed world seed and a simulated
+# clock, so two runs do the same work. Results go to a JSON file and are compared
+# with a stored baseline; a case that got slower (or a payload that grew) by more
+# than the tolerance is reported as a regression and the exit code is 1.
+#
+#   python benchmarks/run.py                      # run, write results, compare with baseline.json
+#   python benchmarks/run.py --quick              # fewer players and repeats, for a smoke test
+#   python benchmarks/run.py --only world_step    # cases whose name starts with a prefix
+#   python benchmarks/run.py --save-baseline      # accept the current numbers as the new baseline
+#
+# Timings are per call, the best of many short rounds (the least noisy statistic on
+# a shared machine), and the whole suite runs --rounds times keeping each metric's
+# best value, so a slow spell on the host can't skew every sample of one case.
+# Baselines only make sense on the machine they were recorded on.
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path[:0] = [ROOT, os.path.join(ROOT, 'environments')]
+
+from flappy_env import MultiplayerFlappyEnv
+from tick_scheduler import SimulatedClock, TickScheduler
+from game_manager import GameManager
+from state_delta import StateDeltaEncoder
+from policy_server import NumpyDQN
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'baseline.json')
+RESULTS_PATH = os.path.join(os.path.dirname(__file__), 'results', 'latest.json')
+
+WORLD_SEED = 1234
+PIPE_GAP = 130  # Same as GameManager
+PLAYER_COUNTS = (1, 10, 100, 1000)
+QUICK_PLAYER_COUNTS = (1, 10, 100)
+
+def best_time(run, number, repeat, before_each=None):
+    """
+    Best per-call time in seconds of `run()` over `repeat` rounds of `number` calls.
+    `before_each()` runs ahead of every call, outside the timed region.
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        if before_each is None:
+            start = time.perf_counter()
+            for _ in range(number):
+                run()
+            elapsed = time.perf_counter() - start
+        else:
+            elapsed = 0.0
+            for _ in range(number):
+                before_each()
+                start = time.perf_counter()
+                run()
+                elapsed += time.perf_counter() - start
+        best = min(best, elapsed / number)
+    return best
+
+def _flap_bots(env, respawn=False):
+    """
+    Synthetic players: flap when about to drop below the next pipe gap. The gap is
+    often too far from the last one to make, so with respawn=True dead birds are put
+    back inside the gap and every tick steps every player.
+    """
+    players = env.players
+    count = players.size
+    x, _, lower_y = env.pipes.views()
+    ahead = np.flatnonzero(x + 52 > env.player_x)  # 52 = pipe width
+    bottom = lower_y[ahead[0]] if len(ahead) else env.screen_height / 2
+    if respawn:
+        dead = ~players.alive[:count]
+        players.y[:count][dead] = bottom - env.player_height - 40
+        players.vel_y[:count][dead] = 0
+        players.alive[:count] = True
+    # Flap as late as possible: when the next fall step would reach the bottom of the
+    # gap (a flap only climbs ~100 px, the gap is 130). Margins are spread over a few
+    # pixels so the birds don't all move in lockstep
+    margin = 2 + np.arange(count) % 4
+    next_y = players.y[:count] + np.minimum(players.vel_y[:count] + env.gravity, env.max_vel_y)
+    players.action[:count] = next_y + env.player_height > bottom - margin
+
+def _make_world(players):
+    """A MultiplayerFlappyEnv with `players` birds, past its countdown."""
+    clock = SimulatedClock()
+    env = MultiplayerFlappyEnv(pipe_gap=PIPE_GAP, countdown_seconds=0, seed=WORLD_SEED, clock=clock)
+    for i in range(players):
+        env.add_player(f"bot-{i}")
+    clock.advance(1)
+    return env
+
+def bench_world_step(results, counts, quick):
+    """step_world plus all players per tick: the vectorized path the server runs, and the per-player one."""
+    for players in counts:
+        env = _make_world(players)
+
+        def vectorized_tick():
+            env.step_world()
+            env.step_all_players(observe=False)
+
+        seconds = best_time(vectorized_tick, number=50, repeat=10 if quick else 30,
+                            before_each=lambda: _flap_bots(env, respawn=True))
+        results[f"world_step.vectorized[{players}]"] = _timing(seconds)
+        results[f"world_step.vectorized[{players}].player_steps_per_s"] = {
+            "value": round(players / seconds), "unit": "1/s", "better": "higher"}
+
+        # step_player also builds an observation for every player
+        if players > (100 if quick else 1000):
+            continue
+        ids = list(env.players)
+
+        def per_player_tick():
+            env.step_world()
+            for player_id in ids:
+                env.step_player(player_id)
+
+        number = max(5, 2000 // players)
+        seconds = best_time(per_player_tick, number=number, repeat=3,
+                            before_each=lambda: _flap_bots(env, respawn=True))
+        results[f"world_step.per_player[{players}]"] = _timing(seconds)
+
+def _make_game(players):
+    """A running GameManager with `players` synthetic players, a second into the game."""
+    scheduler = TickScheduler.simulated()
+    game_manager = GameManager(scheduler=scheduler, seed=WORLD_SEED, match_id="benchmark")
+    for i in range(players):
+        game_manager.add_player(f"bot-{i}")
+    game_manager.set_test_mode(True)  # Nobody dies, so every state carries every player
+    game_manager.start_game()
+    scheduler.add("bots", lambda: _flap_bots(game_manager.env), rate=game_manager.frame_rate)
+    scheduler.run_for(game_manager.countdown_seconds + 1)
+    return scheduler, game_manager
+
+def bench_game_state(results, counts, quick):
+    """Snapshot and enhanced state build times, and what a tick costs on the wire."""
+    from match_registry import Match
+    from app import _enhance_game_state
+
+    for players in counts:
+        scheduler, game_manager = _make_game(players)
+        repeat = 3 if quick else 7
+
+        def build_state():
+            game_manager.state_version += 1  # Force a fresh snapshot instead of the cached one
+            game_manager.get_game_state()
+
+        results[f"game_state.build[{players}]"] = _timing(best_time(build_state, number=200, repeat=repeat))
+
+        match = Match("benchmark")
+        match.players = {
+            player_id: {"id": player_id, "username": f"Player {player_id}", "isAdmin": False}
+            for player_id in game_manager.players
+        }
+        game_state = game_manager.get_game_state()
+
+        def enhance_state():
+            match.enhanced_state = None  # Skip the per-snapshot memo
+            _enhance_game_state(match, game_state)
+
+        results[f"game_state.enhance[{players}]"] = _timing(best_time(enhance_state, number=200, repeat=repeat))
+
+        # Payload sizes, serialized the way Socket.IO sends them. Ticks are one
+        # broadcast interval (10 Hz) apart, as in app.py
+        encoder = StateDeltaEncoder(keyframe_interval=match.player_stream.encoder.keyframe_interval)
+        keyframe_bytes = delta_bytes = deltas = frame_bytes = 0
+        for seq in range(1, 51):
+            scheduler.run_for(0.1)
+            match.enhanced_state = None
+            message = encoder.encode(_enhance_game_state(match, game_manager.get_game_state()))
+            size = len(json.dumps(message, separators=(',', ':'))) if message is not None else 0
+            if seq == 1:
+                keyframe_bytes = size
+            elif message is not None and message.get("type") == "delta":
+                delta_bytes += size
+                deltas += 1
+            frame_bytes += len(game_manager.encode_frame(seq))
+        results[f"payload.keyframe_json[{players}]"] = _size(keyframe_bytes)
+        results[f"payload.delta_json[{players}]"] = _size(delta_bytes // max(deltas, 1))
+        results[f"payload.binary_frame[{players}]"] = _size(frame_bytes // 50)
+        game_manager.stop_game()
+
+def bench_policy(results, quick):
+    """NumPy DQN forward pass latency at the batch sizes the policy server sees."""
+    model = NumpyDQN(12, 2)
+    rng = np.random.default_rng(WORLD_SEED)
+    for batch_size in (1, 32, 256):
+        batch = rng.standard_normal((batch_size, 12)).astype(np.float32)
+        seconds = best_time(lambda: model.q_values(batch).argmax(axis=1), number=500, repeat=3 if quick else 7)
+        results[f"policy.dqn_forward[{batch_size}]"] = _timing(seconds)
+
+def _timing(seconds):
+    return {"value": round(seconds * 1e6, 3), "unit": "us", "better": "lower"}
+
+def _size(size):
+    return {"value": int(size), "unit": "bytes", "better": "lower"}
+
+def merge_best(results, current):
+    """Keep the best value of every metric seen so far."""
+    for name, result in current.items():
+        previous = results.get(name)
+        if previous is None:
+            results[name] = result
+        elif result["better"] == "lower" and result["value"] < previous["value"]:
+            results[name] = result
+        elif result["better"] == "higher" and result["value"] > previous["value"]:
+            results[name] = result
+
+def compare(results, baseline, tolerance, size_tolerance):
+    """Compare results with a baseline. Returns the list of regression messages."""
+    regressions = []
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            print(f"  {name:48s} {result['value']:>14,} {result['unit']:5s} (new)")
+            continue
+
+        old, new = previous["value"], result["value"]
+        change = (new - old) / old if old else 0.0
+        # Sizes only vary by a few digits (timestamps, countdown), timings by much more
+        allowed = size_tolerance if result["unit"] == "bytes" else tolerance
+        worse = change > allowed if result["better"] == "lower" else change < -allowed
+        marker = "REGRESSION" if worse else ""
+        print(f"  {name:48s} {new:>14,} {result['unit']:5s} {change:+8.1%} {marker}")
+        if worse:
+            regressions.append(f"{name}: {old} -> {new} {result['unit']} ({change:+.1%})")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the simulation and broadcast hot paths")
+    parser.add_argument("--quick", action="store_true", help="fewer players and repeats")
+    parser.add_argument("--only", help="only run cases whose name starts with this prefix")
+    parser.add_argument("--output", default=RESULTS_PATH, help="where to write the results JSON")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="baseline JSON to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown before a timing counts as a regression")
+    parser.add_argument("--size-tolerance", type=float, default=0.02, help="allowed payload growth before it counts as a regression")
+    parser.add_argument("--rounds", type=int, default=None, help="times to run the whole suite (default 3, 1 with --quick)")
+    args = parser.parse_args()
+
+    counts = QUICK_PLAYER_COUNTS if args.quick else PLAYER_COUNTS
+    rounds = args.rounds or (1 if args.quick else 3)
+    results = {}
+    for round_index in range(rounds):
+        current = {}
+        suites = (
+            ("world_step", lambda: bench_world_step(current, counts, args.quick)),
+            ("game_state", lambda: bench_game_state(current, counts, args.quick)),
+            ("policy", lambda: bench_policy(current, args.quick)),
+        )
+        for name, suite in suites:
+            if args.only and not (name.startswith(args.only) or args.only.startswith(name)):
+                continue
+            print(f"Running {name} (round {round_index + 1}/{rounds})...")
+            suite()
+        merge_best(results, current)
+    if args.only and args.only not in ("world_step", "game_state", "policy"):
+        # A single case rather than a whole suite
+        results = {name: result for name, result in results.items() if name.startswith(args.only)}
+
+    report = {
+        "machine": {"python": platform.python_version(), "numpy": np.__version__,
+                    "platform": platform.platform(), "processor": platform.processor()},
+        "quick": args.quick,
+        "results": results,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline} - run with --save-baseline to record one")
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline.get("quick") != args.quick:
+        print("Note: baseline and this run used different --quick settings")
+
+    print(f"Compared with {args.baseline}:")
+    regressions = compare(results, baseline["results"], args.tolerance, args.size_tolerance)
+    if regressions:
+        print(f"{len(regressions)} regression(s):")
+        for message in regressions:
+            print(f"  {message}")
+        return 1
+    print("No regressions")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
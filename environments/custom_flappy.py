@@ -1,18 +1,22 @@
 from flappy_bird_gymnasium.envs.flappy_bird_env import FlappyBirdEnv
-import random
 import time
+from pipe_sequence import PipeSequence
 
 class CustomFlappyBirdEnv(FlappyBirdEnv):
     """Custom FlappyBird environment with random pipe heights and fixed gap."""
     
-    def __init__(self, pipe_gap=100, render_mode=None, countdown_seconds=3):
+    def __init__(self, pipe_gap=100, render_mode=None, countdown_seconds=3, seed=None, clock=None):
         super().__init__(render_mode=render_mode)
         # Override the pipe gap with our custom value
         self._pipe_gap_size = pipe_gap
+        # Pipe heights come from a seeded, precomputed sequence (see pipe_sequence.py)
+        self.pipe_sequence = PipeSequence(pipe_gap=pipe_gap, screen_height=self._screen_height, seed=seed)
         # Initialize the pipe width attribute to match the parent class
         self._pipe_width = 52  # Standard pipe width in Flappy Bird
         
-        # Countdown timer properties
+        # Countdown timer properties. `clock` returns the current time in seconds
+        # (a SimulatedClock makes the countdown run on virtual time)
+        self._clock = clock or time.time
         self._countdown_seconds = countdown_seconds
         self._countdown_start_time = 0
         self._in_countdown = False
@@ -21,26 +25,8 @@ class CustomFlappyBirdEnv(FlappyBirdEnv):
         print(f"Initialized CustomFlappyBirdEnv with pipe gap: {self._pipe_gap_size}")
     
     def _get_pipe_pos(self):
-        """Generate random pipe position with fixed gap directly in the correct position."""
-        # Constants for reliable pipe generation
-        min_pipe_height = 60  # Minimum height for any pipe
-        ground_y = self._screen_height - 112  # Typical ground position
-        screen_height = self._screen_height
-        
-        # Calculate maximum valid upper pipe height to ensure gap fits
-        max_upper_pipe_height = screen_height - self._pipe_gap_size - min_pipe_height - 100  # 100px buffer from ground
-        max_upper_pipe_height = max(max_upper_pipe_height, min_pipe_height + 50)  # Ensure sufficient range
-        
-        # Generate random height for upper pipe within valid range
-        upper_pipe_height = random.randint(min_pipe_height, int(max_upper_pipe_height))
-        
-        # Calculate lower pipe position to ensure EXACTLY the fixed gap
-        lower_pipe_y = upper_pipe_height + self._pipe_gap_size
-        
-        # Final safety check to ensure pipes fit on screen
-        if lower_pipe_y + min_pipe_height > ground_y:
-            upper_pipe_height = ground_y - self._pipe_gap_size - min_pipe_height
-            lower_pipe_y = upper_pipe_height + self._pipe_gap_size
+        """Get the next pipe pair from the seeded pipe sequence, with the fixed gap."""
+        upper_pipe_height, lower_pipe_y = self.pipe_sequence.next()
         
         # Create the pipes with correct position
         x_position = self._screen_width + 10  # Starting beyond right edge of screen
@@ -55,13 +41,16 @@ class CustomFlappyBirdEnv(FlappyBirdEnv):
             "y": lower_pipe_y
         }
         
-        # Log the generated pipe positions for verification
-        print(f"Generated pipe - Upper height: {upper_pipe_height}, Lower y: {lower_pipe_y}, Gap: {self._pipe_gap_size}")
-        
         return upper_pipe, lower_pipe
         
     def reset(self, seed=None, options=None):
-        """Reset the environment and use our custom pipe position generator."""
+        """
+        Reset the environment and use our custom pipe position generator.
+        Passing a seed restarts the pipe sequence from that seed, so the same seed
+        always lays out the same world.
+        """
+        if seed is not None:
+            self.pipe_sequence.reseed(seed)
         observation, info = super().reset(seed=seed, options=options)
         
         # Clear existing pipes and add new ones with our custom positions
@@ -197,7 +186,7 @@ class CustomFlappyBirdEnv(FlappyBirdEnv):
         
     def start_countdown(self):
         """Start the countdown timer."""
-        self._countdown_start_time = time.time()
+        self._countdown_start_time = self._clock()
         self._in_countdown = True
         self._countdown_remaining = self._countdown_seconds
         print(f"Starting {self._countdown_seconds} second countdown")
@@ -208,7 +197,7 @@ class CustomFlappyBirdEnv(FlappyBirdEnv):
             return 0  # Countdown not active
             
         # Calculate remaining time
-        elapsed = time.time() - self._countdown_start_time
+        elapsed = self._clock() - self._countdown_start_time
         remaining = max(0, self._countdown_seconds - elapsed)
         self._countdown_remaining = remaining
         
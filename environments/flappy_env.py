@@ -1,5 +1,8 @@
-import copy
+import bisect
+import numpy as np
 from custom_flappy import CustomFlappyBirdEnv
+from pipe_ring import PipeRing
+from player_table import PlayerTable
 
 class MultiplayerFlappyEnv:
     """
@@ -8,31 +11,49 @@ class MultiplayerFlappyEnv:
     gymnasium interface for future RL integration.
     
     Each player has their own bird position but shares the same pipes and obstacles.
+    Observations are the 12-feature FlappyBirdEnv(use_lidar=False) ones (next three
+    pipes, then the bird's y, velocity and rotation, normalized), built from the
+    pipe ring and the player table like VectorFlappyEnv does.
     """
-    def __init__(self, pipe_gap=100, render_mode=None, countdown_seconds=3):
-        """Initialize the multiplayer environment with custom pipe gap."""
+    NUM_PIPES = 3  # The observation describes the next three pipes
+
+    def __init__(self, pipe_gap=100, render_mode=None, countdown_seconds=3, players=None, seed=None, clock=None):
+        """
+        Initialize the multiplayer environment with custom pipe gap.
+        Pass a shared PlayerTable as `players` to keep bird state in the caller's table.
+        The world (every pipe height) is generated from `seed`; a random seed is
+        picked when None, and is available as self.seed to replay the world.
+        `clock` drives the countdown (wall time by default; pass a SimulatedClock
+        for headless fast-forward runs).
+        """
         # Create the base environment that we'll use to manage the shared world
-        self.base_env = CustomFlappyBirdEnv(pipe_gap=pipe_gap, render_mode=render_mode, countdown_seconds=countdown_seconds)
-        
-        # Reset base environment to initialize everything
-        self.reset()
+        self.base_env = CustomFlappyBirdEnv(pipe_gap=pipe_gap, render_mode=render_mode,
+                                            countdown_seconds=countdown_seconds, seed=seed, clock=clock)
+        self.seed = self.base_env.pipe_sequence.seed
         
-        # These variables will track player-specific state
-        self.player_positions = {}  # {player_id: {'x', 'y', 'vel_y', 'rot'}}
-        self.player_scores = {}     # {player_id: score}
-        self.player_alive = {}      # {player_id: True/False}
-        self.player_actions = {}    # {player_id: last_action}
-        
-        # Track the current active player for step execution
-        self.current_player = None
+        # Shared pipes live in a small fixed-capacity ring that step_world updates in place
+        self.pipes = PipeRing(capacity=3)
+        self.pipe_speed = 5  # pixels per frame
+        self.min_pipe_spacing = 300  # Minimum horizontal distance between pipes
         
         # Constants from the base environment
+        self.player_x = 50  # Fixed x position for all birds
         self.player_width = 34
         self.player_height = 24
         self.gravity = 0.25
         self.flap_strength = -7
         self.max_vel_y = 10
         
+        # Reset base environment to initialize everything
+        self.reset()
+        
+        # Player-specific state is kept in a struct-of-arrays table (one slot per bird)
+        # so that all birds can be stepped in a single vectorized pass
+        self.players = players if players is not None else PlayerTable()
+        
+        # Track the current active player for step execution
+        self.current_player = None
+        
         # Countdown properties
         self.countdown_active = True
         self.countdown_remaining = countdown_seconds
@@ -44,240 +65,188 @@ class MultiplayerFlappyEnv:
         
     def reset(self):
         """Reset the base environment and return initial observation."""
-        # Reset the base environment to get initial pipe positions
-        observation, info = self.base_env.reset()
+        # Reset the base environment to get initial pipe positions (from the start
+        # of the world's pipe sequence)
+        observation, info = self.base_env.reset(seed=self.seed)
         
-        # Cache the shared world data (pipes and ground)
+        # Store other world properties
+        unwrapped = self.unwrapped
+        self.screen_width = unwrapped._screen_width if hasattr(unwrapped, '_screen_width') else 288
+        self.screen_height = unwrapped._screen_height if hasattr(unwrapped, '_screen_height') else 512
+        
+        # Move the initial pipes into the shared pipe ring
+        self._load_pipes()
         self._sync_world_data()
         
         return observation, info
     
-    def _sync_world_data(self):
-        """Extract and cache the world state from the base environment."""
+    def _load_pipes(self):
+        """Seed the pipe ring from the pipes the base environment generated on reset."""
         unwrapped = self.unwrapped
-        
-        # Store pipe positions
+        self.pipes.clear()
         if hasattr(unwrapped, '_upper_pipes') and hasattr(unwrapped, '_lower_pipes'):
-            self.shared_pipes = {
-                'upper': copy.deepcopy(unwrapped._upper_pipes),
-                'lower': copy.deepcopy(unwrapped._lower_pipes)
-            }
+            for upper, lower in zip(unwrapped._upper_pipes, unwrapped._lower_pipes):
+                x = upper['x']
+                if len(self.pipes):
+                    x = max(x, self.pipes.last_x() + self.min_pipe_spacing)
+                self.pipes.push(x, upper['y'], lower['y'])
+    
+    def _sync_world_data(self):
+        """Expose the shared world state (read-only pipe views and the ground) without copying."""
+        x, upper_y, lower_y = self.pipes.views()
+        self.shared_pipes = {'x': x, 'upper_y': upper_y, 'lower_y': lower_y}
+        
+        # Active pipe window: the pipes overlapping the column every bird flies in.
+        # Pipes are ordered left to right, so the window is one slice of the ring
+        # (with the usual spacing it holds at most one pipe)
+        pipe_width = self.unwrapped._pipe_width
+        pipe_x = x.tolist()
+        start = bisect.bisect_right(pipe_x, self.player_x - pipe_width)
+        stop = bisect.bisect_left(pipe_x, self.player_x + self.player_width, start)
+        self.active_pipes = (x[start:stop], upper_y[start:stop], lower_y[start:stop])
         
         # Store ground position
-        if hasattr(unwrapped, '_ground'):
-            self.shared_ground = copy.deepcopy(unwrapped._ground)
-        
-        # Store other world properties
-        self.screen_width = unwrapped._screen_width if hasattr(unwrapped, '_screen_width') else 288
-        self.screen_height = unwrapped._screen_height if hasattr(unwrapped, '_screen_height') else 512
+        if hasattr(self.unwrapped, '_ground'):
+            self.shared_ground = self.unwrapped._ground
         
     def add_player(self, player_id):
         """Add a new player to the game with initial position."""
+        self.respawn_player(player_id)
+        
+        # Resetting the base environment lays out fresh pipes, so reload the ring
+        self.base_env.reset(seed=self.seed)
+        self._load_pipes()
+        self._sync_world_data()
+        return self._get_observation([self.players.slot(player_id)])[0]
+        
+    def respawn_player(self, player_id):
+        """Put a player back at the start position without touching the world (pipes, countdown)."""
         # Set up initial bird position (same as in the base environment)
-        player_x = 50  # Fixed x position for all birds
+        player_x = self.player_x
         player_y = self.screen_height / 2
         
-        # Store the player's initial state
-        self.player_positions[player_id] = {
-            'x': player_x,
-            'y': player_y,
-            'vel_y': 0,
-            'rot': 0
-        }
-        self.player_scores[player_id] = 0
-        self.player_alive[player_id] = True
-        self.player_actions[player_id] = 0
-        
-        # Return the base observation for this player
-        observation, _ = self.base_env.reset()
-        return observation
+        # Store the player's initial state (an existing player keeps their slot)
+        players = self.players
+        slot = players.add(player_id)
+        players.x[slot] = player_x
+        players.y[slot] = player_y
+        players.vel_y[slot] = 0
+        players.rot[slot] = 0
+        players.score[slot] = 0
+        players.alive[slot] = True
+        players.action[slot] = 0
         
     def remove_player(self, player_id):
         """Remove a player from the game."""
-        if player_id in self.player_positions:
-            del self.player_positions[player_id]
-        if player_id in self.player_scores:
-            del self.player_scores[player_id]
-        if player_id in self.player_alive:
-            del self.player_alive[player_id]
-        if player_id in self.player_actions:
-            del self.player_actions[player_id]
+        self.players.remove(player_id)
+        
+    def get_player_position(self, player_id):
+        """Get the current position of a player as plain Python values, or None."""
+        slot = self.players.slot(player_id)
+        if slot is None:
+            return None
+        return {
+            'x': float(self.players.x[slot]),
+            'y': float(self.players.y[slot]),
+            'vel_y': float(self.players.vel_y[slot]),
+            'rot': int(self.players.rot[slot])
+        }
             
     def get_player_score(self, player_id):
         """Get the current score for a player."""
-        return self.player_scores.get(player_id, 0)
+        slot = self.players.slot(player_id)
+        return float(self.players.score[slot]) if slot is not None else 0
         
     def is_player_alive(self, player_id):
         """Check if a player is still alive."""
-        return self.player_alive.get(player_id, False)
+        slot = self.players.slot(player_id)
+        return bool(self.players.alive[slot]) if slot is not None else False
         
     def set_player_action(self, player_id, action):
         """Set the action for a specific player."""
-        if player_id in self.player_alive and self.player_alive[player_id]:
-            self.player_actions[player_id] = action
+        slot = self.players.slot(player_id)
+        if slot is not None and self.players.alive[slot]:
+            self.players.action[slot] = action
     
     def step_world(self):
         """
         Move the world forward (pipes and ground) without affecting birds.
-        This is used to keep the shared world state in sync.
+        Pipes move in place in the shared pipe ring; the oldest pipe is recycled
+        once it is off-screen and a new one is added behind the rightmost pipe.
         """
         # Check if in countdown - don't move the world yet
         if self.is_in_countdown():
             return
-            
-        # Track current pipe positions before step
-        prev_positions = []
-        if hasattr(self.unwrapped, '_upper_pipes'):
-            for pipe in self.unwrapped._upper_pipes:
-                prev_positions.append(pipe['x'])
-        
-        # Use the base environment to compute the next world state
-        self.base_env.step(0)  # Use "do nothing" action
-        
-        # Control pipe movement speed and spacing
-        if hasattr(self.unwrapped, '_upper_pipes') and prev_positions:
-            # Increase pipe speed for faster gameplay (was 3)
-            pipe_speed = 5  # pixels per frame
-            
-            # Fix pipe spacing - increased to prevent too many pipes
-            min_pipe_spacing = 300  # Minimum horizontal distance between pipes
-            
-            # First adjust speed of existing pipes
-            for i, pipe in enumerate(self.unwrapped._upper_pipes):
-                if i < len(prev_positions):
-                    # Calculate how much the pipe moved
-                    dx = prev_positions[i] - pipe['x']
-                    
-                    # Enforce consistent pipe speed
-                    if dx != pipe_speed:
-                        adjustment = dx - pipe_speed
-                        pipe['x'] += adjustment
-                        # Also adjust corresponding lower pipe
-                        if hasattr(self.unwrapped, '_lower_pipes') and i < len(self.unwrapped._lower_pipes):
-                            self.unwrapped._lower_pipes[i]['x'] += adjustment
-            
-            # Then check for pipes that are too close to each other
-            if len(self.unwrapped._upper_pipes) >= 2:
-                pipes_to_adjust = []
-                # Sort pipes by x position (left to right)
-                sorted_indices = sorted(range(len(self.unwrapped._upper_pipes)), 
-                                      key=lambda i: self.unwrapped._upper_pipes[i]['x'])
-                
-                # Check spacing between adjacent pipes
-                for j in range(1, len(sorted_indices)):
-                    left_idx = sorted_indices[j-1]
-                    right_idx = sorted_indices[j]
-                    left_pipe_x = self.unwrapped._upper_pipes[left_idx]['x']
-                    right_pipe_x = self.unwrapped._upper_pipes[right_idx]['x']
-                    
-                    # If pipes are too close
-                    if right_pipe_x - left_pipe_x < min_pipe_spacing:
-                        # Move the right pipe further to the right
-                        adjustment = min_pipe_spacing - (right_pipe_x - left_pipe_x)
-                        self.unwrapped._upper_pipes[right_idx]['x'] += adjustment
-                        if hasattr(self.unwrapped, '_lower_pipes'):
-                            self.unwrapped._lower_pipes[right_idx]['x'] += adjustment
-            
-            # Implement pipe recycling system
-            
-            # 1. Remove pipes that have moved off-screen (with buffer)
-            if hasattr(self.unwrapped, '_upper_pipes') and hasattr(self.unwrapped, '_lower_pipes'):
-                # Get the pipe width to determine when a pipe is fully off-screen
-                pipe_width = self.base_env.unwrapped._pipe_width
-                
-                # Create a list of indices to remove
-                pipes_to_remove = []
-                for i, pipe in enumerate(self.unwrapped._upper_pipes):
-                    # Check if the pipe has moved completely off the left side of the screen
-                    if pipe['x'] + pipe_width < -50:  # 50px buffer
-                        pipes_to_remove.append(i)
-                
-                # Remove the pipes (in reverse order to avoid index issues)
-                for i in sorted(pipes_to_remove, reverse=True):
-                    if i < len(self.unwrapped._upper_pipes):
-                        del self.unwrapped._upper_pipes[i]
-                    if i < len(self.unwrapped._lower_pipes):
-                        del self.unwrapped._lower_pipes[i]
-                
-                # 2. Check if we need to add a new pipe - with stricter conditions
-                screen_width = self.unwrapped._screen_width
-
-                # Check if there are any pipes at all
-                if len(self.unwrapped._upper_pipes) == 0:
-                    # No pipes at all - add the first one
-                    if hasattr(self.base_env, '_get_pipe_pos'):
-                        upper_pipe, lower_pipe = self.base_env._get_pipe_pos()
-                        # No need to modify positions - they're already correct
-                        
-                        # Add the new pipes
-                        self.unwrapped._upper_pipes.append(upper_pipe)
-                        self.unwrapped._lower_pipes.append(lower_pipe)
-                else:
-                    # Find the rightmost pipe
-                    rightmost_x = max(pipe['x'] for pipe in self.unwrapped._upper_pipes)
-                    
-                    # Only add a new pipe when the rightmost pipe is sufficiently into the screen
-                    if rightmost_x < screen_width - 150:
-                        # Get pipe positions from CustomFlappyBirdEnv
-                        if hasattr(self.base_env, '_get_pipe_pos'):
-                            upper_pipe, lower_pipe = self.base_env._get_pipe_pos()
-                            # No need to modify positions - they're already correct
-                            
-                            # Add the new pipes directly
-                            self.unwrapped._upper_pipes.append(upper_pipe)
-                            self.unwrapped._lower_pipes.append(lower_pipe)
-                        
-                # Max number of pipes to keep in memory - prevents excessive memory use
-                # Reduced to ensure we don't keep too many pipes
-                max_pipes = 3
-                if len(self.unwrapped._upper_pipes) > max_pipes:
-                    # Keep only the rightmost pipes if we somehow end up with too many
-                    sorted_indices = sorted(range(len(self.unwrapped._upper_pipes)), 
-                                         key=lambda i: self.unwrapped._upper_pipes[i]['x'],
-                                         reverse=True)  # Sort from right to left
-                    
-                    keep_indices = sorted_indices[:max_pipes]  # Keep only the max_pipes rightmost pipes
-                    self.unwrapped._upper_pipes = [self.unwrapped._upper_pipes[i] for i in sorted(keep_indices)]
-                    self.unwrapped._lower_pipes = [self.unwrapped._lower_pipes[i] for i in sorted(keep_indices)]
         
-        # Update our cached world data from the base environment
+        unwrapped = self.unwrapped
+        pipes = self.pipes
+        
+        # Move every pipe at a constant speed
+        pipes.advance(-self.pipe_speed)
+        
+        # Scroll the ground like the base environment does
+        if hasattr(unwrapped, '_ground') and hasattr(unwrapped, '_base_shift'):
+            unwrapped._ground['x'] = -((-unwrapped._ground['x'] + 100) % unwrapped._base_shift)
+        
+        # 1. Recycle pipes that have moved off-screen (with a 50px buffer). Pipes
+        # are ordered left to right, so only the oldest one can be off-screen
+        pipe_width = unwrapped._pipe_width
+        while len(pipes) and pipes.first_x() + pipe_width < -50:
+            pipes.pop_left()
+        
+        # 2. Add a new pipe once the rightmost one is sufficiently into the screen,
+        # keeping the minimum spacing behind it
+        if len(pipes) == 0:
+            self._spawn_pipe(self.screen_width + 10)
+        elif pipes.last_x() < self.screen_width - 150:
+            self._spawn_pipe(pipes.last_x() + self.min_pipe_spacing)
+        
+        # Refresh the read-only views handed out to consumers
         self._sync_world_data()
+    
+    def _spawn_pipe(self, x):
+        """Add a pipe pair at x (never before the right edge) with the next heights of the pipe sequence."""
+        upper_y, lower_y = self.base_env.pipe_sequence.next()
+        self.pipes.push(max(x, self.screen_width + 10), upper_y, lower_y)
         
     def step_player(self, player_id):
         """
         Process a single step for a specific player.
         Returns (observation, reward, done, truncated, info)
         """
-        if player_id not in self.player_positions or not self.player_alive[player_id]:
+        slot = self.players.slot(player_id)
+        if slot is None or not self.players.alive[slot]:
             return None, 0, True, False, {}
         
         # Check if in countdown - don't process player actions yet
         if self.is_in_countdown():
-            observation = self.base_env.unwrapped._get_observation()
+            observation = self._get_observation([slot])[0]
             info = {'countdown_active': True, 'countdown_remaining': self.get_countdown_remaining()}
             return observation, 0, False, False, info
             
         # Get the player's current state
-        pos = self.player_positions[player_id]
-        action = self.player_actions.get(player_id, 0)
+        vel_y = float(self.players.vel_y[slot])
+        rot = int(self.players.rot[slot])
+        action = self.players.action[slot]
         
         # Update player velocity based on action and gravity
         if action == 1:  # Flap
-            pos['vel_y'] = self.flap_strength
+            vel_y = self.flap_strength
         else:
-            pos['vel_y'] += self.gravity
+            vel_y += self.gravity
         
         # Clamp velocity
-        pos['vel_y'] = min(pos['vel_y'], self.max_vel_y)
+        vel_y = min(vel_y, self.max_vel_y)
         
         # Update position
-        pos['y'] += pos['vel_y']
+        self.players.vel_y[slot] = vel_y
+        self.players.y[slot] += vel_y
         
         # Update rotation based on velocity (falling = rotated down)
-        if pos['vel_y'] < 0:
-            pos['rot'] = min(pos['rot'] + 3, 30)
+        if vel_y < 0:
+            self.players.rot[slot] = min(rot + 3, 30)
         else:
-            pos['rot'] = max(pos['rot'] - 3, -30)
+            self.players.rot[slot] = max(rot - 3, -30)
             
         # Check collisions
         reward = 0.1  # Small reward for surviving
@@ -287,91 +256,163 @@ class MultiplayerFlappyEnv:
         reward += self._check_score(player_id)
         
         # Update player state
-        self.player_alive[player_id] = not done
+        self.players.alive[slot] = not done
         if not done:
-            self.player_scores[player_id] += reward
+            self.players.score[slot] += reward
             
-        # Create observation (in a real implementation, you'd render what the player sees)
-        observation = self.base_env.unwrapped._get_observation()
+        # What this player sees after the step
+        observation = self._get_observation([slot])[0]
         
         # Create info dict similar to gym
         info = {'countdown_active': False, 'countdown_remaining': 0}
         
         return observation, reward, done, False, info  # truncated=False
     
+    def step_all_players(self, observe=True):
+        """
+        Process a single step for every player in one vectorized pass.
+        Produces the same results as calling step_player for each player.
+        Returns (observation, rewards, dones, truncated, info) where rewards and
+        dones are arrays indexed by player slot, and so are the rows of the observation.
+        With observe=False the observation is skipped and None is returned.
+        """
+        players = self.players
+        count = players.size
+        alive = players.alive[:count].copy()
+        rewards = np.zeros(count)
+        
+        # Check if in countdown - don't process player actions yet
+        if self.is_in_countdown():
+            observation = self._get_observation(np.arange(count)) if observe else None
+            info = {'countdown_active': True, 'countdown_remaining': self.get_countdown_remaining()}
+            return observation, rewards, ~alive, False, info
+        
+        # Views over the allocated slots (free slots are never alive)
+        x = players.x[:count]
+        y = players.y[:count]
+        vel_y = players.vel_y[:count]
+        rot = players.rot[:count]
+        
+        # Update velocity based on action and gravity, then clamp. Masked in-place
+        # updates leave dead birds untouched
+        new_vel_y = np.where(players.action[:count] == 1, self.flap_strength, vel_y + self.gravity)
+        np.minimum(new_vel_y, self.max_vel_y, out=new_vel_y)
+        np.copyto(vel_y, new_vel_y, where=alive)
+        np.add(y, new_vel_y, out=y, where=alive)
+        
+        # Update rotation based on velocity (falling = rotated down)
+        new_rot = np.where(new_vel_y < 0, np.minimum(rot + 3, 30), np.maximum(rot - 3, -30))
+        np.copyto(rot, new_rot, where=alive)
+        
+        # Check collisions and scoring for everyone at once
+        done = self._check_collisions(x, y)
+        np.add(0.1, self._check_scores(x), out=rewards, where=alive)
+        
+        # Update player state (dead birds stay dead and report done)
+        survived = alive & ~done
+        score = players.score[:count]
+        np.add(score, rewards, out=score, where=survived)
+        players.alive[:count] = survived
+        
+        observation = self._get_observation(np.arange(count)) if observe else None
+        info = {'countdown_active': False, 'countdown_remaining': 0}
+        
+        return observation, rewards, ~survived, False, info
+    
+    def _get_observation(self, slots):
+        """The 12-feature observation of the birds in `slots`, one row per bird."""
+        # Pipes that haven't entered the screen yet (or don't exist yet) look like an
+        # open gap at the right edge. The ring is ordered left to right, so this keeps
+        # the nearest pipe first
+        x, upper_y, lower_y = self.pipes.views()
+        count = min(len(x), self.NUM_PIPES)
+        h = np.full(self.NUM_PIPES, float(self.screen_width))
+        v1 = np.zeros(self.NUM_PIPES)
+        v2 = np.full(self.NUM_PIPES, float(self.screen_height))
+        onscreen = x[:count] <= self.screen_width
+        h[:count] = np.where(onscreen, x[:count], self.screen_width)
+        v1[:count] = np.where(onscreen, upper_y[:count], 0)
+        v2[:count] = np.where(onscreen, lower_y[:count], self.screen_height)
+        
+        players = self.players
+        observation = np.empty((len(slots), 12))
+        observation[:, 0:9:3] = h / self.screen_width
+        observation[:, 1:9:3] = v1 / self.screen_height
+        observation[:, 2:9:3] = v2 / self.screen_height
+        observation[:, 9] = players.y[slots] / self.screen_height
+        observation[:, 10] = players.vel_y[slots] / self.max_vel_y
+        observation[:, 11] = players.rot[slots] / 90
+        return observation
+    
     def _check_collision(self, player_id):
         """Check if a player has collided with pipes or ground."""
-        if player_id not in self.player_positions:
+        slot = self.players.slot(player_id)
+        if slot is None:
             return True
-            
-        pos = self.player_positions[player_id]
-        player_rect = {
-            'x': pos['x'],
-            'y': pos['y'],
-            'width': self.player_width,
-            'height': self.player_height
-        }
+        
+        bird_x = self.players.x[slot]
+        bird_y = self.players.y[slot]
         
         # Check ground collision
         if hasattr(self.unwrapped, '_ground'):
             ground_y = self.unwrapped._ground['y']
-            if pos['y'] + self.player_height >= ground_y:
+            if bird_y + self.player_height >= ground_y:
                 return True
                 
         # Check ceiling collision
-        if pos['y'] <= 0:
+        if bird_y <= 0:
             return True
             
-        # Check pipe collisions
-        if hasattr(self.unwrapped, '_upper_pipes') and hasattr(self.unwrapped, '_lower_pipes'):
-            for upper, lower in zip(self.unwrapped._upper_pipes, self.unwrapped._lower_pipes):
-                # Create pipe rects
-                upper_rect = {
-                    'x': upper['x'],
-                    'y': 0,
-                    'width': self.base_env.unwrapped._pipe_width,
-                    'height': upper['y']
-                }
-                
-                lower_rect = {
-                    'x': lower['x'],
-                    'y': lower['y'],
-                    'width': self.base_env.unwrapped._pipe_width,
-                    'height': self.screen_height - lower['y']
-                }
-                
-                # Check collision
-                if self._check_rect_collision(player_rect, upper_rect) or \
-                   self._check_rect_collision(player_rect, lower_rect):
-                    return True
+        # Check pipe collisions - only pipes in the active window can reach the bird,
+        # and a bird overlapping a pipe hits it when it leaves the gap
+        pipe_width = self.base_env.unwrapped._pipe_width
+        for x, upper_y, lower_y in zip(*self.active_pipes):
+            if bird_x < x + pipe_width and bird_x + self.player_width > x and \
+                    (bird_y < upper_y or bird_y + self.player_height > lower_y):
+                return True
                     
         return False
+    
+    def _check_collisions(self, x, y):
+        """Vectorized version of _check_collision for arrays of bird positions."""
+        hit = y <= 0  # Ceiling
+        
+        # Ground
+        if hasattr(self.unwrapped, '_ground'):
+            hit |= y + self.player_height >= self.unwrapped._ground['y']
         
-    def _check_rect_collision(self, rect1, rect2):
-        """Check if two rectangles collide."""
-        return (
-            rect1['x'] < rect2['x'] + rect2['width'] and
-            rect1['x'] + rect1['width'] > rect2['x'] and
-            rect1['y'] < rect2['y'] + rect2['height'] and
-            rect1['y'] + rect1['height'] > rect2['y']
-        )
+        # Pipes - every bird sits at player_x, so the pipes in the active window are
+        # exactly the ones overlapping them and only the y-interval needs testing
+        bottom = y + self.player_height
+        for upper_y, lower_y in zip(self.active_pipes[1].tolist(), self.active_pipes[2].tolist()):
+            hit |= (y < upper_y) | (bottom > lower_y)
+        
+        return hit
         
     def _check_score(self, player_id):
         """Check if player has passed a pipe and update score."""
-        if player_id not in self.player_positions:
+        slot = self.players.slot(player_id)
+        if slot is None:
             return 0
             
-        pos = self.player_positions[player_id]
-        
-        # Check if player has passed a pipe
-        if hasattr(self.unwrapped, '_upper_pipes'):
-            for pipe in self.unwrapped._upper_pipes:
-                pipe_centerx = pipe['x'] + self.base_env.unwrapped._pipe_width / 2
-                if pipe_centerx <= pos['x'] < pipe_centerx + 5:
-                    # Player just passed this pipe
-                    return 1.0  # Point for passing pipe
+        player_x = self.players.x[slot]
+        
+        # Check if player has passed a pipe (only pipes in the active window can be passing)
+        for x in self.active_pipes[0]:
+            pipe_centerx = x + self.base_env.unwrapped._pipe_width / 2
+            if pipe_centerx <= player_x < pipe_centerx + 5:
+                # Player just passed this pipe
+                return 1.0  # Point for passing pipe
                     
         return 0
+    
+    def _check_scores(self, x):
+        """Vectorized version of _check_score for an array of bird x positions."""
+        passed = np.zeros(len(x), dtype=bool)
+        for pipe_x in self.active_pipes[0]:
+            pipe_centerx = pipe_x + self.base_env.unwrapped._pipe_width / 2
+            passed |= (pipe_centerx <= x) & (x < pipe_centerx + 5)
+        return passed.astype(np.float64)
         
     def step(self, action):
         """
@@ -383,7 +424,9 @@ class MultiplayerFlappyEnv:
             return self.base_env.step(action)
             
         # Set the action for the current player
-        self.player_actions[self.current_player] = action
+        slot = self.players.slot(self.current_player)
+        if slot is not None:
+            self.players.action[slot] = action
         
         # Process the player's step
         return self.step_player(self.current_player)
@@ -394,6 +437,10 @@ class MultiplayerFlappyEnv:
         
     def render(self):
         """Render the environment."""
+        # The base environment draws its own pipe lists, so copy the ring into them first
+        x, upper_y, lower_y = self.pipes.views()
+        self.unwrapped._upper_pipes = [{'x': px, 'y': py} for px, py in zip(x.tolist(), upper_y.tolist())]
+        self.unwrapped._lower_pipes = [{'x': px, 'y': py} for px, py in zip(x.tolist(), lower_y.tolist())]
         return self.base_env.render()
         
     def is_in_countdown(self):
@@ -0,0 +1,73 @@
+import numpy as np
+
+class PipeRing:
+    """
+    Fixed-capacity ring of pipe pairs stored as NumPy columns (x, upper_y, lower_y).
+
+    Pipes are kept in spawn order, which is also left-to-right order because new
+    pipes always appear behind the rightmost one, so the oldest pipe is the only
+    one that can leave the screen. Pushing a new pipe and recycling the oldest are
+    both O(1) and nothing is ever sorted or reallocated.
+
+    Every slot is written twice, at i and i + capacity, so the live pipes are
+    always one contiguous slice of each column. views() hands those slices out
+    read-only; they see later in-place moves, but take new views after a push or
+    a pop since the slice itself shifts.
+    """
+    def __init__(self, capacity=3):
+        """Create an empty ring with room for `capacity` pipe pairs."""
+        self.capacity = capacity
+        self._x = np.zeros(2 * capacity)
+        self._upper_y = np.zeros(2 * capacity)
+        self._lower_y = np.zeros(2 * capacity)
+        self.head = 0   # Slot of the oldest (leftmost) pipe
+        self.count = 0  # Number of live pipes
+        self._views = None  # Cached views, rebuilt after a push or pop
+
+    def __len__(self):
+        return self.count
+
+    def clear(self):
+        """Remove every pipe."""
+        self.head = 0
+        self.count = 0
+        self._views = None
+
+    def push(self, x, upper_y, lower_y):
+        """Add a pipe on the right. When the ring is full the oldest pipe is dropped."""
+        if self.count == self.capacity:
+            self.pop_left()
+        slot = (self.head + self.count) % self.capacity
+        for column, value in ((self._x, x), (self._upper_y, upper_y), (self._lower_y, lower_y)):
+            column[slot] = value
+            column[slot + self.capacity] = value
+        self.count += 1
+        self._views = None
+
+    def pop_left(self):
+        """Recycle the oldest (leftmost) pipe."""
+        if self.count:
+            self.head = (self.head + 1) % self.capacity
+            self.count -= 1
+            self._views = None
+
+    def advance(self, dx):
+        """Move every pipe horizontally by dx, in place."""
+        self._x += dx
+
+    def first_x(self):
+        """x of the leftmost pipe."""
+        return self._x[self.head]
+
+    def last_x(self):
+        """x of the rightmost pipe."""
+        return self._x[self.head + self.count - 1]
+
+    def views(self):
+        """Read-only (x, upper_y, lower_y) arrays of the live pipes, left to right."""
+        if self._views is None:
+            live = slice(self.head, self.head + self.count)
+            self._views = (self._x[live], self._upper_y[live], self._lower_y[live])
+            for view in self._views:
+                view.flags.writeable = False
+        return self._views
@@ -0,0 +1,62 @@
+import numpy as np
+
+class PipeSequence:
+    """
+    Seeded, precomputed sequence of pipe heights.
+
+    Heights follow the CustomFlappyBirdEnv rules (random upper pipe height, fixed
+    gap) but are drawn from a NumPy generator a block at a time, and pipes are then
+    served from that buffer. The n-th pipe only depends on the seed, so any world
+    can be replayed exactly, or rebuilt on another server, from its seed alone.
+    """
+    MIN_PIPE_HEIGHT = 60  # Minimum height for any pipe
+
+    def __init__(self, pipe_gap=100, screen_height=512, seed=None, block_size=1024):
+        """Create the sequence for `seed` (a fresh random seed when None)."""
+        self.pipe_gap = pipe_gap
+        self.screen_height = screen_height
+        self.block_size = block_size
+        self.reseed(seed)
+
+    @staticmethod
+    def random_seed():
+        """Draw a new seed from OS entropy."""
+        return int(np.random.SeedSequence().generate_state(1)[0])
+
+    def reseed(self, seed=None):
+        """Start over with a new seed (or the same one, to replay the world)."""
+        self.seed = self.random_seed() if seed is None else int(seed)
+        self._rng = np.random.default_rng(self.seed)
+        self._upper = []
+        self._lower = []
+        self._next = 0   # Position in the current block
+        self.index = 0   # Number of pipes served since the seed was set
+
+    def rewind(self):
+        """Serve the sequence again from the first pipe."""
+        self.reseed(self.seed)
+
+    def next(self):
+        """Get the next (upper pipe height, lower pipe y) pair."""
+        if self._next == len(self._upper):
+            self._fill()
+        i = self._next
+        self._next += 1
+        self.index += 1
+        return self._upper[i], self._lower[i]
+
+    def _fill(self):
+        """Generate the next block of heights in one go."""
+        ground_y = self.screen_height - 112  # Typical ground position
+
+        # Calculate maximum valid upper pipe height to ensure gap fits
+        max_upper = self.screen_height - self.pipe_gap - self.MIN_PIPE_HEIGHT - 100  # 100px buffer from ground
+        max_upper = max(max_upper, self.MIN_PIPE_HEIGHT + 50)  # Ensure sufficient range
+
+        upper = self._rng.integers(self.MIN_PIPE_HEIGHT, int(max_upper) + 1, size=self.block_size)
+
+        # Safety check to ensure pipes fit on screen
+        upper = np.minimum(upper, ground_y - self.pipe_gap - self.MIN_PIPE_HEIGHT)
+        self._upper = upper.tolist()
+        self._lower = (upper + self.pipe_gap).tolist()
+        self._next = 0
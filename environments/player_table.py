@@ -0,0 +1,91 @@
+import numpy as np
+
+class PlayerTable:
+    """
+    Compact struct-of-arrays store for per-player state.
+
+    Every player id (socket sid) maps to a slot index into a set of typed NumPy
+    arrays. Freed slots go on a free list and are reused by the next player that
+    joins, so adding and removing players is O(1) and the arrays never shrink or
+    move around while a game is running. The same table is shared by the
+    GameManager and the MultiplayerFlappyEnv so neither keeps its own copy.
+    """
+    # Column name -> dtype
+    FIELDS = (
+        ('x', np.float64),
+        ('y', np.float64),
+        ('vel_y', np.float64),
+        ('rot', np.int64),
+        ('score', np.float64),
+        ('alive', np.bool_),
+        ('action', np.int8),
+    )
+
+    def __init__(self, capacity=16):
+        """Create an empty table with room for `capacity` players."""
+        self.slots = {}      # {player_id: slot}
+        self.ids = []        # [player_id or None for each slot]
+        self.size = 0        # Number of slots handed out so far (high-water mark)
+        self._free = []      # Slots released by removed players
+        self._capacity = 0
+        self._grow(capacity)
+
+    def _grow(self, capacity):
+        """Reallocate every column with room for `capacity` slots."""
+        for name, dtype in self.FIELDS:
+            grown = np.zeros(capacity, dtype=dtype)
+            if self._capacity:
+                grown[:self.size] = getattr(self, name)[:self.size]
+            setattr(self, name, grown)
+        self.ids.extend([None] * (capacity - self._capacity))
+        self._capacity = capacity
+
+    def add(self, player_id):
+        """Return the slot for a player, allocating one if they are new."""
+        slot = self.slots.get(player_id)
+        if slot is not None:
+            return slot
+
+        # Reuse a freed slot before growing the table
+        if self._free:
+            slot = self._free.pop()
+        else:
+            if self.size >= self._capacity:
+                self._grow(self._capacity * 2)
+            slot = self.size
+            self.size += 1
+
+        self.slots[player_id] = slot
+        self.ids[slot] = player_id
+        return slot
+
+    def remove(self, player_id):
+        """Release a player's slot. Returns False if the player was unknown."""
+        slot = self.slots.pop(player_id, None)
+        if slot is None:
+            return False
+
+        # Clear the row so freed slots never look like live birds
+        for name, _ in self.FIELDS:
+            getattr(self, name)[slot] = 0
+        self.ids[slot] = None
+        self._free.append(slot)
+        return True
+
+    def clear(self):
+        """Remove every player but keep the allocated arrays."""
+        for player_id in list(self.slots):
+            self.remove(player_id)
+
+    def slot(self, player_id):
+        """Get the slot for a player, or None if they are not in the table."""
+        return self.slots.get(player_id)
+
+    def __contains__(self, player_id):
+        return player_id in self.slots
+
+    def __len__(self):
+        return len(self.slots)
+
+    def __iter__(self):
+        return iter(self.slots)
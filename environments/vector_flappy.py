@@ -0,0 +1,209 @@
+import gymnasium
+import numpy as np
+from gymnasium.vector import AutoresetMode, VectorEnv
+from gymnasium.vector.utils import batch_space
+from flappy_bird_gymnasium.envs.constants import (
+    PIPE_HEIGHT,
+    PIPE_VEL_X,
+    PIPE_WIDTH,
+    PLAYER_ACC_Y,
+    PLAYER_FLAP_ACC,
+    PLAYER_HEIGHT,
+    PLAYER_MAX_VEL_Y,
+    PLAYER_VEL_ROT,
+    PLAYER_WIDTH,
+)
+
+class VectorFlappyEnv(VectorEnv):
+    """
+    N independent Flappy Bird worlds simulated in lockstep as NumPy arrays.
+
+    Follows the gymnasium vector env API (reset/step return batched arrays and a
+    dict of batched infos) and plays by the CustomFlappyBirdEnv rules: fixed-size
+    gaps at random heights, 220px between pipes, and the buffered pipe/ground/
+    ceiling collision check. Bird physics, scoring, rewards and the 12-feature
+    observation are those of FlappyBirdEnv(use_lidar=False), so policies trained
+    here plug straight into the DQN used by the server.
+
+    Worlds that terminate or truncate are reset within the same step
+    (AutoresetMode.SAME_STEP); their last observation is returned in
+    infos["final_obs"] with infos["_final_obs"] marking which worlds reset.
+    """
+    metadata = {"autoreset_mode": AutoresetMode.SAME_STEP}
+
+    NUM_PIPES = 3  # The observation describes the next three pipes
+    PIPE_SPACING = 220  # Horizontal distance between consecutive pipes
+    MIN_PIPE_HEIGHT = 60  # Minimum visible height of any pipe
+    COLLISION_BUFFER = 4  # Pixels trimmed off each side of the bird's hitbox
+
+    def __init__(self, num_envs=1024, pipe_gap=100, screen_size=(288, 512), normalize_obs=True, score_limit=None):
+        self.num_envs = num_envs
+        self._pipe_gap = pipe_gap
+        self._screen_width, self._screen_height = screen_size
+        self._normalize_obs = normalize_obs
+        self._score_limit = score_limit
+        self._ground_y = self._screen_height * 0.79
+
+        # Spaces
+        bound = 1.0 if normalize_obs else np.inf
+        self.single_observation_space = gymnasium.spaces.Box(-bound, bound, shape=(12,), dtype=np.float64)
+        self.single_action_space = gymnasium.spaces.Discrete(2)
+        self.observation_space = batch_space(self.single_observation_space, num_envs)
+        self.action_space = batch_space(self.single_action_space, num_envs)
+
+        # Player state, one entry per world
+        self._player_x = int(self._screen_width * 0.2)
+        self._player_y = np.zeros(num_envs)
+        self._player_vel_y = np.zeros(num_envs)
+        self._player_rot = np.zeros(num_envs)
+        self._score = np.zeros(num_envs, dtype=np.int64)
+
+        # Pipe state, one row per world. gap_top is the bottom edge of the upper
+        # pipe and gap_bottom the top edge of the lower pipe
+        self._pipe_x = np.zeros((num_envs, self.NUM_PIPES))
+        self._gap_top = np.zeros((num_envs, self.NUM_PIPES))
+        self._gap_bottom = np.zeros((num_envs, self.NUM_PIPES))
+
+        self._np_random = np.random.default_rng()
+
+    def reset(self, *, seed=None, options=None):
+        """Reset every world (or only those in options["reset_mask"])."""
+        if seed is not None:
+            self._np_random = np.random.default_rng(seed)
+
+        mask = np.ones(self.num_envs, dtype=bool)
+        if options is not None and "reset_mask" in options:
+            mask = np.asarray(options["reset_mask"], dtype=bool)
+        self._reset_worlds(mask)
+
+        return self._get_observation(), {"score": self._score.copy()}
+
+    def step(self, actions):
+        """Step every world with its action. Returns batched (obs, rewards, terminations, truncations, infos)."""
+        actions = np.asarray(actions)
+        rewards = np.full(self.num_envs, 0.1)
+
+        # Flap (only below the top of the screen)
+        flapped = (actions == 1) & (self._player_y > -2 * PLAYER_HEIGHT)
+        self._player_vel_y[flapped] = PLAYER_FLAP_ACC
+
+        # Score pipes whose middle the bird's middle just crossed
+        player_mid = self._player_x + PLAYER_WIDTH / 2
+        pipe_mid = self._pipe_x + PIPE_WIDTH / 2
+        passed = ((pipe_mid <= player_mid) & (player_mid < pipe_mid + 4)).sum(axis=1)
+        self._score += passed
+        rewards[passed > 0] = 1.0
+
+        # Rotation and gravity
+        self._player_rot = np.where(self._player_rot > -90, self._player_rot - PLAYER_VEL_ROT, self._player_rot)
+        falling = (self._player_vel_y < PLAYER_MAX_VEL_Y) & ~flapped
+        self._player_vel_y[falling] += PLAYER_ACC_Y
+        self._player_rot[flapped] = 45
+        self._player_y += np.minimum(self._player_vel_y, self._ground_y - self._player_y - PLAYER_HEIGHT)
+
+        # Move pipes and recycle the ones that left the screen behind the rightmost pipe
+        self._pipe_x += PIPE_VEL_X
+        gone = self._pipe_x < -PIPE_WIDTH
+        if gone.any():
+            rows, cols = np.nonzero(gone)
+            self._pipe_x[rows, cols] = self._pipe_x[rows].max(axis=1) + self.PIPE_SPACING
+            self._gap_top[rows, cols], self._gap_bottom[rows, cols] = self._random_gaps(len(rows))
+
+        # Above the screen
+        rewards[self._player_y < 0] = -0.5
+
+        # Crashes
+        terminations = self._check_crash()
+        rewards[terminations] = -1.0
+        self._player_vel_y[terminations] = 0
+
+        truncations = np.zeros(self.num_envs, dtype=bool)
+        if self._score_limit is not None:
+            truncations = (self._score >= self._score_limit) & ~terminations
+
+        obs = self._get_observation()
+        infos = {"score": self._score.copy()}
+
+        # Autoreset finished worlds in place
+        done = terminations | truncations
+        if done.any():
+            infos["final_obs"] = obs.copy()
+            infos["_final_obs"] = done
+            self._reset_worlds(done)
+            obs[done] = self._get_observation()[done]
+
+        return obs, rewards, terminations, truncations, infos
+
+    def _reset_worlds(self, mask):
+        """Start a new game in the selected worlds."""
+        count = int(mask.sum())
+        if count == 0:
+            return
+
+        self._player_y[mask] = int((self._screen_height - PLAYER_HEIGHT) / 2)
+        self._player_vel_y[mask] = -9
+        self._player_rot[mask] = 45
+        self._score[mask] = 0
+
+        first_x = self._screen_width + 10
+        self._pipe_x[mask] = first_x + self.PIPE_SPACING * np.arange(self.NUM_PIPES)
+        gap_top, gap_bottom = self._random_gaps(count * self.NUM_PIPES)
+        self._gap_top[mask] = gap_top.reshape(count, self.NUM_PIPES)
+        self._gap_bottom[mask] = gap_bottom.reshape(count, self.NUM_PIPES)
+
+    def _random_gaps(self, count):
+        """Random gap positions with the fixed gap size (CustomFlappyBirdEnv._get_pipe_pos)."""
+        ground_y = self._screen_height - 112
+        max_upper = self._screen_height - self._pipe_gap - self.MIN_PIPE_HEIGHT - 100
+        max_upper = max(max_upper, self.MIN_PIPE_HEIGHT + 50)
+
+        gap_top = self._np_random.integers(self.MIN_PIPE_HEIGHT, int(max_upper) + 1, size=count).astype(np.float64)
+        gap_top = np.minimum(gap_top, ground_y - self._pipe_gap - self.MIN_PIPE_HEIGHT)
+        return gap_top, gap_top + self._pipe_gap
+
+    def _check_crash(self):
+        """Buffered hitbox against the ground, the ceiling and every pipe."""
+        left = self._player_x + self.COLLISION_BUFFER
+        top = self._player_y + self.COLLISION_BUFFER
+        bottom = top + PLAYER_HEIGHT - 2 * self.COLLISION_BUFFER
+        right = left + PLAYER_WIDTH - 2 * self.COLLISION_BUFFER
+
+        crashed = (bottom >= self._ground_y) | (top <= 0)
+
+        overlap_x = (right > self._pipe_x) & (left < self._pipe_x + PIPE_WIDTH)
+        hit_pipe = overlap_x & ((top[:, None] < self._gap_top) | (bottom[:, None] > self._gap_bottom))
+        return crashed | hit_pipe.any(axis=1)
+
+    def _get_observation(self):
+        """The 12-feature observation of FlappyBirdEnv, for every world."""
+        # Pipes that haven't entered the screen yet look like an open gap at the right edge
+        offscreen = self._pipe_x > self._screen_width
+        h = np.where(offscreen, self._screen_width, self._pipe_x)
+        v1 = np.where(offscreen, 0, self._gap_top)
+        v2 = np.where(offscreen, self._screen_height, self._gap_bottom)
+
+        # Nearest pipe first
+        order = np.argsort(h, axis=1, kind="stable")
+        h = np.take_along_axis(h, order, axis=1)
+        v1 = np.take_along_axis(v1, order, axis=1)
+        v2 = np.take_along_axis(v2, order, axis=1)
+
+        pos_y = self._player_y
+        vel_y = self._player_vel_y
+        rot = self._player_rot
+        if self._normalize_obs:
+            h = h / self._screen_width
+            v1 = v1 / self._screen_height
+            v2 = v2 / self._screen_height
+            pos_y = pos_y / self._screen_height
+            vel_y = vel_y / PLAYER_MAX_VEL_Y
+            rot = rot / 90
+
+        obs = np.empty((self.num_envs, 12))
+        obs[:, 0:9:3] = h
+        obs[:, 1:9:3] = v1
+        obs[:, 2:9:3] = v2
+        obs[:, 9] = pos_y
+        obs[:, 10] = vel_y
+        obs[:, 11] = rot
+        return obs
@@ -0,0 +1,90 @@
+from state_delta import StateDeltaEncoder
+
+# Default namespace every game event is sent on
+NAMESPACE = "/"
+
+class BroadcastStream:
+    """
+    One tier of a match's game frames, sent to its own Socket.IO room.
+
+    A stream sends every `every`-th broadcast tick, so spectators can get a
+    downsampled copy of what players see. Each stream keeps its own delta
+    encoder because a delta is only valid against the message its subscribers
+    received last. Subscribers that missed frames are listed in `stale` and get
+    a keyframe instead of the next delta.
+    """
+    def __init__(self, name, room, every=1, keyframe_interval=20):
+        self.name = name  # Tier label for metrics
+        self.room = room
+        self.every = max(1, every)
+        self.encoder = StateDeltaEncoder(keyframe_interval=keyframe_interval)
+        self.ticks = 0
+        self.stale = set()  # sids that need a keyframe before the next delta
+
+    def reset(self):
+        """Forget everything sent for the previous game."""
+        self.encoder.reset()
+        self.ticks = 0
+        self.stale.clear()
+
+    def due(self):
+        """Count a broadcast tick. Returns True when this stream sends on it."""
+        self.ticks += 1
+        return (self.ticks - 1) % self.every == 0  # The first tick of a game always sends
+
+    def discard(self, sid):
+        """Forget a subscriber that left the stream."""
+        self.stale.discard(sid)
+
+class Fanout:
+    """
+    Sends stream frames to a room while skipping clients that can't keep up.
+
+    Engine.IO queues every outgoing packet per client, and a client on a slow
+    link drains its queue slower than frames arrive. Clients with more than
+    `max_backlog` packets still waiting are left out of the room emit (the
+    frame is dropped for them, not queued), so the packet is still encoded
+    once and nobody else waits on them. Game frames are snapshots, so a client
+    that catches up only needs the latest one.
+    """
+    def __init__(self, socketio, max_backlog=8):
+        self.socketio = socketio
+        self.max_backlog = max_backlog
+
+    def backlog(self, sid):
+        """Number of packets still waiting to be sent to a client (0 if unknown)."""
+        server = self.socketio.server
+        eio_sid = server.manager.eio_sid_from_sid(sid, NAMESPACE)
+        socket = server.eio.sockets.get(eio_sid) if eio_sid else None
+        return socket.queue.qsize() if socket is not None else 0
+
+    def backlogged(self, sid):
+        """Check if a client is too far behind to be sent another frame."""
+        return self.backlog(sid) > self.max_backlog
+
+    def emit(self, stream, event, message, resync=None):
+        """
+        Send one frame to a stream. Backlogged clients are skipped and marked
+        stale; stale clients that caught up get `resync(sid)` instead of the
+        frame (when given). Returns the number of clients the frame was dropped for.
+        """
+        skipped = []
+        recovered = []
+        dropped = 0
+        for sid, _ in self.socketio.server.manager.get_participants(NAMESPACE, stream.room):
+            backlogged = self.backlogged(sid)
+            if backlogged and message is not None:
+                skipped.append(sid)
+                dropped += 1
+                if resync is not None:
+                    stream.stale.add(sid)
+            elif sid in stream.stale and not backlogged:
+                skipped.append(sid)
+                recovered.append(sid)
+
+        if message is not None:
+            self.socketio.emit(event, message, to=stream.room, skip_sid=skipped)
+        for sid in recovered:
+            stream.stale.discard(sid)
+            resync(sid)
+        return dropped
@@ -1,21 +1,52 @@
 import gymnasium as gym
 import threading
+from collections import deque
 import numpy as np
 import time
 from environments.flappy_env import MultiplayerFlappyEnv
+# The environment modules import each other by bare name (environments/ is on the
+# path), so PlayerTable is imported the same way to get the one module flappy_env uses
+from player_table import PlayerTable
+import snapshot_codec
+from metrics import get_metrics
+from tick_scheduler import get_scheduler
 
 class GameManager:
-    def __init__(self):
+    def __init__(self, scheduler=None, seed=None, match_id=None):
         self.env = None 
+        # World seed for every game of this manager (None picks a new world per game);
+        # the seed of the current world is in the game state for replays
+        self.world_seed = seed
         self.PIPE_GAP = 130  # Slightly bigger gap for easier gameplay
-        self.players = {}
+        self.players = PlayerTable()  # Shared with the environment
         self.lock = threading.Lock()
-        self.game_thread = None
+        # Inputs from socket handlers, drained once per tick. deque append/popleft are
+        # thread-safe so handlers never wait on the physics step. Unbounded on purpose:
+        # a cap would silently drop flaps in big lobbies, and every tick empties it
+        self.pending_actions = deque()
+        # Every change to the game bumps state_version; get_game_state builds at most
+        # one snapshot per version and hands the same object to every reader
+        self.state_version = 0
+        self._snapshot = None  # (version, game state)
         self.game_running = False
         self.winner = None
         self.game_over = False
         self.frame_rate = 60 # Target frame rate for game loop
-        self.last_frame_time = 0
+        
+        # Game loop is stepped by the shared scheduler instead of a thread per game
+        self.scheduler = scheduler or get_scheduler()
+        self.task_key = f"game-{id(self):x}"
+        
+        # Per-phase frame timings and error counts (served on /metrics). The series
+        # are looked up once here so each tick only pays for the observations
+        metrics = get_metrics()
+        self.metrics_labels = {"match": match_id or self.task_key}
+        self.phase_timers = {
+            phase: metrics.histogram("flappy_phase_seconds", phase=phase, **self.metrics_labels)
+            for phase in ("input_drain", "step_world", "step_players", "snapshot_build")
+        }
+        self.tick_timer = metrics.histogram("flappy_tick_seconds", **self.metrics_labels)
+        self.tick_overruns = metrics.counter("flappy_tick_overruns_total", **self.metrics_labels)
         
         # Game dimensions
         self.game_width = 288  # Default Flappy Bird width
@@ -36,7 +67,9 @@ class GameManager:
         
         # Create environment now that all imports are resolved
         try:
-            self.env = MultiplayerFlappyEnv(pipe_gap=self.PIPE_GAP, countdown_seconds=self.countdown_seconds)
+            self.env = MultiplayerFlappyEnv(pipe_gap=self.PIPE_GAP, countdown_seconds=self.countdown_seconds,
+                                            players=self.players, seed=self.world_seed,
+                                            clock=self.scheduler.clock)
         except Exception as e:
             print(f"Error initializing environment: {e}")
             # We'll retry when needed
@@ -46,308 +79,320 @@ class GameManager:
         with self.lock:
             if player_id not in self.players:
                 try:
-                    # Add player to environment with initial state
+                    # Add player to environment with initial state (this also
+                    # allocates their slot in the shared player table)
                     self.env.add_player(player_id)
-                    
-                    # Create player entry in our local state tracking
-                    self.players[player_id] = {
-                        "score": 0,
-                        "alive": True,
-                        "action": 0,  # Default action (do nothing)
-                        "position": self._get_player_position(player_id)
-                    }
+                    self.state_version += 1
                     
                 except Exception as e:
                     print(f"Error adding player {player_id}: {e}")
 
-    def _get_player_position(self, player_id):
-        """Get the current position data for a player from the environment."""
-        if hasattr(self.env, 'player_positions') and player_id in self.env.player_positions:
-            pos = self.env.player_positions[player_id]
-            return {
-                "x": pos['x'],
-                "y": pos['y'],
-                "velocity": pos['vel_y'],
-                "rotation": pos['rot']
-            }
-        # Fall back to default values if we can't get from environment
-        return {
-            "x": 50,
-            "y": self.game_height / 2,
-            "velocity": 0,
-            "rotation": 0
-        }
-
     def remove_player(self, player_id):
         """Remove a player from the game."""
         with self.lock:
             if player_id in self.players:
-                # Remove from local tracking
-                del self.players[player_id]
-                
-                # Remove from environment
+                # Remove from environment (frees the player's slot in the shared table)
                 if self.env:
                     self.env.remove_player(player_id)
+                else:
+                    self.players.remove(player_id)
+                self.state_version += 1
 
     def update_player_action(self, player_id, action):
-        """Update a player's action."""
-        with self.lock:
-            if player_id in self.players and self.players[player_id]["alive"]:
-                # Update local state
-                self.players[player_id]["action"] = action
-                
-                # Pass to environment
-                if self.env:
-                    self.env.set_player_action(player_id, action)
+        """
+        Queue a player's flap for the next tick (never blocks). Inputs outside a
+        running game, and "no action" inputs that the tick would ignore anyway,
+        are not queued, so nothing piles up between games.
+        """
+        if self.game_running and action:
+            self.pending_actions.append((player_id, action))
+
+    def _apply_pending_actions(self):
+        """Drain queued inputs into the player table. Call with the lock held."""
+        while True:
+            try:
+                player_id, action = self.pending_actions.popleft()
+            except IndexError:
+                break
+            
+            # Flaps are latched: a later "no action" in the same tick doesn't cancel one.
+            # The environment ignores actions from dead or unknown players
+            if action and self.env:
+                self.env.set_player_action(player_id, action)
 
     def get_game_state(self):
-        """Get the current state of the game for rendering."""
+        """
+        Get the current state of the game for rendering.
+        The returned dict is a shared snapshot of the latest version - treat it as read-only.
+        """
+        # Lock-free fast path: the snapshot for this version was already built
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot[0] == self.state_version:
+            return snapshot[1]
+        
         with self.lock:
-            game_state = {}
-            
-            # Get environment for world data
-            if not self.env or not hasattr(self.env, 'unwrapped'):
-                return {"_metadata": {"game_over": True, "winner": None}}
-                
-            unwrapped_env = self.env.unwrapped
-            
-            # Check countdown status
-            in_countdown = False
-            countdown_remaining = 0
-            if hasattr(self.env, 'is_in_countdown') and hasattr(self.env, 'get_countdown_remaining'):
-                in_countdown = self.env.is_in_countdown()
-                countdown_remaining = self.env.get_countdown_remaining()
+            # Another reader may have built it while we waited for the lock
+            version = self.state_version
+            snapshot = self._snapshot
+            if snapshot is not None and snapshot[0] == version:
+                return snapshot[1]
             
-            # Extract pipe positions from the environment
-            pipes_data = []
-            if hasattr(unwrapped_env, '_upper_pipes') and hasattr(unwrapped_env, '_lower_pipes'):
-                for upper, lower in zip(unwrapped_env._upper_pipes, unwrapped_env._lower_pipes):
-                    # Check for valid pipe heights
-                    upper_y = upper['y']
-                    lower_y = lower['y']
-                    
-                    # Validate upper pipe height
-                    if upper_y <= 0:
-                        upper_y = 50  # Minimum height
-                    
-                    # Get ground position
-                    ground_y = unwrapped_env._ground['y'] if hasattr(unwrapped_env, '_ground') else self.game_height - 112
-                    
-                    # Ensure lower pipe has valid height
-                    if lower_y >= ground_y:
-                        lower_y = ground_y - 50
-                    
-                    pipes_data.append({
-                        "x": upper['x'],
-                        "upper_y": upper_y,
-                        "lower_y": lower_y
-                    })
-            
-            # Extract ground position
-            ground_y = unwrapped_env._ground['y'] if hasattr(unwrapped_env, '_ground') else self.game_height - 112
+            started = time.perf_counter()
+            game_state = self._build_game_state()
+            self.phase_timers["snapshot_build"].observe(time.perf_counter() - started)
+            self._snapshot = (version, game_state)
+            return game_state
+
+    def _build_game_state(self):
+        """Build a fresh game state dict. Call with the lock held."""
+        # Get environment for world data
+        if not self.env or not hasattr(self.env, 'unwrapped'):
+            return {"_metadata": {"game_over": True, "winner": None}}
             
-            # Global game data shared by all players
-            game_data = {
-                "pipes": pipes_data,
-                "ground_y": ground_y,
-                "screen_width": self.game_width,
-                "screen_height": self.game_height,
-                "pipe_width": self.PIPE_WIDTH,
-                "pipe_gap": self.PIPE_GAP,
-                "countdown": {
-                    "active": in_countdown,
-                    "remaining": countdown_remaining
-                }
+        unwrapped_env = self.env.unwrapped
+        
+        # Check countdown status
+        in_countdown = False
+        countdown_remaining = 0
+        if hasattr(self.env, 'is_in_countdown') and hasattr(self.env, 'get_countdown_remaining'):
+            in_countdown = self.env.is_in_countdown()
+            countdown_remaining = self.env.get_countdown_remaining()
+        
+        # Extract pipe positions from the environment
+        pipes_data = self._get_pipes_data()
+        
+        # Extract ground position
+        ground_y = unwrapped_env._ground['y'] if hasattr(unwrapped_env, '_ground') else self.game_height - 112
+        
+        # Global game data shared by all players
+        game_data = {
+            "pipes": pipes_data,
+            "ground_y": ground_y,
+            "screen_width": self.game_width,
+            "screen_height": self.game_height,
+            "pipe_width": self.PIPE_WIDTH,
+            "pipe_gap": self.PIPE_GAP,
+            "world_seed": self.env.seed,
+            "countdown": {
+                "active": in_countdown,
+                "remaining": countdown_remaining
+            }
+        }
+        
+        # Add player data, reading each column of the shared player table once
+        players = self.players
+        slots = list(players.slots.values())
+        columns = zip(
+            players.slots,
+            players.x[slots].tolist(),
+            players.y[slots].tolist(),
+            players.vel_y[slots].tolist(),
+            players.rot[slots].tolist(),
+            players.score[slots].tolist(),
+            players.alive[slots].tolist()
+        )
+        game_state = {
+            player_id: {
+                "position": {"x": x, "y": y, "velocity": vel_y, "rotation": rot},
+                "score": score,
+                "alive": self.test_mode or alive
             }
+            for player_id, x, y, vel_y, rot, score, alive in columns
+        }
+        
+        # Add metadata
+        game_state["_metadata"] = {
+            "game_over": self.game_over,
+            "winner": self.winner,
+            "timestamp": time.time(),
+            "game_data": game_data,
+            "countdown": {
+                "active": in_countdown,
+                "remaining": countdown_remaining
+            }
+        }
+        
+        return game_state
+
+    def _get_pipes_data(self):
+        """Get the pipe positions from the environment, validated for rendering."""
+        unwrapped_env = self.env.unwrapped
+        x, upper_y, lower_y = self.env.pipes.views()
+        
+        # Get ground position
+        ground_y = unwrapped_env._ground['y'] if hasattr(unwrapped_env, '_ground') else self.game_height - 112
+        
+        # Clamp invalid pipe heights (upper pipes need a minimum height, lower pipes must end above the ground)
+        upper_y = np.where(upper_y <= 0, 50, upper_y)
+        lower_y = np.where(lower_y >= ground_y, ground_y - 50, lower_y)
+        
+        return [
+            {"x": pipe_x, "upper_y": pipe_upper_y, "lower_y": pipe_lower_y}
+            for pipe_x, pipe_upper_y, pipe_lower_y in zip(x.tolist(), upper_y.tolist(), lower_y.tolist())
+        ]
+
+    def encode_frame(self, seq):
+        """Pack the current state into a compact binary frame (see snapshot_codec.py)."""
+        with self.lock:
+            if not self.env or not hasattr(self.env, 'unwrapped'):
+                return None
             
-            # Add player data
-            for player_id, player_data in self.players.items():
-                # Sync from environment state where available
-                is_alive = self.test_mode or (hasattr(self.env, 'is_player_alive') and self.env.is_player_alive(player_id))
-                score = self.env.get_player_score(player_id) if hasattr(self.env, 'get_player_score') else player_data["score"]
-                
-                # Get current position - use environment data if available
-                position = self._get_player_position(player_id)
-                
-                # Add to game state
-                game_state[player_id] = {
-                    "position": position,
-                    "score": score,
-                    "alive": is_alive
-                }
+            unwrapped_env = self.env.unwrapped
+            ground_y = unwrapped_env._ground['y'] if hasattr(unwrapped_env, '_ground') else self.game_height - 112
+            in_countdown = self.env.is_in_countdown()
             
-            # Add metadata
-            game_state["_metadata"] = {
-                "game_over": self.game_over,
-                "winner": self.winner,
-                "timestamp": time.time(),
-                "game_data": game_data,
-                "countdown": {
-                    "active": in_countdown,
-                    "remaining": countdown_remaining
-                }
-            }
+            # Read every player's columns straight from the shared table
+            players = self.players
+            slots = np.fromiter(players.slots.values(), dtype=np.int64, count=len(players))
+            winner = players.slot(self.winner) if self.winner in players else -1
             
-            return game_state
+            return snapshot_codec.encode_frame(
+                snapshot_codec.FRAME_KIND_MULTIPLAYER, seq,
+                pipes=self._get_pipes_data(),
+                slots=slots,
+                y=players.y[slots],
+                rotation=players.rot[slots],
+                score=players.score[slots],
+                alive=players.alive[slots] | self.test_mode,
+                game_over=self.game_over,
+                winner=winner,
+                ground_y=ground_y,
+                countdown_active=in_countdown,
+                countdown_remaining=self.env.get_countdown_remaining() if in_countdown else 0
+            )
+
+    def get_roster(self):
+        """Get the {player_id: slot} mapping used to decode binary frames."""
+        with self.lock:
+            return dict(self.players.slots)
 
     def start_game(self):
-        """Start the game loop in a separate thread."""
-        if self.game_thread is not None and self.game_thread.is_alive():
+        """Start stepping the game on the shared tick scheduler."""
+        if self.game_running:
             return  # Game already running
         
         # Reset game state
         self.game_over = False
         self.winner = None
-        self.game_running = True
-        self.last_frame_time = time.time()
+        self.state_version += 1
         
-        # Start game loop in a thread
-        self.game_thread = threading.Thread(target=self._game_loop)
-        self.game_thread.daemon = True
-        self.game_thread.start()
-
-    def _game_loop(self):
-        """Main game loop that runs in a separate thread."""
         try:
             # Reset the environment
-            self.env = MultiplayerFlappyEnv(pipe_gap=self.PIPE_GAP, countdown_seconds=self.countdown_seconds)
+            self.env = MultiplayerFlappyEnv(pipe_gap=self.PIPE_GAP, countdown_seconds=self.countdown_seconds,
+                                            players=self.players, seed=self.world_seed,
+                                            clock=self.scheduler.clock)
             observation, info = self.env.reset()
             
             # Re-initialize all players in the new environment
             with self.lock:
-                for player_id in list(self.players.keys()):
+                for player_id in list(self.players):
                     self.env.add_player(player_id)
-                    self.players[player_id]["score"] = 0
-                    self.players[player_id]["alive"] = True
-                    self.players[player_id]["action"] = 0
-                    self.players[player_id]["position"] = self._get_player_position(player_id)
+                self.state_version += 1
+        except Exception as e:
+            print(f"Error starting game: {e}")
+            self.game_over = True
+            return
+        
+        self.game_running = True
+        self.scheduler.add(self.task_key, self.tick, rate=self.frame_rate)
+
+    def tick(self):
+        """Advance the game by one frame. Called by the tick scheduler."""
+        if not self.game_running:
+            return
+        
+        started = time.perf_counter()
+        try:
+            # Wait for countdown to finish - the world doesn't move yet
+            if self.env.is_in_countdown():
+                self.pending_actions.clear()  # No flapping before the start
+                self.state_version += 1  # The countdown itself still changes
+                return
             
-            # First, handle countdown phase
-            while self.game_running and self.env.is_in_countdown():
-                current_time = time.time()
-                elapsed = current_time - self.last_frame_time
-                sleep_time = max(0, 1.0/self.frame_rate - elapsed)
-                if sleep_time > 0:
-                    time.sleep(sleep_time)
-                self.last_frame_time = time.time()
-                
-                # During countdown, just update positions but don't process physics
-                with self.lock:
-                    for player_id in list(self.players.keys()):
-                        self.players[player_id]["position"] = self._get_player_position(player_id)
+            # Step the world forward (move pipes)
+            phase_started = time.perf_counter()
+            if hasattr(self.env, 'step_world'):
+                self.env.step_world()
+            self.phase_timers["step_world"].observe(time.perf_counter() - phase_started)
+            
+            with self.lock:
+                # Inputs that arrived since the last tick apply to this one
+                phase_started = time.perf_counter()
+                self._apply_pending_actions()
+                self.phase_timers["input_drain"].observe(time.perf_counter() - phase_started)
                 
-                # Wait for countdown to finish
-                if self.env.get_countdown_remaining() <= 0:
-                    print("Countdown finished, starting game!")
-                    break
-
-            # Game loop - only starts after countdown is complete
-            while self.game_running:
-                # Maintain frame rate
-                current_time = time.time()
-                elapsed = current_time - self.last_frame_time
-                sleep_time = max(0, 1.0/self.frame_rate - elapsed)
-                if sleep_time > 0:
-                    time.sleep(sleep_time)
-                self.last_frame_time = time.time()
+                # Step every player in one vectorized pass over the shared table
+                phase_started = time.perf_counter()
+                try:
+                    obs, rewards, dones, truncated, info = self.env.step_all_players(observe=False)
+                except Exception as e:
+                    print(f"Error stepping players: {e}")
+                    self._count_error("step_players")
+                    return
+                self.phase_timers["step_players"].observe(time.perf_counter() - phase_started)
                 
-                # Step the world forward (move pipes)
-                if hasattr(self.env, 'step_world'):
-                    self.env.step_world()
+                # Actions only apply to the frame they were drained for; anything
+                # sent during the step is still queued for the next tick
+                self.players.action[:] = 0
                 
-                # Process each player's state
-                alive_players = []
+                if self.test_mode:
+                    # In test mode, players never die - respawn anyone who would have
+                    for player_id in list(self.players):
+                        if dones[self.players.slot(player_id)]:
+                            try:
+                                self.env.respawn_player(player_id)  # Reset position, the world keeps going
+                            except Exception as e:
+                                print(f"Error processing player {player_id}: {e}")
+                                self._count_error("respawn")
                 
-                with self.lock:
-                    # First collect actions for all players
-                    for player_id in list(self.players.keys()):
-                        # Skip dead players
-                        if not self.players[player_id]["alive"] and not self.test_mode:
-                            continue
-                            
-                        # Get action
-                        action = self.players[player_id]["action"]
-                        
-                        # Set action in environment
-                        self.env.set_player_action(player_id, action)
-                        
-                        # Reset action after processing
-                        self.players[player_id]["action"] = 0
+                alive_count = int(self.players.alive[:self.players.size].sum())
+                self.state_version += 1
+            
+            # Only check end conditions if not in test mode
+            if not self.test_mode:
+                # No players left alive - game over with no winner
+                if alive_count == 0:
+                    self.game_over = True
+                    self._end_game()
+                    
+                # Only one player left alive - we have a winner!
+                # if alive_count == 1 and len(self.players) > 1:
+                #     self.winner = self.players.ids[int(np.flatnonzero(self.players.alive)[0])]
+                #     self.game_over = True
+                #     self._end_game()
                     
-                    # Then step each player separately
-                    for player_id in list(self.players.keys()):
-                        # Skip dead players
-                        if not self.players[player_id]["alive"] and not self.test_mode:
-                            continue
-                            
-                        # Process player step in environment
-                        try:
-                            obs, reward, done, truncated, info = self.env.step_player(player_id)
-                            
-                            # Handle player death
-                            if done and not self.test_mode:
-                                self.players[player_id]["alive"] = False
-                            elif self.test_mode:
-                                # In test mode, players never die
-                                self.players[player_id]["alive"] = True
-                                
-                                # If they would have died, reset their position
-                                if done:
-                                    self.env.add_player(player_id)  # Reset position
-                                    
-                            # Update position and score
-                            self.players[player_id]["position"] = self._get_player_position(player_id)
-                            self.players[player_id]["score"] = self.env.get_player_score(player_id)
-                            
-                            # Track alive players
-                            if self.players[player_id]["alive"]:
-                                alive_players.append(player_id)
-                                
-                        except Exception as e:
-                            print(f"Error processing player {player_id}: {e}")
-                            if not self.test_mode:
-                                self.players[player_id]["alive"] = False
-                            else:
-                                # Try to recover in test mode
-                                try:
-                                    self.env.add_player(player_id)
-                                    self.players[player_id]["alive"] = True
-                                    self.players[player_id]["position"] = self._get_player_position(player_id)
-                                except:
-                                    pass
-                
-                # Only check end conditions if not in test mode
-                if not self.test_mode:
-                    # No players left alive - game over with no winner
-                    if len(alive_players) == 0:
-                        self.game_over = True
-                        self.game_running = False
-                        break
-                        
-                    # Only one player left alive - we have a winner!
-                    # if len(alive_players) == 1 and len(self.players) > 1:
-                    #     self.winner = alive_players[0]
-                    #     self.game_over = True
-                    #     self.game_running = False
-                    #     break
-                        
         except Exception as e:
             print(f"Error in game loop: {e}")
-            self.game_running = False
+            self._count_error("game_loop")
             self.game_over = True
+            self._end_game()
         finally:
-            try:
-                if hasattr(self.env, 'close'):
-                    self.env.close()
-            except:
-                pass
+            elapsed = time.perf_counter() - started
+            self.tick_timer.observe(elapsed)
+            if elapsed > 1.0 / self.frame_rate:
+                self.tick_overruns.inc()
+
+    def _count_error(self, where):
+        """Count an error caught in the game loop (flappy_errors_total on /metrics)."""
+        get_metrics().counter("flappy_errors_total", where=where, **self.metrics_labels).inc()
+
+    def _end_game(self):
+        """Stop ticking and release the environment."""
+        self.game_running = False
+        self.scheduler.remove(self.task_key)
+        self.pending_actions.clear()
+        self.state_version += 1
+        try:
+            if hasattr(self.env, 'close'):
+                self.env.close()
+        except:
+            pass
 
     def stop_game(self):
         """Stop the running game."""
         self.game_running = False
-        if self.game_thread is not None:
-            self.game_thread.join(timeout=1.0)
-            self.game_thread = None
+        self.scheduler.remove(self.task_key)
+        self.pending_actions.clear()
     
     def reset_game(self):
         """Reset the game state for a new game."""
@@ -355,9 +400,13 @@ class GameManager:
             self.stop_game()
             self.game_over = False
             self.winner = None
-            self.players = {}
+            self.players.clear()
+            self.pending_actions.clear()
+            self.state_version += 1
             try:
-                self.env = MultiplayerFlappyEnv(pipe_gap=self.PIPE_GAP, countdown_seconds=self.countdown_seconds)
+                self.env = MultiplayerFlappyEnv(pipe_gap=self.PIPE_GAP, countdown_seconds=self.countdown_seconds,
+                                                players=self.players, seed=self.world_seed,
+                                                clock=self.scheduler.clock)
             except Exception as e:
                 print(f"Error resetting environment: {e}")
                 # Try to recover
@@ -366,15 +415,16 @@ class GameManager:
                         self.env.close()
                 except:
                     pass
-                self.env = MultiplayerFlappyEnv(pipe_gap=self.PIPE_GAP, countdown_seconds=self.countdown_seconds)
+                self.env = MultiplayerFlappyEnv(pipe_gap=self.PIPE_GAP, countdown_seconds=self.countdown_seconds,
+                                                players=self.players, seed=self.world_seed,
+                                                clock=self.scheduler.clock)
 
     def set_test_mode(self, enabled=True):
         """Enable or disable test mode (never-ending game)."""
         with self.lock:
             self.test_mode = enabled
+            self.state_version += 1
             print(f"Test mode {'enabled' if enabled else 'disabled'}")
             
-            # If in test mode, make all players alive
-            if self.test_mode:
-                for player_id in self.players:
-                    self.players[player_id]["alive"] = True
\ No newline at end of file
+            # Players who are already dead get respawned by the game loop on its
+            # next step, since dead birds always report done
\ No newline at end of file
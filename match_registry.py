@@ -0,0 +1,168 @@
+import threading
+import uuid
+from game_manager import GameManager
+from metrics import get_metrics
+from single_player_game_manager import SinglePlayerGameManager
+from fanout import BroadcastStream
+
+DEFAULT_MATCH_ID = "main"
+
+class Match:
+    """
+    One battle royale match: its own GameManager (and MultiplayerFlappyEnv), its
+    players and spectators, and the broadcast state for its Socket.IO room.
+    """
+    def __init__(self, match_id, name=None, keyframe_interval=20, seed=None, spectator_every=1):
+        self.match_id = match_id
+        self.name = name or match_id
+        self.room = f"match:{match_id}"  # Socket.IO room for lobby and game events
+        self.game_manager = GameManager(seed=seed, match_id=match_id)  # A fixed seed replays the same world every game
+
+        self.players = {}  # Store player information (username, admin status)
+        self.players_version = 0  # Bumped whenever `players` changes
+        self.spectators = set()  # Track spectator IDs
+        self.game_in_progress = False
+
+        # Broadcast state: players get every frame, spectators every `spectator_every`-th
+        # one, and clients that only browse the lobby are in neither room
+        self.player_stream = BroadcastStream("players", f"{self.room}:players", keyframe_interval=keyframe_interval)
+        self.spectator_stream = BroadcastStream("spectators", f"{self.room}:spectators", every=spectator_every,
+                                                keyframe_interval=keyframe_interval)
+        self.game_frame_seq = 0  # Sequence number for binary frames
+        self.last_game_frame = None  # Last packed frame, reused for late joiners
+        self.last_game_roster = None  # Last roster sent alongside binary frames
+        self.enhanced_state = None  # (game state, players_version, enhanced state) memo
+
+    def reset_broadcast_state(self):
+        """Forget everything sent for the previous game."""
+        self.player_stream.reset()
+        self.spectator_stream.reset()
+        self.last_game_frame = None
+        self.last_game_roster = None
+        self.enhanced_state = None
+
+    def stream_for(self, sid):
+        """Get the broadcast stream a client in this match receives."""
+        return self.spectator_stream if sid in self.spectators else self.player_stream
+
+    def is_empty(self):
+        """Check if nobody is playing or watching this match."""
+        return not self.players and not self.spectators
+
+    def summary(self):
+        """Get a JSON-friendly description of the match for lobby listings."""
+        return {
+            "id": self.match_id,
+            "name": self.name,
+            "players": len(self.players),
+            "spectators": len(self.spectators),
+            "inProgress": self.game_in_progress
+        }
+
+class AiMatch:
+    """A single player vs AI game, owned by one client."""
+    def __init__(self, sid):
+        self.sid = sid
+        self.manager = SinglePlayerGameManager()
+        self.game_in_progress = False
+        self.last_game_state = None  # Track the last AI game state
+        self.last_game_frame = None  # Last packed AI frame
+        self.game_frame_seq = 0  # Sequence number for binary AI frames
+
+    def reset_broadcast_state(self):
+        """Forget everything sent for the previous game."""
+        self.last_game_state = None
+        self.last_game_frame = None
+
+class MatchRegistry:
+    """
+    Registry of every match hosted by this process.
+    Matches are created on demand and clients are tracked by socket sid so each
+    event can be routed to the match (and room) the client belongs to.
+    """
+    def __init__(self, keyframe_interval=20, spectator_every=1):
+        self.keyframe_interval = keyframe_interval
+        self.spectator_every = spectator_every
+        self.lock = threading.Lock()
+        self.matches = {}  # {match_id: Match}
+        self.client_matches = {}  # {sid: match_id}
+        self.ai_matches = {}  # {sid: AiMatch}
+
+        # Always keep a default match so clients that don't pick one still have a game
+        self.create(DEFAULT_MATCH_ID, name="Main")
+
+    def create(self, match_id=None, name=None, seed=None):
+        """Create a match (or return the existing one with this id)."""
+        with self.lock:
+            match_id = match_id or uuid.uuid4().hex[:8]
+            if match_id not in self.matches:
+                self.matches[match_id] = Match(match_id, name=name, keyframe_interval=self.keyframe_interval, seed=seed,
+                                               spectator_every=self.spectator_every)
+            return self.matches[match_id]
+
+    def get(self, match_id):
+        """Get a match by id, or None."""
+        return self.matches.get(match_id)
+
+    def list(self):
+        """Get summaries of all matches."""
+        with self.lock:
+            return [match.summary() for match in self.matches.values()]
+
+    def all(self):
+        """Get a snapshot list of all matches (safe to iterate while matches come and go)."""
+        with self.lock:
+            return list(self.matches.values())
+
+    def match_for(self, sid):
+        """Get the match a client has joined, or None."""
+        match_id = self.client_matches.get(sid)
+        return self.matches.get(match_id) if match_id else None
+
+    def assign(self, sid, match):
+        """Record that a client joined a match."""
+        with self.lock:
+            self.client_matches[sid] = match.match_id
+
+    def release(self, sid):
+        """
+        Forget a client's match membership. Returns the match they were in.
+        Empty matches other than the default one are removed.
+        """
+        with self.lock:
+            match_id = self.client_matches.pop(sid, None)
+            match = self.matches.get(match_id)
+            if match is None:
+                return None
+            if match.players.pop(sid, None) is not None:
+                match.players_version += 1
+            match.spectators.discard(sid)
+            match.player_stream.discard(sid)
+            match.spectator_stream.discard(sid)
+            closed = match.is_empty() and match_id != DEFAULT_MATCH_ID
+            if closed:
+                del self.matches[match_id]
+
+        if closed:
+            match.game_manager.stop_game()
+            get_metrics().remove(match=match_id)
+        return match
+
+    def ai_match_for(self, sid, create=False):
+        """Get the AI game owned by a client, optionally creating it."""
+        with self.lock:
+            if create and sid not in self.ai_matches:
+                self.ai_matches[sid] = AiMatch(sid)
+            return self.ai_matches.get(sid)
+
+    def release_ai_match(self, sid):
+        """Stop and forget the AI game owned by a client."""
+        with self.lock:
+            ai_match = self.ai_matches.pop(sid, None)
+        if ai_match:
+            ai_match.manager.stop_game()
+
+    def all_ai_matches(self):
+        """Get a snapshot list of all AI games."""
+        with self.lock:
+            return list(self.ai_matches.values())
@@ -0,0 +1,164 @@
+import bisect
+import threading
+
+# Histogram bucket upper bounds in seconds, from 50 µs up to 1 s. A 60 Hz frame has a
+# 16.7 ms budget, so everything past that bucket is a tick that can't keep up
+DEFAULT_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+                   0.01, 0.0167, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+# Every metric the server records: {name: (type, help)}
+METRICS = {
+    "flappy_phase_seconds": ("histogram", "Time spent in each phase of a match's frame"),
+    "flappy_tick_seconds": ("histogram", "Total time of one game tick"),
+    "flappy_tick_overruns_total": ("counter", "Game ticks that took longer than their frame budget"),
+    "flappy_errors_total": ("counter", "Errors caught in the game loops"),
+    "flappy_dropped_frames_total": ("counter", "Game frames skipped for clients whose send queue was backed up"),
+}
+
+class Histogram:
+    """
+    Fixed-bucket histogram. Memory is the same however many samples are observed,
+    and the cumulative counts map straight onto a Prometheus histogram.
+    """
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # Last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        """Record one sample (seconds)."""
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def snapshot(self):
+        """Get (cumulative bucket counts, sum, count) at one point in time."""
+        with self.lock:
+            counts = list(self.counts)
+            total, count = self.sum, self.count
+        cumulative = []
+        running = 0
+        for bucket_count in counts:
+            running += bucket_count
+            cumulative.append(running)
+        return cumulative, total, count
+
+class Counter:
+    """Monotonic counter."""
+    def __init__(self):
+        self.value = 0
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self.lock:
+            self.value += amount
+
+class Metrics:
+    """
+    Process-wide metric store rendered in the Prometheus text format.
+
+    Hot paths ask for their histogram or counter once (e.g. when a game manager is
+    created) and keep the object, so recording a sample is a bisect and an add.
+    Values that already live elsewhere (player counts, scheduler and policy server
+    stats) are read by collectors at scrape time instead of being copied every tick.
+    A collector returns [(name, type, help, [(labels, value), ...]), ...].
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.series = {}  # {(name, labels tuple): Histogram or Counter}
+        self.collectors = []
+
+    def _get(self, name, factory, labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            metric = self.series.get(key)
+            if metric is None:
+                metric = self.series[key] = factory()
+            return metric
+
+    def histogram(self, name, **labels):
+        """Get (or create) the histogram for these labels."""
+        return self._get(name, Histogram, labels)
+
+    def counter(self, name, **labels):
+        """Get (or create) the counter for these labels."""
+        return self._get(name, Counter, labels)
+
+    def remove(self, **labels):
+        """Drop every series carrying these label values (e.g. a closed match)."""
+        wanted = set(labels.items())
+        with self.lock:
+            for key in [key for key in self.series if wanted <= set(key[1])]:
+                del self.series[key]
+
+    def add_collector(self, collector):
+        """Register a callable that reports extra metrics at scrape time."""
+        self.collectors.append(collector)
+
+    def render(self):
+        """Render every metric in the Prometheus text exposition format."""
+        families = {}  # {name: (type, help, [lines])}
+        with self.lock:
+            series = sorted(self.series.items(), key=lambda item: item[0])
+
+        for (name, labels), metric in series:
+            kind, help_text = METRICS.get(name, ("untyped", ""))
+            lines = families.setdefault(name, (kind, help_text, []))[2]
+            if isinstance(metric, Histogram):
+                cumulative, total, count = metric.snapshot()
+                bounds = [_format_value(bound) for bound in metric.buckets] + ["+Inf"]
+                for bound, bucket_count in zip(bounds, cumulative):
+                    lines.append(f"{name}_bucket{_format_labels(labels + (('le', bound),))} {bucket_count}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(total)}")
+                lines.append(f"{name}_count{_format_labels(labels)} {count}")
+            else:
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(metric.value)}")
+
+        for collector in list(self.collectors):
+            try:
+                collected = collector()
+            except Exception as e:
+                print(f"Error collecting metrics: {e}")
+                continue
+            for name, kind, help_text, samples in collected:
+                lines = families.setdefault(name, (kind, help_text, []))[2]
+                for labels, value in samples:
+                    lines.append(f"{name}{_format_labels(tuple(sorted(labels.items())))} {_format_value(value)}")
+
+        output = []
+        for name, (kind, help_text, lines) in families.items():
+            output.append(f"# HELP {name} {help_text}")
+            output.append(f"# TYPE {name} {kind}")
+            output.extend(lines)
+        return "\n".join(output) + "\n"
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    pairs = ",".join(f'{key}="{_escape(value)}"' for key, value in labels)
+    return "{" + pairs + "}"
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_value(value):
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, int):
+        return str(value)
+    return repr(float(value))
+
+_metrics = None
+_metrics_lock = threading.Lock()
+
+def get_metrics():
+    """Get the process-wide metric store."""
+    global _metrics
+    with _metrics_lock:
+        if _metrics is None:
+            _metrics = Metrics()
+        return _metrics
@@ -0,0 +1,201 @@
+import os
+import threading
+import time
+from collections import deque
+import numpy as np
+from tick_scheduler import get_scheduler
+
+# 'numpy' runs the AI from exported .npz weights without importing torch,
+# 'torch' loads the original .pth checkpoint
+POLICY_BACKEND = os.environ.get('POLICY_BACKEND', 'numpy')
+
+# Default weights are looked up next to this module, then in RL/saved_policies.
+# dqn_flappy_bird.npz is committed; re-export it with RL/export_policies.py after retraining
+MODULE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_DIRS = (MODULE_DIR, os.path.join(MODULE_DIR, "RL", "saved_policies"))
+MODEL_NAME = "dqn_flappy_bird"
+
+class NumpyDQN:
+    """
+    NumPy forward pass of the DQN (12 -> 128 -> 128 -> 2 MLP with ReLU).
+    Loads the .npz weights written by RL/export_policies.py, so the server never
+    has to import torch.
+    """
+    LAYERS = ("fc1", "fc2", "fc3")
+
+    def __init__(self, input_dim, output_dim, hidden_dim=128):
+        # Same uniform(-1/sqrt(fan_in), 1/sqrt(fan_in)) init as torch's nn.Linear,
+        # so a missing weight file behaves like an untrained torch model
+        rng = np.random.default_rng()
+        dims = (input_dim, hidden_dim, hidden_dim, output_dim)
+        self.weights = []
+        for fan_in, fan_out in zip(dims[:-1], dims[1:]):
+            bound = 1.0 / np.sqrt(fan_in)
+            self.weights.append((
+                rng.uniform(-bound, bound, (fan_in, fan_out)).astype(np.float32),
+                rng.uniform(-bound, bound, fan_out).astype(np.float32)
+            ))
+
+    def load(self, path):
+        """Load exported weights. Stored as torch (out, in) matrices, kept transposed for x @ W."""
+        with np.load(path) as data:
+            self.weights = [
+                (np.ascontiguousarray(data[f"{layer}.weight"].T, dtype=np.float32),
+                 data[f"{layer}.bias"].astype(np.float32))
+                for layer in self.LAYERS
+            ]
+
+    def q_values(self, batch):
+        """Q-values for a (batch, input_dim) float32 array."""
+        x = batch
+        for i, (weight, bias) in enumerate(self.weights):
+            x = x @ weight + bias
+            if i < len(self.weights) - 1:
+                np.maximum(x, 0, out=x)
+        return x
+
+class TorchDQN:
+    """The torch DQN, imported only when the torch backend is selected."""
+    def __init__(self, input_dim, output_dim):
+        import torch
+        from dqn_torch import DQN
+        self.torch = torch
+        self.model = DQN(input_dim, output_dim)
+
+    def load(self, path):
+        self.model.load_state_dict(self.torch.load(path, map_location="cpu"))
+        self.model.eval()
+
+    def q_values(self, batch):
+        with self.torch.no_grad():
+            return self.model(self.torch.from_numpy(batch)).numpy()
+
+class PolicyServer:
+    """
+    Shared DQN inference for every AI game in the process.
+
+    One copy of the model is loaded. Games attach to the server instead of
+    scheduling their own tick: on each server tick every attached game hands over
+    its observation, all observations go through the model in a single batched
+    forward pass, and each game is then stepped with its action.
+    """
+    def __init__(self, model_path=None, input_dim=12, output_dim=2, rate=40, scheduler=None, backend=POLICY_BACKEND):
+        self.input_dim = input_dim
+        self.rate = rate  # Frame rate of every attached game
+        self.scheduler = scheduler or get_scheduler()
+        self.task_key = f"ai-policy-{id(self):x}"
+        self.lock = threading.Lock()
+        self.games = {}  # {id(game): game}
+
+        # Load AI model. Without trained weights the AI would play at random, so
+        # games are refused (see attach) instead
+        self.load_error = None
+        try:
+            if backend == 'torch':
+                self.model = TorchDQN(input_dim, output_dim)
+                model_path = model_path or _find_weights(".pth")
+            else:
+                self.model = NumpyDQN(input_dim, output_dim)
+                model_path = model_path or _find_weights(".npz")
+            if model_path is None:
+                raise FileNotFoundError(f"no {MODEL_NAME} weights in {', '.join(MODEL_DIRS)}")
+            self.model.load(model_path)
+            print(f"AI model loaded successfully from {model_path} ({backend})")
+        except Exception as e:
+            self.load_error = str(e)
+            print(f"Error loading AI model, AI games are disabled: {e}")
+
+        # Recent (batch size, seconds) per forward pass
+        self.batch_history = deque(maxlen=1000)
+        self.batches = 0
+
+    def attach(self, game):
+        """
+        Start stepping a game. The game must provide policy_observation(), returning
+        its current observation (or None if it doesn't need an action this tick),
+        and tick(ai_action). Raises RuntimeError if the model couldn't be loaded.
+        """
+        if self.load_error is not None:
+            raise RuntimeError(f"AI model not loaded: {self.load_error}")
+        with self.lock:
+            self.games[id(game)] = game
+            if len(self.games) == 1:
+                self.scheduler.add(self.task_key, self.tick, rate=self.rate)
+
+    def detach(self, game):
+        """Stop stepping a game. Safe to call from inside the game's tick."""
+        with self.lock:
+            if self.games.pop(id(game), None) is not None and not self.games:
+                self.scheduler.remove(self.task_key)
+
+    def act(self, observations):
+        """
+        Greedy actions for a batch of observations, in one forward pass. Raises
+        ValueError unless there is exactly one input_dim-feature row per observation.
+        """
+        batch = np.stack(observations).astype(np.float32, copy=False)
+        if batch.shape != (len(observations), self.input_dim):
+            raise ValueError(f"expected {len(observations)} observations of {self.input_dim} features, got shape {batch.shape}")
+        start = time.perf_counter()
+        actions = self.model.q_values(batch).argmax(axis=1)
+        self.batch_history.append((len(batch), time.perf_counter() - start))
+        self.batches += 1
+        return actions
+
+    def tick(self):
+        """Batch every attached game's observation, then step each game. Called by the tick scheduler."""
+        with self.lock:
+            games = list(self.games.values())
+
+        # Collect observations from games that are past their countdown
+        waiting = []
+        observations = []
+        for game in games:
+            observation = game.policy_observation()
+            if observation is not None:
+                waiting.append(game)
+                observations.append(observation)
+
+        actions = {}
+        if observations:
+            for game, action in zip(waiting, self.act(observations)):
+                actions[id(game)] = int(action)
+
+        for game in games:
+            game.tick(actions.get(id(game)))
+
+    def stats(self):
+        """Get batch size and forward pass latency statistics over recent batches."""
+        history = list(self.batch_history)
+        if not history:
+            return {"games": len(self.games), "batches": self.batches, "model_loaded": self.load_error is None}
+        sizes = np.array([size for size, _ in history])
+        latencies = np.array([seconds for _, seconds in history]) * 1000
+        return {
+            "games": len(self.games),
+            "batches": self.batches,
+            "model_loaded": self.load_error is None,
+            "mean_batch_size": round(float(sizes.mean()), 2),
+            "mean_latency_ms": round(float(latencies.mean()), 3),
+            "p99_latency_ms": round(float(np.percentile(latencies, 99)), 3),
+            "max_latency_ms": round(float(latencies.max()), 3)
+        }
+
+def _find_weights(extension):
+    """Path of the default weights file with this extension, or None."""
+    for directory in MODEL_DIRS:
+        path = os.path.join(directory, MODEL_NAME + extension)
+        if os.path.exists(path):
+            return path
+    return None
+
+_server = None
+_server_lock = threading.Lock()
+
+def get_policy_server():
+    """Get the process-wide policy server, loading the model on first use."""
+    global _server
+    with _server_lock:
+        if _server is None:
+            _server = PolicyServer()
+        return _server
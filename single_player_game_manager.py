@@ -1,34 +1,27 @@
 import gymnasium as gym
 import threading
-import time
+from collections import deque
 import numpy as np
-import torch
-import torch.nn as nn
 from flappy_bird_gymnasium.envs.flappy_bird_env import FlappyBirdEnv
-
-class DQN(nn.Module):
-    """DQN model used by the AI player"""
-    def __init__(self, input_dim, output_dim):
-        super(DQN, self).__init__()
-        self.fc1 = nn.Linear(input_dim, 128)
-        self.fc2 = nn.Linear(128, 128)
-        self.fc3 = nn.Linear(128, output_dim)
-    
-    def forward(self, x):
-        x = torch.relu(self.fc1(x))
-        x = torch.relu(self.fc2(x))
-        return self.fc3(x)
+from policy_server import get_policy_server
 
 class SinglePlayerGameManager:
     """Game manager for a single player vs AI game"""
-    def __init__(self):
+    def __init__(self, policy_server=None):
         self.env = None
-        self.game_thread = None
+        self.player_env = None
         self.game_running = False
         self.game_over = False
         self.lock = threading.Lock()
-        self.frame_rate = 40  # Target frame rate for game loop
-        self.last_frame_time = 0
+        # Player inputs, drained once per tick without taking the lock (unbounded so
+        # no flap is ever dropped)
+        self.pending_actions = deque()
+        
+        # The shared policy server steps this game (at its frame rate) and batches
+        # the AI's inference with every other AI game
+        self.policy_server = policy_server or get_policy_server()
+        self.countdown_duration = 3  # seconds
+        self.countdown_start = None  # Scheduler clock time when the countdown started
         
         # Game state tracking
         self.player_data = {
@@ -43,15 +36,6 @@ class SinglePlayerGameManager:
             "score": 0
         }
         
-        # Load AI model
-        self.ai_model = DQN(12, 2)  # 12 input features, 2 output actions
-        try:
-            self.ai_model.load_state_dict(torch.load("dqn_flappy_bird.pth"))
-            self.ai_model.eval()
-            print("AI model loaded successfully")
-        except Exception as e:
-            print(f"Error loading AI model: {e}")
-        
         # Game state for frontend rendering
         self.game_state = {
             "player": self.player_data,
@@ -74,23 +58,46 @@ class SinglePlayerGameManager:
         }
 
     def start_game(self):
-        """Start the game in a separate thread"""
-        if self.game_thread and self.game_thread.is_alive():
+        """Start stepping the game on the shared policy server"""
+        if self.game_running:
             return False
         
-        self.game_running = True
         self.game_over = False
-        self.game_thread = threading.Thread(target=self._game_loop)
-        self.game_thread.daemon = True
-        self.game_thread.start()
+        
+        try:
+            # Initialize environment (12-feature observations, as the DQN expects)
+            self.env = gym.make("FlappyBird-v0", render_mode=None, use_lidar=False)
+            self.observation, _ = self.env.reset()
+        except Exception as e:
+            print(f"Error creating environment: {e}")
+            return False
+        
+        # Drop inputs left over from a previous game
+        self.pending_actions.clear()
+        
+        # Start with countdown
+        self.countdown_start = self.policy_server.scheduler.clock()
+        
+        # Update metadata to show countdown
+        with self.lock:
+            self.game_state["_metadata"]["countdown"] = {
+                "active": True,
+                "remaining": self.countdown_duration
+            }
+        
+        self.game_running = True
+        try:
+            self.policy_server.attach(self)
+        except RuntimeError as e:
+            print(f"Error starting AI game: {e}")
+            self.game_running = False
+            return False
         return True
 
     def stop_game(self):
         """Stop the running game"""
         self.game_running = False
-        if self.game_thread:
-            self.game_thread.join(timeout=1.0)
-            self.game_thread = None
+        self.policy_server.detach(self)
 
     def reset_game(self):
         """Reset the game state for a new game"""
@@ -128,170 +135,156 @@ class SinglePlayerGameManager:
                     pass
             
             try:
-                self.env = gym.make("FlappyBird-v0", render_mode=None)
+                self.env = gym.make("FlappyBird-v0", render_mode=None, use_lidar=False)
             except Exception as e:
                 print(f"Error creating environment: {e}")
 
     def update_player_action(self, action):
-        """Update player action (0 = do nothing, 1 = flap)"""
-        with self.lock:
-            if not self.game_running or not self.player_data["alive"]:
-                return
-            
-            # Set player action based on frontend input
-            # Action 1 = flap (spacebar press)
-            # Action 0 = do nothing (default)
-            self.player_action = action
+        """Queue a player action for the next tick (0 = do nothing, 1 = flap)"""
+        if not self.game_running or not self.player_data["alive"]:
+            return
+        
+        # Action 1 = flap (spacebar press)
+        # Action 0 = do nothing (default)
+        self.pending_actions.append(action)
+
+    def _drain_player_action(self):
+        """Get the action for this tick: a flap if any queued input was a flap"""
+        action = 0
+        while True:
+            try:
+                action = max(action, self.pending_actions.popleft())
+            except IndexError:
+                return action
 
     def get_game_state(self):
         """Get the current game state for frontend rendering"""
         with self.lock:
             return self.game_state.copy()
 
-    def _game_loop(self):
-        """Main game loop that runs in a separate thread"""
+    def policy_observation(self):
+        """Get the AI's observation for the policy server, or None while counting down"""
+        if not self.game_running or self.countdown_start is not None:
+            return None
+        return self.observation
+
+    def tick(self, ai_action=None):
+        """Advance the game by one frame. Called by the policy server with the AI's action"""
+        if not self.game_running:
+            return
+        
         try:
-            # Initialize environment
-            self.env = gym.make("FlappyBird-v0", render_mode=None)
-            observation, _ = self.env.reset()
-            
-            # Track player and AI actions
-            self.player_action = 0
-            
-            # Start with countdown
-            countdown_start = time.time()
-            countdown_duration = 3  # seconds
-            
-            # Update metadata to show countdown
+            if self.countdown_start is not None:
+                self._tick_countdown()
+            else:
+                self._tick_game(ai_action or 0)
+        except Exception as e:
+            print(f"Error in game loop: {e}")
+            import traceback
+            traceback.print_exc()
             with self.lock:
-                self.game_state["_metadata"]["countdown"] = {
-                    "active": True,
-                    "remaining": countdown_duration
-                }
-            
-            # Wait for countdown
-            while self.game_running and time.time() - countdown_start < countdown_duration:
-                remaining = countdown_duration - (time.time() - countdown_start)
-                
-                with self.lock:
-                    self.game_state["_metadata"]["countdown"]["remaining"] = remaining
-                
-                # Control frame rate
-                current_time = time.time()
-                elapsed = current_time - self.last_frame_time
-                sleep_time = max(0, 1.0/self.frame_rate - elapsed)
-                if sleep_time > 0:
-                    time.sleep(sleep_time)
-                self.last_frame_time = time.time()
-            
-            # Disable countdown
+                self.game_state["_metadata"]["game_over"] = True
+            self._end_game()
+
+    def _tick_countdown(self):
+        """Count down, then reset both environments to start fresh"""
+        remaining = self.countdown_duration - (self.policy_server.scheduler.clock() - self.countdown_start)
+        if remaining > 0:
             with self.lock:
-                self.game_state["_metadata"]["countdown"] = {
-                    "active": False,
-                    "remaining": 0
-                }
+                self.game_state["_metadata"]["countdown"]["remaining"] = remaining
+            return
+        
+        # Disable countdown
+        self.countdown_start = None
+        with self.lock:
+            self.game_state["_metadata"]["countdown"] = {
+                "active": False,
+                "remaining": 0
+            }
+        
+        # Reset environment to start fresh after countdown
+        self.observation, _ = self.env.reset()
+        self.player_env = gym.make("FlappyBird-v0", render_mode=None, use_lidar=False)
+        player_obs, _ = self.player_env.reset()
+        self.pending_actions.clear()  # No flapping before the start
+
+    def _tick_game(self, ai_action):
+        """Step the AI and player environments by one frame"""
+        # Get player action (inputs sent during this step wait for the next tick)
+        player_action = self._drain_player_action()
+        
+        # Step AI environment
+        self.observation, ai_reward, ai_terminated, _, ai_info = self.env.step(ai_action)
+        
+        # Step player environment
+        player_obs, player_reward, player_terminated, _, player_info = self.player_env.step(player_action)
+        
+        # Extract game state from the environment
+        # We need to access the underlying environment attributes
+        with self.lock:
+            # Update AI position
+            self.ai_data["position"]["y"] = self.env.unwrapped._player_y
+            self.ai_data["position"]["rotation"] = -30 if ai_action == 1 else 30
+            self.ai_data["alive"] = not ai_terminated
+            self.ai_data["score"] += ai_reward if not ai_terminated else 0
             
-            # Reset environment to start fresh after countdown
-            observation, _ = self.env.reset()
-            self.player_env = gym.make("FlappyBird-v0", render_mode=None)
-            player_obs, _ = self.player_env.reset()
+            # Update player position
+            self.player_data["position"]["y"] = self.player_env.unwrapped._player_y
+            self.player_data["position"]["rotation"] = -30 if player_action == 1 else 30
+            self.player_data["alive"] = not player_terminated
+            self.player_data["score"] += player_reward if not player_terminated else 0
             
-            # Main game loop
-            while self.game_running and not self.game_over:
-                # Control frame rate
-                current_time = time.time()
-                elapsed = current_time - self.last_frame_time
-                sleep_time = max(0, 1.0/self.frame_rate - elapsed)
-                if sleep_time > 0:
-                    time.sleep(sleep_time)
-                self.last_frame_time = time.time()
+            # Update pipe data for rendering
+            if hasattr(self.env.unwrapped, '_upper_pipes') and hasattr(self.env.unwrapped, '_lower_pipes'):
+                pipes = []
+                for i, (upper, lower) in enumerate(zip(self.env.unwrapped._upper_pipes, self.env.unwrapped._lower_pipes)):
+                    pipes.append({
+                        'x': upper['x'],
+                        'upper_y': upper['y'],  # Upper pipe height
+                        'lower_y': lower['y']   # Lower pipe y position
+                    })
                 
-                # Process AI action
-                with torch.no_grad():
-                    obs_tensor = torch.tensor(observation, dtype=torch.float32).unsqueeze(0)
-                    q_values = self.ai_model(obs_tensor)
-                    ai_action = int(q_values.argmax().item())
-                
-                # Get player action
-                player_action = self.player_action
-                self.player_action = 0  # Reset to do nothing by default
-                
-                # Step AI environment
-                observation, ai_reward, ai_terminated, _, ai_info = self.env.step(ai_action)
-                
-                # Step player environment
-                player_obs, player_reward, player_terminated, _, player_info = self.player_env.step(player_action)
-                
-                # Extract game state from the environment
-                # We need to access the underlying environment attributes
-                with self.lock:
-                    # Update AI position
-                    self.ai_data["position"]["y"] = self.env.unwrapped._player_y
-                    self.ai_data["position"]["rotation"] = -30 if ai_action == 1 else 30
-                    self.ai_data["alive"] = not ai_terminated
-                    self.ai_data["score"] += ai_reward if not ai_terminated else 0
-                    
-                    # Update player position
-                    self.player_data["position"]["y"] = self.player_env.unwrapped._player_y
-                    self.player_data["position"]["rotation"] = -30 if player_action == 1 else 30
-                    self.player_data["alive"] = not player_terminated
-                    self.player_data["score"] += player_reward if not player_terminated else 0
-                    
-                    # Update pipe data for rendering
-                    if hasattr(self.env.unwrapped, '_upper_pipes') and hasattr(self.env.unwrapped, '_lower_pipes'):
-                        pipes = []
-                        for i, (upper, lower) in enumerate(zip(self.env.unwrapped._upper_pipes, self.env.unwrapped._lower_pipes)):
-                            pipes.append({
-                                'x': upper['x'],
-                                'upper_y': upper['y'],  # Upper pipe height
-                                'lower_y': lower['y']   # Lower pipe y position
-                            })
-                        
-                        self.game_state["_metadata"]["game_data"]["pipes"] = pipes
-                        if hasattr(self.env.unwrapped, '_ground'):
-                            self.game_state["_metadata"]["game_data"]["ground_y"] = self.env.unwrapped._ground['y']
-                    
-                    # Check if game is over
-                    self.game_over = not self.ai_data["alive"] and not self.player_data["alive"]
-                    
-                    # Check for winner if one player died but the other is still alive
-                    if not self.ai_data["alive"] and self.player_data["alive"]:
-                        self.game_state["_metadata"]["winner"] = "player"
-                        self.game_state["_metadata"]["game_over"] = True
-                    elif self.ai_data["alive"] and not self.player_data["alive"]:
-                        self.game_state["_metadata"]["winner"] = "ai"
-                        self.game_state["_metadata"]["game_over"] = True
-                    elif not self.ai_data["alive"] and not self.player_data["alive"]:
-                        # If both died on the same frame, highest score wins
-                        if self.ai_data["score"] > self.player_data["score"]:
-                            self.game_state["_metadata"]["winner"] = "ai"
-                        else:
-                            self.game_state["_metadata"]["winner"] = "player"
-                        self.game_state["_metadata"]["game_over"] = True
-                
-                # If game is over, exit the loop
-                if self.game_state["_metadata"]["game_over"]:
-                    break
+                self.game_state["_metadata"]["game_data"]["pipes"] = pipes
+                if hasattr(self.env.unwrapped, '_ground'):
+                    self.game_state["_metadata"]["game_data"]["ground_y"] = self.env.unwrapped._ground['y']
+            
+            # Check if game is over
+            self.game_over = not self.ai_data["alive"] and not self.player_data["alive"]
             
+            # Check for winner if one player died but the other is still alive
+            if not self.ai_data["alive"] and self.player_data["alive"]:
+                self.game_state["_metadata"]["winner"] = "player"
+                self.game_state["_metadata"]["game_over"] = True
+            elif self.ai_data["alive"] and not self.player_data["alive"]:
+                self.game_state["_metadata"]["winner"] = "ai"
+                self.game_state["_metadata"]["game_over"] = True
+            elif not self.ai_data["alive"] and not self.player_data["alive"]:
+                # If both died on the same frame, highest score wins
+                if self.ai_data["score"] > self.player_data["score"]:
+                    self.game_state["_metadata"]["winner"] = "ai"
+                else:
+                    self.game_state["_metadata"]["winner"] = "player"
+                self.game_state["_metadata"]["game_over"] = True
+        
+        # If game is over, stop ticking
+        if self.game_state["_metadata"]["game_over"]:
             # Mark game as over
             with self.lock:
-                self.game_state["_metadata"]["game_over"] = True
                 if not self.game_state["_metadata"]["winner"]:
                     # Determine winner based on score if not already set
                     if self.ai_data["score"] > self.player_data["score"]:
                         self.game_state["_metadata"]["winner"] = "ai"
                     else:
                         self.game_state["_metadata"]["winner"] = "player"
-            
-            # Clean up
-            self.env.close()
-            self.player_env.close()
-            
-        except Exception as e:
-            print(f"Error in game loop: {e}")
-            import traceback
-            traceback.print_exc()
-            with self.lock:
-                self.game_state["_metadata"]["game_over"] = True
-        finally:
-            self.game_running = False
\ No newline at end of file
+            self._end_game()
+
+    def _end_game(self):
+        """Stop ticking and clean up both environments"""
+        self.game_running = False
+        self.policy_server.detach(self)
+        for env in (self.env, self.player_env):
+            try:
+                if env:
+                    env.close()
+            except:
+                pass
@@ -0,0 +1,132 @@
+import struct
+import numpy as np
+
+# Compact binary game frames, sent as Socket.IO binary attachments and decoded
+# in static/js/index.js with a DataView. All values are little-endian.
+#
+# Layout:
+#   header   FRAME_HEADER
+#   pipes    pipe_count   x PIPE_RECORD
+#   players  player_count x PLAYER_RECORD
+#
+# x/y positions are quantized to 1/POSITION_SCALE px and rotations to whole degrees.
+
+FRAME_MAGIC = 0xFB
+FRAME_VERSION = 1
+
+FRAME_KIND_MULTIPLAYER = 0
+FRAME_KIND_AI = 1
+
+FLAG_GAME_OVER = 1
+FLAG_COUNTDOWN = 2
+
+PLAYER_FLAG_ALIVE = 1
+
+POSITION_SCALE = 16
+
+# magic, version, kind, flags, seq, winner, ground_y, countdown (centiseconds), pipe_count, player_count
+FRAME_HEADER = struct.Struct('<BBBBIhhHBH')
+
+PIPE_RECORD = np.dtype([
+    ('x', '<i2'),
+    ('upper_y', '<i2'),
+    ('lower_y', '<i2'),
+])
+
+PLAYER_RECORD = np.dtype([
+    ('slot', '<u2'),
+    ('flags', 'u1'),
+    ('rotation', 'i1'),
+    ('y', '<i2'),
+    ('score', '<f4'),
+])
+
+# Winner codes used in AI frames
+AI_WINNER_CODES = {None: -1, "player": 0, "ai": 1}
+
+def _quantize(values):
+    """Quantize pixel positions to fixed point."""
+    return np.round(np.asarray(values, dtype=np.float64) * POSITION_SCALE)
+
+def encode_frame(kind, seq, pipes, slots, y, rotation, score, alive,
+                 game_over=False, winner=-1, ground_y=0, countdown_active=False, countdown_remaining=0):
+    """
+    Pack one frame into bytes.
+    `pipes` is a list of {'x', 'upper_y', 'lower_y'} dicts and the player columns are
+    equal-length sequences (typically slices of a PlayerTable).
+    """
+    flags = (FLAG_GAME_OVER if game_over else 0) | (FLAG_COUNTDOWN if countdown_active else 0)
+    header = FRAME_HEADER.pack(
+        FRAME_MAGIC, FRAME_VERSION, kind, flags, seq & 0xFFFFFFFF, winner,
+        int(round(ground_y * POSITION_SCALE)),
+        min(int(countdown_remaining * 100), 0xFFFF),
+        len(pipes), len(slots)
+    )
+
+    pipe_block = np.empty(len(pipes), dtype=PIPE_RECORD)
+    if pipes:
+        pipe_block['x'] = _quantize([pipe['x'] for pipe in pipes])
+        pipe_block['upper_y'] = _quantize([pipe['upper_y'] for pipe in pipes])
+        pipe_block['lower_y'] = _quantize([pipe['lower_y'] for pipe in pipes])
+
+    player_block = np.empty(len(slots), dtype=PLAYER_RECORD)
+    player_block['slot'] = slots
+    player_block['flags'] = np.where(alive, PLAYER_FLAG_ALIVE, 0)
+    player_block['rotation'] = np.clip(np.round(rotation), -128, 127)
+    player_block['y'] = np.clip(_quantize(y), -32768, 32767)
+    player_block['score'] = score
+
+    return header + pipe_block.tobytes() + player_block.tobytes()
+
+def decode_frame(data):
+    """
+    Unpack a frame (the Python side of the decoder in static/js/index.js). Returns a
+    dict of the header fields plus 'pipes' and 'players' structured arrays, with
+    positions converted back to pixels.
+    """
+    (magic, version, kind, flags, seq, winner, ground_y, countdown,
+     pipe_count, player_count) = FRAME_HEADER.unpack_from(data)
+    if magic != FRAME_MAGIC or version != FRAME_VERSION:
+        raise ValueError(f"Not a version {FRAME_VERSION} game frame")
+
+    offset = FRAME_HEADER.size
+    pipes = np.frombuffer(data, dtype=PIPE_RECORD, count=pipe_count, offset=offset)
+    offset += pipes.nbytes
+    players = np.frombuffer(data, dtype=PLAYER_RECORD, count=player_count, offset=offset)
+
+    return {
+        "kind": kind,
+        "seq": seq,
+        "game_over": bool(flags & FLAG_GAME_OVER),
+        "countdown_active": bool(flags & FLAG_COUNTDOWN),
+        "countdown_remaining": countdown / 100,
+        "winner": winner,
+        "ground_y": ground_y / POSITION_SCALE,
+        "pipes": {name: pipes[name] / POSITION_SCALE for name in PIPE_RECORD.names},
+        "players": {
+            "slot": players['slot'].astype(np.int64),
+            "alive": (players['flags'] & PLAYER_FLAG_ALIVE).astype(bool),
+            "rotation": players['rotation'].astype(np.int64),
+            "y": players['y'] / POSITION_SCALE,
+            "score": players['score'].astype(np.float64),
+        },
+    }
+
+def encode_ai_frame(ai_game_state, seq):
+    """Pack a SinglePlayerGameManager state. The human is slot 0 and the AI slot 1."""
+    metadata = ai_game_state["_metadata"]
+    birds = (ai_game_state["player"], ai_game_state["ai"])
+    return encode_frame(
+        FRAME_KIND_AI, seq,
+        pipes=metadata["game_data"]["pipes"],
+        slots=[0, 1],
+        y=[bird["position"]["y"] for bird in birds],
+        rotation=[bird["position"]["rotation"] for bird in birds],
+        score=[bird["score"] for bird in birds],
+        alive=[bird["alive"] for bird in birds],
+        game_over=metadata["game_over"],
+        winner=AI_WINNER_CODES.get(metadata["winner"], -1),
+        ground_y=metadata["game_data"]["ground_y"],
+        countdown_active=metadata["countdown"]["active"],
+        countdown_remaining=metadata["countdown"]["remaining"]
+    )
@@ -0,0 +1,115 @@
+import threading
+
+# Key used inside a patch to list keys that were removed from a dict
+REMOVED_KEY = "$del"
+
+# Keys that change every tick without carrying any game information
+VOLATILE_KEYS = ("timestamp",)
+
+_UNCHANGED = object()
+
+def diff_state(old, new, ignore=VOLATILE_KEYS):
+    """
+    Build a patch that turns `old` into `new`.
+    Dicts are diffed key by key (removed keys are listed under REMOVED_KEY),
+    anything else (numbers, strings, lists such as the pipes) is replaced whole.
+    Returns None when nothing changed.
+    """
+    patch = _diff(old, new, ignore)
+    return None if patch is _UNCHANGED else patch
+
+def _diff(old, new, ignore):
+    if isinstance(old, dict) and isinstance(new, dict):
+        patch = {}
+        for key, value in new.items():
+            if key in ignore:
+                continue
+            if key not in old:
+                patch[key] = value
+                continue
+            sub_patch = _diff(old[key], value, ignore)
+            if sub_patch is not _UNCHANGED:
+                patch[key] = sub_patch
+
+        removed = [key for key in old if key not in new]
+        if removed:
+            patch[REMOVED_KEY] = removed
+        return patch if patch else _UNCHANGED
+
+    return _UNCHANGED if old == new else new
+
+def apply_patch(target, patch):
+    """
+    Apply a diff_state patch to `target` in place (the client side of a delta,
+    same as applyStatePatch in static/js/index.js). Returns `target`.
+    """
+    for key, value in patch.items():
+        if key == REMOVED_KEY:
+            continue
+        current = target.get(key)
+        if isinstance(value, dict) and isinstance(current, dict):
+            apply_patch(current, value)
+        else:
+            target[key] = value
+    for key in patch.get(REMOVED_KEY, ()):
+        target.pop(key, None)
+    return target
+
+class StateDeltaEncoder:
+    """
+    Turns a stream of game states into keyframes and deltas.
+
+    A keyframe carries the whole state and is sent every `keyframe_interval`
+    messages. In between, deltas only carry what changed since the previous
+    message, and nothing is sent at all when the state did not change.
+    Each message has a sequence number so clients can detect a missed delta
+    and ask for a new keyframe.
+    """
+    def __init__(self, keyframe_interval=20):
+        self.keyframe_interval = max(1, keyframe_interval)
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Forget the previous state so the next message is a keyframe."""
+        with self.lock:
+            self.seq = 0
+            self.last_state = None
+            self.since_keyframe = 0
+
+    def encode(self, state):
+        """Encode the next state. Returns the message to send, or None if nothing changed."""
+        with self.lock:
+            if self.last_state is None:
+                return self._keyframe(state)
+            if state is self.last_state:
+                return None  # Same shared snapshot as last time
+
+            patch = diff_state(self.last_state, state)
+            if patch is None:
+                return None
+            if self.since_keyframe + 1 >= self.keyframe_interval:
+                return self._keyframe(state)
+
+            self.seq += 1
+            self.since_keyframe += 1
+            self.last_state = state
+            return {
+                "type": "delta",
+                "seq": self.seq,
+                "base": self.seq - 1,
+                "patch": patch
+            }
+
+    def keyframe(self):
+        """Get a keyframe of the latest state without advancing the stream (for late joiners)."""
+        with self.lock:
+            if self.last_state is None:
+                return None
+            return {"type": "keyframe", "seq": self.seq, "state": self.last_state}
+
+    def _keyframe(self, state):
+        self.seq += 1
+        self.since_keyframe = 0
+        self.last_state = state
+        return {"type": "keyframe", "seq": self.seq, "state": state}
@@ -4,7 +4,8 @@ let currentUser = {
     username: '',
     isAdmin: false,
     inGame: false,
-    inAiGame: false // Track if user is in AI game mode
+    inAiGame: false, // Track if user is in AI game mode
+    matchId: null // Match joined on the server
 };
 
 // Game assets
@@ -110,6 +111,10 @@ let countdownActive = false;
 let countdownValue = 0;
 let isMobileFullscreenMode = false;
 
+// Delta-compressed game state stream
+let syncedGameState = null; // Last full enhanced state rebuilt from keyframes + deltas
+let gameStateSeq = -1; // Sequence number of the last applied message
+
 // Function to check if device is mobile
 function isMobileDevice() {
     return (window.innerWidth <= 768) || 
@@ -251,10 +256,13 @@ document.getElementById('join-btn').addEventListener('click', () => {
     
     currentUser.username = username;
     currentUser.isAdmin = admin === '1';
+    // Matches are picked with ?match=<id>; the server uses its default match otherwise
+    currentUser.matchId = urlParams.get('match') || null;
     
     socket.emit('join_game', {
         username: currentUser.username,
-        isAdmin: currentUser.isAdmin
+        isAdmin: currentUser.isAdmin,
+        matchId: currentUser.matchId
     });
     
     // Show lobby section, hide login
@@ -334,6 +342,11 @@ socket.on('connect', () => {
 });
 
 socket.on('lobby_update', (data) => {
+    // Remember which match the server put us in
+    if (data.matchId) {
+        currentUser.matchId = data.matchId;
+    }
+    
     // Update players list
     playersList.innerHTML = '';
     data.players.forEach(player => {
@@ -388,12 +401,368 @@ socket.on('ai_game_started', () => {
 });
 
 socket.on('game_state', (enhancedState) => {
+    handleGameState(enhancedState);
+});
+
+// Keyframes replace the whole state, deltas patch the previous one
+socket.on('game_state_delta', (message) => {
+    if (message.type === 'keyframe') {
+        syncedGameState = message.state;
+    } else {
+        // Missed a message - wait for a fresh keyframe instead of drawing a broken state
+        if (!syncedGameState || message.base !== gameStateSeq) {
+            syncedGameState = null;
+            socket.emit('request_keyframe');
+            return;
+        }
+        applyStatePatch(syncedGameState, message.patch);
+    }
+    gameStateSeq = message.seq;
+    handleGameState(syncedGameState);
+});
+
+// Binary game frames (see snapshot_codec.py)
+const FRAME_HEADER_SIZE = 17;
+const FRAME_PIPE_SIZE = 6;
+const FRAME_PLAYER_SIZE = 10;
+const FRAME_POSITION_SCALE = 16;
+const FRAME_FLAG_GAME_OVER = 1;
+const FRAME_FLAG_COUNTDOWN = 2;
+const FRAME_PLAYER_ALIVE = 1;
+const AI_WINNERS = ['player', 'ai'];
+
+let gameRoster = null; // Slot mapping, usernames and static data for binary frames
+let slotToPlayerId = {};
+
+socket.on('game_roster', (roster) => {
+    gameRoster = roster;
+    slotToPlayerId = {};
+    for (const playerId in roster.slots) {
+        slotToPlayerId[roster.slots[playerId]] = playerId;
+    }
+});
+
+socket.on('game_frame', (buffer) => {
+    if (!gameRoster) return;
+    const frame = decodeGameFrame(buffer);
+    const staticData = gameRoster.static;
+    
+    // Rebuild the same shape as a JSON game_state
+    const gameData = {
+        _metadata: {
+            game_over: frame.gameOver,
+            winner: frame.winner >= 0 ? (slotToPlayerId[frame.winner] || null) : null,
+            countdown: frame.countdown,
+            game_data: {
+                pipes: frame.pipes,
+                ground_y: frame.groundY,
+                screen_width: staticData.screen_width,
+                screen_height: staticData.screen_height,
+                pipe_width: staticData.pipe_width,
+                pipe_gap: staticData.pipe_gap,
+                countdown: frame.countdown
+            }
+        }
+    };
+    const playersInfoFromFrame = {};
+    for (const playerId in gameRoster.players_info) {
+        playersInfoFromFrame[playerId] = { ...gameRoster.players_info[playerId], score: 0, alive: false };
+    }
+    frame.players.forEach(record => {
+        const playerId = slotToPlayerId[record.slot];
+        if (!playerId) return;
+        gameData[playerId] = {
+            position: { x: staticData.player_x, y: record.y, velocity: 0, rotation: record.rotation },
+            score: record.score,
+            alive: record.alive
+        };
+        if (playersInfoFromFrame[playerId]) {
+            playersInfoFromFrame[playerId].score = record.score;
+            playersInfoFromFrame[playerId].alive = record.alive;
+        }
+    });
+    
+    handleGameState({ game_data: gameData, players_info: playersInfoFromFrame });
+});
+
+socket.on('ai_game_frame', (buffer) => {
+    if (!currentUser.inAiGame) return;
+    const frame = decodeGameFrame(buffer);
+    const birds = {};
+    frame.players.forEach(record => {
+        birds[record.slot] = {
+            position: { x: 50, y: record.y, rotation: record.rotation },
+            score: record.score,
+            alive: record.alive
+        };
+    });
+    
+    aiGameState = {
+        player: birds[0],
+        ai: birds[1],
+        _metadata: {
+            game_over: frame.gameOver,
+            winner: AI_WINNERS[frame.winner] || null,
+            countdown: frame.countdown,
+            game_data: {
+                screen_width: 288,
+                screen_height: 512,
+                pipe_width: 52,
+                ground_y: frame.groundY,
+                pipes: frame.pipes
+            }
+        }
+    };
+    updateAiGameDisplay();
+});
+
+// Unpack a frame with a DataView (all values little-endian)
+function decodeGameFrame(buffer) {
+    const view = ArrayBuffer.isView(buffer)
+        ? new DataView(buffer.buffer, buffer.byteOffset, buffer.byteLength)
+        : new DataView(buffer);
+    const flags = view.getUint8(3);
+    const pipeCount = view.getUint8(14);
+    const playerCount = view.getUint16(15, true);
+    
+    const frame = {
+        kind: view.getUint8(2),
+        seq: view.getUint32(4, true),
+        gameOver: (flags & FRAME_FLAG_GAME_OVER) !== 0,
+        winner: view.getInt16(8, true),
+        groundY: view.getInt16(10, true) / FRAME_POSITION_SCALE,
+        countdown: {
+            active: (flags & FRAME_FLAG_COUNTDOWN) !== 0,
+            remaining: view.getUint16(12, true) / 100
+        },
+        pipes: [],
+        players: []
+    };
+    
+    let offset = FRAME_HEADER_SIZE;
+    for (let i = 0; i < pipeCount; i++, offset += FRAME_PIPE_SIZE) {
+        frame.pipes.push({
+            x: view.getInt16(offset, true) / FRAME_POSITION_SCALE,
+            upper_y: view.getInt16(offset + 2, true) / FRAME_POSITION_SCALE,
+            lower_y: view.getInt16(offset + 4, true) / FRAME_POSITION_SCALE
+        });
+    }
+    for (let i = 0; i < playerCount; i++, offset += FRAME_PLAYER_SIZE) {
+        frame.players.push({
+            slot: view.getUint16(offset, true),
+            alive: (view.getUint8(offset + 2) & FRAME_PLAYER_ALIVE) !== 0,
+            rotation: view.getInt8(offset + 3),
+            y: view.getInt16(offset + 4, true) / FRAME_POSITION_SCALE,
+            score: view.getFloat32(offset + 6, true)
+        });
+    }
+    return frame;
+}
+
+function handleGameState(enhancedState) {
     if (currentUser.inGame) {
         gameState = enhancedState.game_data;
         playersInfo = enhancedState.players_info;
+        recordSnapshot(gameState);
         updateGameDisplay(enhancedState);
     }
-});
+}
+
+// Client-side smoothing. Server states arrive at the broadcast rate (10 Hz) but we
+// render at 60 fps: other birds are interpolated between buffered snapshots, pipes
+// (which move at a constant speed) are extrapolated from the newest snapshot, and
+// our own bird is predicted locally with the server's physics and then reconciled
+// against what the server says.
+// Physics constants mirror MultiplayerFlappyEnv and the GameManager frame rate
+const SIM_TICK_MS = 1000 / 60;
+const SIM_GRAVITY = 0.25;
+const SIM_FLAP_STRENGTH = -7;
+const SIM_MAX_VEL_Y = 10;
+const SIM_PIPE_SPEED = 5;
+const SIM_PLAYER_HEIGHT = 24;
+const SNAPSHOT_BUFFER_SIZE = 30;
+const INTERPOLATION_DELAY_FACTOR = 1.5; // Render other birds this many snapshot intervals in the past
+const MAX_EXTRAPOLATION_MS = 500; // Don't run pipes on forever if the server goes quiet
+const PREDICTION_HISTORY_SIZE = 120; // About two seconds of predicted ticks
+const RECONCILE_RATE = 0.3; // Share of a small prediction error corrected per server state
+const RECONCILE_SNAP_PX = 30; // Errors larger than this snap straight to the server
+
+let snapshotBuffer = []; // [{time, birds: {playerId: {y, velocity, rotation, alive}}}]
+let snapshotInterval = 100; // Smoothed ms between server states
+let latestWorld = null; // Pipes of the newest snapshot and when it arrived
+let prediction = null; // Locally simulated state of our own bird
+let roundTripTime = 0; // Smoothed ms, measured with latency_ping
+let latencyTimer = null;
+
+function resetSmoothing() {
+    snapshotBuffer = [];
+    latestWorld = null;
+    prediction = null;
+}
+
+function recordSnapshot(state) {
+    const now = performance.now();
+    const metadata = state._metadata || {};
+    const gameData = metadata.game_data || {};
+    
+    const birds = {};
+    for (const playerId in state) {
+        if (playerId === '_metadata') continue;
+        const player = state[playerId];
+        if (!player.position) continue;
+        birds[playerId] = {
+            y: player.position.y,
+            velocity: player.position.velocity || 0,
+            rotation: player.position.rotation,
+            alive: player.alive
+        };
+    }
+    
+    const last = snapshotBuffer[snapshotBuffer.length - 1];
+    if (last) {
+        snapshotInterval += (Math.min(now - last.time, 1000) - snapshotInterval) * 0.1;
+    }
+    snapshotBuffer.push({ time: now, birds });
+    if (snapshotBuffer.length > SNAPSHOT_BUFFER_SIZE) {
+        snapshotBuffer.shift();
+    }
+    
+    latestWorld = {
+        time: now,
+        pipes: (gameData.pipes || []).map(pipe => ({ ...pipe })),
+        frozen: Boolean((metadata.countdown && metadata.countdown.active) || metadata.game_over)
+    };
+    
+    reconcilePrediction(birds[currentUser.id], latestWorld.frozen, now);
+}
+
+// Other birds: interpolate between the two snapshots around (now - delay)
+function interpolatedBirds(now) {
+    const renderTime = now - snapshotInterval * INTERPOLATION_DELAY_FACTOR;
+    let i = snapshotBuffer.length - 1;
+    while (i > 0 && snapshotBuffer[i].time > renderTime) i--;
+    const from = snapshotBuffer[i];
+    if (!from) return {};
+    const to = snapshotBuffer[Math.min(i + 1, snapshotBuffer.length - 1)];
+    
+    const span = to.time - from.time;
+    const alpha = span > 0 ? Math.min(Math.max((renderTime - from.time) / span, 0), 1) : 1;
+    const birds = {};
+    for (const playerId in to.birds) {
+        const a = from.birds[playerId];
+        const b = to.birds[playerId];
+        if (!a || !a.alive || !b.alive) {
+            birds[playerId] = alpha < 1 && a ? a : b;
+            continue;
+        }
+        birds[playerId] = {
+            y: a.y + (b.y - a.y) * alpha,
+            rotation: a.rotation + (b.rotation - a.rotation) * alpha,
+            alive: true
+        };
+    }
+    return birds;
+}
+
+// Pipes: move the newest snapshot's pipes forward to the time our own bird is
+// predicted at (the server time at which an input sent now would arrive)
+function extrapolatedPipes(now) {
+    if (!latestWorld) return [];
+    if (latestWorld.frozen) return latestWorld.pipes;
+    const ahead = Math.min(now - latestWorld.time + roundTripTime, MAX_EXTRAPOLATION_MS);
+    const shift = SIM_PIPE_SPEED * ahead / SIM_TICK_MS;
+    return latestWorld.pipes.map(pipe => ({ ...pipe, x: pipe.x - shift }));
+}
+
+// Own bird: step the server's physics locally in fixed 60 Hz ticks
+function advancePrediction(now, groundY) {
+    if (!prediction) return;
+    if (now - prediction.lastTick > 1000) {
+        prediction.lastTick = now - SIM_TICK_MS; // Tab was in the background - don't replay it
+    }
+    while (prediction.lastTick + SIM_TICK_MS <= now) {
+        prediction.lastTick += SIM_TICK_MS;
+        
+        prediction.velY = prediction.flapPending ? SIM_FLAP_STRENGTH : prediction.velY + SIM_GRAVITY;
+        prediction.velY = Math.min(prediction.velY, SIM_MAX_VEL_Y);
+        prediction.y = Math.min(prediction.y + prediction.velY, groundY - SIM_PLAYER_HEIGHT);
+        prediction.rotation = prediction.velY < 0
+            ? Math.min(prediction.rotation + 3, 30)
+            : Math.max(prediction.rotation - 3, -30);
+        prediction.flapPending = false;
+        
+        prediction.history.push({ time: prediction.lastTick, y: prediction.y });
+        if (prediction.history.length > PREDICTION_HISTORY_SIZE) {
+            prediction.history.shift();
+        }
+    }
+}
+
+// Compare the server's position of our bird with where we predicted it one round
+// trip ago (the server time that state was taken at), and correct the prediction
+function reconcilePrediction(serverBird, frozen, now) {
+    if (!serverBird || !serverBird.alive || frozen) {
+        prediction = null; // Nothing to predict - just follow the server
+        return;
+    }
+    if (!prediction) {
+        prediction = {
+            y: serverBird.y,
+            velY: serverBird.velocity,
+            rotation: serverBird.rotation,
+            flapPending: false,
+            lastTick: now,
+            history: []
+        };
+        return;
+    }
+    
+    const history = prediction.history;
+    const target = now - roundTripTime;
+    let past = null;
+    for (let i = history.length - 1; i >= 0; i--) {
+        if (history[i].time <= target) {
+            past = history[i];
+            break;
+        }
+    }
+    if (!past) return;
+    
+    const error = serverBird.y - past.y;
+    const correction = Math.abs(error) > RECONCILE_SNAP_PX ? error : error * RECONCILE_RATE;
+    prediction.y += correction;
+    history.forEach(entry => { entry.y += correction; });
+}
+
+// Keep a smoothed round trip time to line the prediction up with server states
+function measureLatency() {
+    const sent = performance.now();
+    socket.emit('latency_ping', () => {
+        roundTripTime += (performance.now() - sent - roundTripTime) * 0.2;
+    });
+}
+
+// Apply a patch from state_delta.py: objects are merged key by key,
+// keys listed under '$del' are removed, anything else is replaced
+function applyStatePatch(target, patch) {
+    for (const key in patch) {
+        if (key === '$del') continue;
+        const value = patch[key];
+        const current = target[key];
+        if (isPlainObject(value) && isPlainObject(current)) {
+            applyStatePatch(current, value);
+        } else {
+            target[key] = value;
+        }
+    }
+    if (patch['$del']) {
+        patch['$del'].forEach(key => delete target[key]);
+    }
+}
+
+function isPlainObject(value) {
+    return value !== null && typeof value === 'object' && !Array.isArray(value);
+}
 
 socket.on('ai_game_state', (state) => {
     if (currentUser.inAiGame) {
@@ -496,6 +865,8 @@ socket.on('game_reset', () => {
     // Reset game state
     gameState = null;
     playersInfo = {};
+    syncedGameState = null;
+    gameStateSeq = -1;
     
     // Hide game over modal if visible
     gameOverModal.classList.add('hidden');
@@ -504,6 +875,14 @@ socket.on('game_reset', () => {
     toggleMobileFullscreenMode(false);
 });
 
+// The server couldn't start the AI game (e.g. no AI model), go back to the login screen
+socket.on('ai_game_error', (data) => {
+    currentUser.inAiGame = false;
+    gameSection.style.display = 'none';
+    loginSection.style.display = 'block';
+    showNotification(data.message, 'error');
+});
+
 socket.on('ai_game_reset', () => {
     // Hide game over modal
     gameOverModal.classList.add('hidden');
@@ -519,6 +898,7 @@ document.addEventListener('keydown', (event) => {
         
         // Handle key controls for multiplayer mode
         if (currentUser.inGame) {
+            if (prediction) prediction.flapPending = true; // Flap locally right away
             socket.emit('update_position', {
                 playerId: currentUser.id,
                 action: 1  // Flap
@@ -543,6 +923,7 @@ document.addEventListener('keydown', (event) => {
 // Mobile touch control
 gameCanvas.addEventListener('touchstart', (event) => {
     if (currentUser.inGame) {
+        if (prediction) prediction.flapPending = true; // Flap locally right away
         socket.emit('update_position', {
             playerId: currentUser.id,
             action: 1  // Flap
@@ -567,6 +948,12 @@ function startGameLoop() {
         cancelAnimationFrame(animationFrameId);
     }
     
+    resetSmoothing();
+    if (!latencyTimer) {
+        measureLatency();
+        latencyTimer = setInterval(measureLatency, 2000);
+    }
+    
     function gameLoop() {
         renderGame();
         animationFrameId = requestAnimationFrame(gameLoop);
@@ -580,6 +967,11 @@ function stopGameLoop() {
         cancelAnimationFrame(animationFrameId);
         animationFrameId = null;
     }
+    if (latencyTimer) {
+        clearInterval(latencyTimer);
+        latencyTimer = null;
+    }
+    resetSmoothing();
 }
 
 // Start AI game loop
@@ -614,13 +1006,22 @@ function renderGame() {
     const scaleX = canvas.width / (gameData.screen_width || 288);
     const scaleY = canvas.height / (gameData.screen_height || 512);
     
+    // Smoothed view of the world for this frame (see recordSnapshot)
+    const now = performance.now();
+    advancePrediction(now, gameData.ground_y || 404);
+    const pipes = extrapolatedPipes(now);
+    const birds = interpolatedBirds(now);
+    if (prediction) {
+        birds[currentUser.id] = { y: prediction.y, rotation: prediction.rotation, alive: true };
+    }
+    
     // Draw background
     ctx.drawImage(gameAssets.background, 0, 0, canvas.width, canvas.height);
     
     // Draw pipes
-    if (gameData.pipes) {
+    if (pipes.length) {
         // First draw all lower pipes
-        gameData.pipes.forEach(pipe => {
+        pipes.forEach(pipe => {
             const pipeX = pipe.x * scaleX;
             const lowerY = pipe.lower_y * scaleY;
             const pipeWidth = (gameData.pipe_width || 52) * scaleX;
@@ -636,7 +1037,7 @@ function renderGame() {
         });
         
         // Now draw all upper pipes with the same green color
-        gameData.pipes.forEach(pipe => {
+        pipes.forEach(pipe => {
             const pipeX = pipe.x * scaleX;
             const upperY = pipe.upper_y * scaleY;
             const lowerY = pipe.lower_y * scaleY;
@@ -671,7 +1072,7 @@ function renderGame() {
         
         // Draw debug boxes
         if (showDebugBoxes) {
-            gameData.pipes.forEach(pipe => {
+            pipes.forEach(pipe => {
                 const pipeX = pipe.x * scaleX;
                 const upperY = pipe.upper_y * scaleY;
                 const lowerY = pipe.lower_y * scaleY;
@@ -736,18 +1137,13 @@ function renderGame() {
     }
     
     // Draw players (birds)
-    for (const playerId in gameState) {
-        if (playerId === '_metadata') continue;
+    for (const playerId in birds) {
+        const playerPos = birds[playerId];
+        if (!playerPos.alive) continue;
         
+        // Scale the positions (every bird flies in the same column)
         const player = gameState[playerId];
-        if (!player.alive) continue;
-        
-        // Get player position
-        const playerPos = player.position;
-        if (!playerPos) continue;
-        
-        // Scale the positions
-        const playerX = playerPos.x * scaleX;
+        const playerX = (player && player.position ? player.position.x : 50) * scaleX;
         const playerY = playerPos.y * scaleY;
         const playerWidth = 34 * scaleX;
         const playerHeight = 24 * scaleY;
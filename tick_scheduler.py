@@ -0,0 +1,201 @@
+import threading
+import time
+
+class _Task:
+    """A callback stepped at a fixed rate by the scheduler."""
+    def __init__(self, key, callback, rate, max_catchup):
+        self.key = key
+        self.callback = callback
+        self.rate = rate
+        self.interval = 1.0 / rate
+        self.max_catchup = max(1, max_catchup)
+        self.next_deadline = None  # Set by the scheduler when the task is first seen
+
+        # Statistics
+        self.ticks = 0
+        self.missed_deadlines = 0  # Ticks that ran more than one interval late
+        self.dropped_ticks = 0  # Ticks skipped because we could not catch up
+        self.max_lateness = 0.0
+
+class SimulatedClock:
+    """
+    Virtual clock for headless runs. Time only moves when advanced, so a
+    TickScheduler built on it (see TickScheduler.simulated) can fast-forward
+    through a match as fast as the CPU allows.
+    """
+    def __init__(self, start=0.0):
+        self.now = start
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        """Move time forward (never backwards)."""
+        self.now += max(0.0, seconds)
+
+    def sleep(self, seconds):
+        """Drop-in for time.sleep that just advances the virtual time."""
+        self.advance(seconds)
+
+class TickScheduler:
+    """
+    One thread that steps every game loop (and the broadcast loop) on a shared clock.
+
+    Each task has its own fixed timestep. The scheduler uses a monotonic clock and
+    accumulates elapsed time, so a task runs exactly `rate` times per second on
+    average no matter how long each tick takes. When a task falls behind it runs
+    up to `max_catchup` ticks back to back and drops the rest; broadcast tasks use
+    max_catchup=1 so late broadcasts are coalesced into one instead of bursting.
+    Between deadlines the thread sleeps until the earliest one is due.
+
+    `spawn` and `sleep` can be swapped for an async framework's versions (e.g.
+    socketio.start_background_task / socketio.sleep) so the scheduler runs as a
+    green thread on the same event loop as the Socket.IO handlers. It yields to
+    the loop between tasks so one busy match can't starve the handlers.
+    """
+    def __init__(self, clock=time.monotonic, sleep=time.sleep, spawn=None):
+        self.clock = clock
+        self.sleep = sleep
+        self.spawn = spawn
+        self.lock = threading.Lock()
+        self.tasks = {}  # {key: _Task}
+        self.thread = None
+        self.running = False
+
+    @classmethod
+    def simulated(cls, start=0.0):
+        """A scheduler on a SimulatedClock, to be driven with run_for() instead of start()."""
+        clock = SimulatedClock(start)
+        return cls(clock=clock, sleep=clock.sleep)
+
+    def add(self, key, callback, rate, max_catchup=4):
+        """Step `callback()` `rate` times per second until removed. Re-adding a key replaces it."""
+        with self.lock:
+            self.tasks[key] = _Task(key, callback, rate, max_catchup)
+
+    def remove(self, key):
+        """Stop stepping a task. Safe to call from inside the task's own callback."""
+        with self.lock:
+            self.tasks.pop(key, None)
+
+    def start(self):
+        """Start the scheduler thread (does nothing if it is already running)."""
+        with self.lock:
+            if self.running:
+                return
+            self.running = True
+            if self.spawn is not None:
+                self.thread = self.spawn(self._run)
+            else:
+                self.thread = threading.Thread(target=self._run)
+                self.thread.daemon = True
+                self.thread.start()
+
+    def stop(self):
+        """Stop the scheduler thread."""
+        self.running = False
+        if self.thread is not None:
+            self.thread.join(timeout=1.0)
+            self.thread = None
+
+    def run_pending(self):
+        """Run every tick that is due. Returns the time of the next deadline."""
+        with self.lock:
+            tasks = list(self.tasks.values())
+
+        now = self.clock()
+        next_deadline = now + 0.1  # Idle poll when there are no tasks
+        for task in tasks:
+            if task.next_deadline is None:
+                task.next_deadline = now
+
+            steps = 0
+            while now >= task.next_deadline and steps < task.max_catchup:
+                lateness = now - task.next_deadline
+                task.max_lateness = max(task.max_lateness, lateness)
+                if lateness > task.interval:
+                    task.missed_deadlines += 1
+
+                try:
+                    task.callback()
+                except Exception as e:
+                    print(f"Error in scheduled task {task.key}: {e}")
+                task.ticks += 1
+                task.next_deadline += task.interval
+                steps += 1
+
+            # Too far behind - drop the backlog instead of spiralling
+            if now >= task.next_deadline:
+                dropped = int((now - task.next_deadline) // task.interval) + 1
+                task.dropped_ticks += dropped
+                task.next_deadline += dropped * task.interval
+
+            next_deadline = min(next_deadline, task.next_deadline)
+
+            # Let other green threads / handlers run between tasks
+            if steps:
+                self.sleep(0)
+
+        return next_deadline
+
+    def run_for(self, duration, until=None):
+        """
+        Fast-forward a scheduler on a SimulatedClock by `duration` virtual seconds,
+        jumping straight from one deadline to the next. Every task ticks exactly as
+        often as it would in real time. Stops early once `until()` returns true or
+        no tasks are left. Returns the virtual time simulated.
+        """
+        start = self.clock()
+        end = start + duration
+        while True:
+            next_deadline = self.run_pending()
+            if (until is not None and until()) or not self.tasks:
+                break
+            self.clock.advance(min(next_deadline, end) - self.clock())
+            if next_deadline > end:
+                break
+        return self.clock() - start
+
+    def _run(self):
+        while self.running:
+            next_deadline = self.run_pending()
+            delay = next_deadline - self.clock()
+            if delay > 0:
+                self.sleep(delay)
+
+    def stats(self):
+        """Get per-task tick and deadline statistics."""
+        with self.lock:
+            return {
+                str(task.key): {
+                    "rate": task.rate,
+                    "ticks": task.ticks,
+                    "missed_deadlines": task.missed_deadlines,
+                    "dropped_ticks": task.dropped_ticks,
+                    "max_lateness_ms": round(task.max_lateness * 1000, 3)
+                }
+                for task in self.tasks.values()
+            }
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+def set_scheduler(scheduler):
+    """
+    Replace the process-wide scheduler (call before any game manager is created).
+    The new scheduler is not started; the caller starts it when it is ready to run.
+    """
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is not None and _scheduler is not scheduler:
+            _scheduler.stop()
+        _scheduler = scheduler
+
+def get_scheduler():
+    """Get the process-wide scheduler shared by every game manager, starting it on first use."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = TickScheduler()
+            _scheduler.start()
+        return _scheduler